@@ -5,103 +5,207 @@
 @date 2025
 
 Cette application permet d'organiser des sessions de Planning Poker
-avec plusieurs règles de consensus (strict, moyenne, médiane),
+avec plusieurs règles de consensus (strict, moyenne, médiane... voir poker/consensus.py),
 une gestion du backlog via JSON et une communication temps réel.
 """
 
 
+import atexit
+import functools
+import hmac
+import logging
 import os
-import json
+import time
 import uuid
-from flask import Flask, render_template, redirect, url_for, request, session
+from flask import Flask, Response, render_template, redirect, url_for, request, session, jsonify
 from flask_socketio import SocketIO, join_room, leave_room, emit
+from markupsafe import escape
+from poker import assets, consensus, export, logs, state_sync, tally
+from poker.coalesce import VoteCoalescer
+from poker.backlog_import import import_backlog, BacklogImportError, BacklogTooLargeError
+from poker.connections import ConnectionRegistry
+from poker.eventlog import EventLog
+from poker.lifecycle import RoomLifecycle, backlog_snapshot_hook
+from poker.locks import RoomLocks
+from poker.logs import log_event
+from poker.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Instrumentation
+from poker.model import to_plain
+from poker.profiler import SamplingProfiler
+from poker.ratelimit import RateLimiter, SlowConsumerGuard, limits_from_env
+from poker.scheduler import DeadlineScheduler
+from poker.server import serializer_from_env, socketio_options
+from poker.store import create_room_store
+from poker.templates import TemplateRegistry
 
 # Fichier : app.py (Ajouter cette fonction utilitaire)
 
-def calculate_consensus(votes, session_type):
+def calculate_consensus(votes, session_type, histogram=None):
     """
     @brief Calcule le résultat final d'un vote selon la règle choisie.
 
     @param votes Dictionnaire des votes {pseudo: valeur}
-    @param session_type Type de règle ('strict', 'average', 'median')
+    @param session_type Nom d'une règle enregistrée dans poker/consensus.py
+                        ('strict', 'average', 'median', 'mode', 'trimmed_mean', 'fibonacci', 'outliers')
+    @param histogram Histogramme {carte: nombre} de la manche, s'il est tenu à jour
     @return tuple (resultat_final, details_du_calcul)
 
     Les votes spéciaux ('?', '☕️') sont ignorés dans les calculs numériques.
     """
-     
-    # Étape 1 : Nettoyer et convertir les votes en nombres
-    # On ignore les votes spéciaux ('?', '☕️') pour le calcul mathématique.
-    numeric_votes = []
-    
-    # Définir les valeurs numériques pour les chaînes spéciales comme '0.5'
-    value_map = {'0.5': 0.5}
-    
-    for vote in votes.values():
-        if vote in value_map:
-            numeric_votes.append(value_map[vote])
-        else:
-            try:
-                # Convertir les chaînes standard ('1', '2', '5', etc.) en float
-                numeric_votes.append(float(vote))
-            except ValueError:
-                # Ignorer les votes non numériques ('?', '☕️')
-                pass
-                
-    if not numeric_votes:
-        # Si aucun vote numérique n'est soumis
-        return "N/A (Non numérique)", "Aucun vote numérique soumis pour le calcul."
-
-    # Étape 2 : Calcul basé sur le type de session
-    
-    # --- Règle 1 : Strict (Consensus Total) ---
-    if session_type == 'strict':
-        # Vérifie si tous les votes numériques sont identiques
-        if len(set(numeric_votes)) == 1:
-            result = str(numeric_votes[0])
-            details = "Consensus atteint : Tous les votes numériques sont identiques."
-        else:
-            result = "NO CONSENSUS"
-            details = "Divergence détectée. Le vote est relancé par l'admin."
-    
-    # --- Règle 2 : Moyenne (Simple moyenne) ---
-    elif session_type == 'average':
-        average = sum(numeric_votes) / len(numeric_votes)
-        # Trouver la carte la plus proche de la moyenne dans l'ensemble Fibonacci standard (0, 1, 2, 3, 5, 8, 13...)
-        
-        # NOTE : Pour l'instant, renvoyons la moyenne brute arrondie à 1 décimale
-        result = round(average, 1)
-        details = f"Moyenne simple des votes numériques ({len(numeric_votes)}) : {result}"
-
-    # --- Règle 3 : Médiane ---
-    elif session_type == 'median':
-        numeric_votes.sort()
-        n = len(numeric_votes)
-        
-        if n % 2 == 1:
-            # Nombre impair : le milieu exact
-            median = numeric_votes[n // 2]
-        else:
-            # Nombre pair : moyenne des deux du milieu
-            mid1 = numeric_votes[n // 2 - 1]
-            mid2 = numeric_votes[n // 2]
-            median = (mid1 + mid2) / 2
-            
-        result = str(median)
-        details = f"Médiane des votes numériques ({len(numeric_votes)}) : {result}"
-        
-    else:
-        # Cas par défaut ou erreur
-        result = "N/A (Règle Inconnue)"
-        details = "Le type de session spécifié n'est pas reconnu."
+    return consensus.calculate(votes, session_type, histogram=histogram)
 
-    return str(result), details
+# --- Journalisation ---
+# Enregistrements structurés écrits par un thread de fond (LOG_FORMAT, LOG_LEVEL,
+# LOG_EVENT_LEVELS, LOG_SAMPLE_RATES : voir poker/logs.py)
+log_writer = logs.configure_from_env()
+atexit.register(log_writer.stop)
 
 # --- Configuration de Flask ---
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'une_cle_secrete_par_defaut')
-socketio = SocketIO(app)
-# Stocke les états de toutes les salles
-rooms = {}
+# Limites de l'import du backlog (taille du fichier, nombre de tâches)
+app.config['BACKLOG_MAX_BYTES'] = int(os.environ.get('BACKLOG_MAX_BYTES', 50 * 1024 * 1024))
+app.config['BACKLOG_MAX_ITEMS'] = int(os.environ.get('BACKLOG_MAX_ITEMS', 50000))
+# Taille des pages du backlog servies par /room/<room_id>/backlog
+app.config['BACKLOG_PAGE_SIZE'] = int(os.environ.get('BACKLOG_PAGE_SIZE', 50))
+app.config['BACKLOG_PAGE_MAX'] = int(os.environ.get('BACKLOG_PAGE_MAX', 500))
+# Salles créées au plus par POST /templates/<template_id>/rooms
+app.config['TEMPLATE_BATCH_MAX'] = int(os.environ.get('TEMPLATE_BATCH_MAX', 100))
+# Au-delà, la liste des salles administrées ne tiendrait plus dans le cookie de session (4 Ko)
+TEMPLATE_BATCH_LIMIT = 500
+if not 1 <= app.config['TEMPLATE_BATCH_MAX'] <= TEMPLATE_BATCH_LIMIT:
+    raise ValueError(f"TEMPLATE_BATCH_MAX doit être entre 1 et {TEMPLATE_BATCH_LIMIT}")
+# Salles dont la session Flask (cookie) retient l'administration, pour l'export du backlog :
+# au moins un lot complet de salles créées depuis un modèle
+ADMIN_ROOMS_PER_SESSION = max(20, app.config['TEMPLATE_BATCH_MAX'])
+# Werkzeug refuse d'emblée les requêtes plus grosses (marge pour les champs du formulaire)
+app.config['MAX_CONTENT_LENGTH'] = app.config['BACKLOG_MAX_BYTES'] + 1024 * 1024
+# File de messages partagée (ex: redis://...) pour diffuser les événements entre workers.
+# Mode asynchrone et pings configurables (voir poker/server.py et serve.py pour la production)
+socketio = SocketIO(app, message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE'),
+                    **socketio_options())
+# Encodage des paquets (json ou msgpack) : la page salle charge le client correspondant
+SOCKETIO_SERIALIZER = serializer_from_env()
+# Ressources construites par `python -m poker.assets` (bundles, sprite, empreintes, gzip/brotli)
+assets.init_app(app)
+# Stocke les états de toutes les salles (mémoire locale ou Redis, voir poker/store.py)
+rooms = create_room_store(os.environ.get('ROOM_STORE_URL'))
+# Modèles de backlog importés une fois, partagés en lecture seule par leurs salles (voir poker/templates.py)
+backlog_templates = TemplateRegistry(int(os.environ.get('TEMPLATE_MAX_COUNT', 50)))
+# Un verrou par salle (transitions atomiques) et un verrou court pour créer/supprimer (voir poker/locks.py)
+room_locks = RoomLocks(rooms)
+# Index inverse sid -> (salle, pseudo) pour les recherches en temps constant.
+# Un sid est toujours servi par le même worker : ce registre reste local au processus.
+connections = ConnectionRegistry()
+# Éviction des salles inactives (TTL) et limites mémoire (0 = illimité)
+lifecycle = RoomLifecycle(rooms,
+                          idle_ttl=int(os.environ.get('ROOM_IDLE_TTL', 3600)),
+                          max_rooms=int(os.environ.get('ROOM_MAX_COUNT', 0)),
+                          max_bytes=int(os.environ.get('ROOM_MAX_BYTES', 0)),
+                          locks=room_locks)
+if os.environ.get('ROOM_SNAPSHOT_DIR'):
+    # Sauvegarde du backlog estimé avant la suppression d'une salle
+    lifecycle.add_hook(backlog_snapshot_hook(os.environ['ROOM_SNAPSHOT_DIR']))
+
+# Latences des handlers et des routes, émissions par type et taille de salle (GET /metrics).
+# Les handlers Socket.IO sont enveloppés en fin de module, une fois tous déclarés.
+metrics = Instrumentation()
+metrics.instrument_flask(app)
+metrics.registry.gauge('poker_rooms', "Salles en mémoire.", lambda: len(rooms))
+metrics.registry.gauge('poker_participants', "Connexions inscrites dans une salle.", lambda: len(connections))
+# Profileur par échantillonnage, activable à chaud (POST /metrics/profile)
+profiler = SamplingProfiler(interval=int(os.environ.get('PROFILER_INTERVAL_MS', 10)) / 1000)
+metrics.registry.gauge('poker_profiler_samples', "Échantillons relevés par le profileur.",
+                       lambda: profiler.samples)
+if os.environ.get('PROFILER_ENABLED') == '1':
+    profiler.start()
+
+# Débit des événements par connexion (SOCKET_RATE_LIMITS) et déconnexion des clients
+# qui ne lisent plus leurs messages (SOCKET_MAX_QUEUE) : voir poker/ratelimit.py
+rate_limiter = RateLimiter(limits_from_env())
+slow_consumers = SlowConsumerGuard(int(os.environ.get('SOCKET_MAX_QUEUE', 1000)))
+metrics.registry.gauge('poker_socketio_events_dropped', "Événements ignorés (débit dépassé).",
+                       lambda: rate_limiter.dropped)
+metrics.registry.gauge('poker_slow_consumers_disconnected', "Clients lents déconnectés.",
+                       lambda: slow_consumers.disconnected)
+
+def locked_room_state(room_id):
+    """
+    @brief Copie de l'état d'une salle prise sous son verrou (snapshots écrits hors du verrou).
+    """
+    with room_locks.hold(room_id):
+        room_data = rooms.get_room(room_id)
+        return to_plain(room_data) if room_data is not None else None
+
+
+# Journal d'événements (EVENT_LOG_DIR) : les salles survivent à un arrêt ou un redéploiement
+journal = None
+if os.environ.get('EVENT_LOG_DIR'):
+    # Le journal est local à chaque worker : sur un stockage partagé, chaque worker
+    # rejouerait au démarrage les mêmes événements (et Redis garde déjà les salles)
+    if rooms.shared:
+        raise ValueError("EVENT_LOG_DIR n'est utilisable qu'avec le stockage en mémoire (sans ROOM_STORE_URL).")
+    journal = EventLog(os.environ['EVENT_LOG_DIR'],
+                       fsync_interval=int(os.environ.get('EVENT_LOG_FSYNC_MS', 50)) / 1000,
+                       snapshot_every=int(os.environ.get('EVENT_LOG_SNAPSHOT_EVERY', 1000)),
+                       segment_bytes=int(os.environ.get('EVENT_LOG_SEGMENT_BYTES', 16 * 1024 * 1024)),
+                       start_task=socketio.start_background_task,
+                       sleep=socketio.sleep)
+    # Au démarrage, les salles sont reconstruites à partir des snapshots et du journal
+    for restored_id, restored_data in journal.replay().items():
+        if restored_id not in rooms:
+            rooms.create_room(restored_id, restored_data)
+            lifecycle.touch(restored_id)
+    journal.set_state_source(locked_room_state)
+    atexit.register(journal.close)
+
+
+def journal_event(room_id, event_type, data):
+    """
+    @brief Ajoute une modification durable au journal (si EVENT_LOG_DIR est configuré).
+    """
+    if journal is not None:
+        journal.append(room_id, event_type, data)
+
+
+def broadcast_patch(room_id, patch_type, data, msg=None, skip_sid=None):
+    """
+    @brief Diffuse un patch d'état versionné à tous les clients d'une salle.
+
+    @param room_id Identifiant de la salle
+    @param patch_type Type du patch (voir state_sync.PATCH_TYPES)
+    @param data Données du patch
+    @param msg Message optionnel pour le journal d'activité
+    @param skip_sid SID à exclure de la diffusion (ex: client qui reçoit un snapshot)
+    """
+    # Les votes en attente partent d'abord : les révisions restent dans l'ordre
+    vote_buffer.flush(room_id)
+    return emit_patch(room_id, patch_type, data, msg, skip_sid)
+
+def emit_patch(room_id, patch_type, data, msg=None, skip_sid=None):
+    """
+    @brief Diffuse immédiatement un patch, sans passer par le tampon des votes.
+    """
+    lifecycle.touch(room_id)
+    revision = rooms.next_revision(room_id)
+    if revision is None:  # Salle supprimée entre-temps (par un autre worker)
+        return None
+    patch = state_sync.make_patch(revision, patch_type, data, msg)
+    socketio.emit('state_patch', patch, to=room_id, skip_sid=skip_sid)
+    return patch
+
+def flush_votes(room_id, votes, progress):
+    """
+    @brief Diffuse les votes regroupés d'une salle (un patch par fenêtre).
+    """
+    if room_id in rooms:
+        emit_patch(room_id, 'votes_cast', {'votes': votes, 'progress': progress})
+
+# Regroupement des votes par salle (COALESCE_WINDOW_MS=0 : un patch par vote)
+vote_buffer = VoteCoalescer(on_flush=flush_votes,
+                            window=int(os.environ.get('COALESCE_WINDOW_MS', 50)) / 1000,
+                            start_task=socketio.start_background_task,
+                            sleep=socketio.sleep,
+                            room_lock=room_locks.hold)
 
 # --- Routes Flask Classiques (Gestion des pages) ---
 
@@ -113,51 +217,42 @@ def home():
     Permet de créer ou rejoindre une session de Planning Poker.
     """
     # Cette page contiendra les formulaires pour 'Créer' ou 'Rejoindre'
-    return render_template('home.html') 
+    return render_template('home.html', rules=consensus.available_rules(),
+                           templates=backlog_templates.summaries())
 
-@app.route('/create_room', methods=['POST'])
-def create_room():
+def upload_backlog(backlog_file, username):
     """
-    @brief Création d'une nouvelle salle Planning Poker.
+    @brief Import en flux d'un backlog envoyé par formulaire (JSON, NDJSON ou CSV).
 
-    - Génère un identifiant unique de salle
-    - Charge et valide le backlog JSON
-    - Définit l'utilisateur comme administrateur
+    @return tuple (tâches, éléments rejetés, réponse d'erreur ou None)
     """
-    # 1. Récupération des données du formulaire
-    username = request.form['username']
-    session_name = request.form['session_name']
-    session_type = request.form['session_type']
-    backlog_file = request.files.get('backlog_file')
-    
-    # 2. Gestion et parsing du fichier JSON
-    parsed_backlog = []
-    if backlog_file and backlog_file.filename.endswith('.json'):
-        try:
-            # Lire le contenu du fichier
-            file_content = backlog_file.read().decode('utf-8')
-            backlog_data = json.loads(file_content)
-            
-            # Formater le backlog en ajoutant la structure de vote vide
-            for item in backlog_data:
-                # Assurez-vous que l'item contient au moins un 'name' (ou 'nom') et une 'description'
-                parsed_backlog.append({
-                    "name": item.get('name') or item.get('nom', 'Tâche sans nom'),
-                    "description": item.get('description', 'Pas de description fournie.'),
-                    "votes": {} # Dictionnaire vide pour les votes des participants
-                })
-        except json.JSONDecodeError:
-            print("Erreur: Le fichier téléchargé n'est pas un JSON valide.")
-            # Gérer l'erreur utilisateur
-            return "Erreur: Le fichier backlog n'est pas un JSON valide.", 400
-        except Exception as e:
-            print(f"Erreur lors du traitement du fichier: {e}")
-            return "Erreur lors du traitement du fichier.", 500
+    try:
+        # Les tâches sont lues une par une ; les éléments invalides sont signalés, pas bloquants
+        parsed_backlog, import_errors = import_backlog(
+            backlog_file.stream,
+            backlog_file.filename,
+            max_bytes=app.config['BACKLOG_MAX_BYTES'],
+            max_items=app.config['BACKLOG_MAX_ITEMS'])
+    except BacklogTooLargeError as e:
+        log_event('backlog_rejected', str(e), level=logging.WARNING, user=username, status=413)
+        return None, None, (f"Erreur: {e}", 413)
+    except BacklogImportError as e:
+        log_event('backlog_rejected', str(e), level=logging.WARNING, user=username, status=400)
+        # Gérer l'erreur utilisateur
+        return None, None, (f"Erreur: {e}", 400)
+    except Exception as e:
+        log_event('backlog_error', "Erreur lors du traitement du fichier", level=logging.ERROR,
+                  exc_info=True, user=username)
+        return None, None, ("Erreur lors du traitement du fichier.", 500)
+    return parsed_backlog, import_errors, None
+
+def new_room_data(session_name, session_type, username, backlog, import_errors):
+    """
+    @brief État initial d'une salle.
 
-    # 3. Création et initialisation de la salle
-    room_id = str(uuid.uuid4()).split('-')[0].upper()
-    
-    rooms[room_id] = {
+    @param backlog Liste de tâches importées, ou SharedBacklog d'un modèle (voir poker/templates.py)
+    """
+    return {
         # ------------------ Métadonnées de la Session ------------------
         "session_name": session_name,          # Nom convivial de la session
         "session_type": session_type,          # Règle de consensus (strict, median, average)
@@ -165,7 +260,8 @@ def create_room():
         "admin_sid": None,                # ID de connexion SocketIO de l'admin (pour contrôle)
         
         # ------------------ Backlog et Progression ------------------
-        "backlog": parsed_backlog,             # Liste des tâches chargées
+        "backlog": backlog,                    # Liste des tâches chargées
+        "import_errors": import_errors,        # Éléments du fichier rejetés à l'import (index/ligne)
         "current_story_index": 0,              # Index de la tâche actuellement votée
         
         # ------------------ État de la Manche en Cours ------------------
@@ -179,15 +275,159 @@ def create_room():
         "timer_end_time": None,                # Timestamp de fin du timer (pour synchronisation serveur/client)
         
         # ------------------ Participants ------------------
-        "participants": {}                     # {'sid': 'pseudo'} - Liste des participants connectés
+        "participants": {},                    # {'sid': 'pseudo'} - Liste des participants connectés
+        "tally": tally.empty_tally(),          # Agrégats de la manche (compte, somme, histogramme)
+
+        # ------------------ Synchronisation ------------------
+        "revision": 0                          # Révision de l'état, incrémentée à chaque patch
     }
+
+def provision_room(room_data):
+    """
+    @brief Enregistre une salle sous un identifiant neuf (stockage, journal, suivi d'activité).
+
+    @return Identifiant de la salle
+    """
+    while True:
+        room_id = str(uuid.uuid4()).split('-')[0].upper()
+        try:
+            room_locks.create_room(room_id, room_data)  # Refuse un identifiant déjà pris
+            break
+        except KeyError:
+            continue
+    if journal is not None:
+        # Le journal garde les tâches en clair : une salle restaurée a son propre backlog
+        journal_event(room_id, 'create', to_plain(room_data))
+    lifecycle.touch(room_id)
+    return room_id
+
+def enforce_room_limits():
+    """
+    @brief Applique les limites de salles et lance le balayage périodique des salles inactives.
+    """
+    lifecycle.enforce_capacity(include_bytes=False)
+    lifecycle.start(socketio.start_background_task, socketio.sleep,
+                    interval=int(os.environ.get('ROOM_SWEEP_INTERVAL', 60)))
+
+def remember_admin_rooms(room_ids):
+    """
+    @brief Salles administrées par ce navigateur (export du backlog), les plus récentes seulement.
+    """
+    session['admin_rooms'] = (session.get('admin_rooms', []) + list(room_ids))[-ADMIN_ROOMS_PER_SESSION:]
+
+@app.route('/create_room', methods=['POST'])
+def create_room():
+    """
+    @brief Création d'une nouvelle salle Planning Poker.
+
+    - Génère un identifiant unique de salle
+    - Charge et valide le backlog JSON (ou reprend un modèle de backlog : template_id)
+    - Définit l'utilisateur comme administrateur
+    """
+    # 1. Récupération des données du formulaire
+    username = request.form['username']
+    session_name = request.form['session_name']
+    session_type = request.form['session_type']
+    backlog_file = request.files.get('backlog_file')
+    template_id = request.form.get('template_id')
+    
+    # 2. Backlog : modèle partagé (déjà validé) ou import en flux du fichier
+    parsed_backlog = []
+    import_errors = []
+    if template_id:
+        template = backlog_templates.get(template_id)
+        if template is None:
+            return f"Erreur: Le modèle de backlog **{escape(template_id)}** n'existe pas.", 404
+        parsed_backlog, import_errors = template.backlog(), list(template.import_errors)
+    elif backlog_file and backlog_file.filename:
+        parsed_backlog, import_errors, error = upload_backlog(backlog_file, username)
+        if error is not None:
+            return error
+
+    # 3. Création et initialisation de la salle
+    room_id = provision_room(new_room_data(session_name, session_type, username,
+                                           parsed_backlog, import_errors))
     
-    # 4. Stocker le nom de l'utilisateur dans la session Flask
+    # 4. Limites (TTL, nombre de salles) et balayage périodique des salles inactives
+    enforce_room_limits()
+
+    # 5. Stocker le nom de l'utilisateur dans la session Flask
     session['username'] = username
+    remember_admin_rooms([room_id])
     
-    print(f"Salle créée: {room_id} | Session: {session_name} par {username}")
+    log_event('room_created', "Salle créée", room=room_id, session=session_name, user=username)
     return redirect(url_for('room', room_id=room_id))
 
+@app.route('/templates', methods=['GET', 'POST'])
+def backlog_templates_route():
+    """
+    @brief Modèles de backlog : liste (GET) ou import d'un modèle (POST).
+
+    POST (formulaire multipart) : backlog_file, name (optionnel, nom du fichier par défaut).
+    Le fichier est importé et validé une fois, avec les limites de /create_room.
+    Le modèle reste dans la mémoire de ce processus ; avec RedisRoomStore, chaque
+    salle créée depuis le modèle stocke une copie complète de son backlog.
+    @return JSON résumé du modèle (201) ou {'templates': [...]}
+    """
+    if request.method == 'GET':
+        return jsonify({'templates': backlog_templates.summaries()})
+
+    backlog_file = request.files.get('backlog_file')
+    if not backlog_file or not backlog_file.filename:
+        return jsonify({'error': 'Fichier backlog_file requis.'}), 400
+    parsed_backlog, import_errors, error = upload_backlog(backlog_file, session.get('username'))
+    if error is not None:
+        message, status = error
+        return jsonify({'error': message}), status
+    template = backlog_templates.add(request.form.get('name') or backlog_file.filename,
+                                     parsed_backlog, import_errors)
+    log_event('template_created', "Modèle de backlog importé", template=template.template_id,
+              stories=len(template.stories))
+    return jsonify(template.summary()), 201
+
+@app.route('/templates/<template_id>/rooms', methods=['POST'])
+def provision_template_rooms(template_id):
+    """
+    @brief Crée N salles à partir d'un modèle de backlog, en une requête.
+
+    Corps JSON : count (1 à TEMPLATE_BATCH_MAX), session_name (suffixé « #i »
+    si count > 1), session_type (règle de consensus, 'average' par défaut), admin_name.
+    Les salles créées sont ajoutées aux salles administrées par la session.
+    Elles partagent les tâches du modèle avec le stockage en mémoire seulement :
+    RedisRoomStore écrit le backlog complet dans chaque salle (count copies).
+    @return JSON {'template', 'rooms': [{'room_id', 'session_name', 'url'}]} (201)
+    """
+    template = backlog_templates.get(template_id)
+    if template is None:
+        return jsonify({'error': 'Modèle de backlog introuvable.'}), 404
+    body = request.get_json(silent=True) or {}
+    count = body.get('count', 1)
+    if not isinstance(count, int) or isinstance(count, bool) \
+            or not 1 <= count <= app.config['TEMPLATE_BATCH_MAX']:
+        return jsonify({'error': f"count doit être un entier entre 1 et {app.config['TEMPLATE_BATCH_MAX']}."}), 400
+    session_type = body.get('session_type', 'average')
+    if session_type not in consensus.RULES:
+        return jsonify({'error': f'Règle de consensus inconnue : {session_type}'}), 400
+    if lifecycle.max_rooms and count > lifecycle.max_rooms:
+        return jsonify({'error': f'Au plus {lifecycle.max_rooms} salles (ROOM_MAX_COUNT).'}), 409
+    admin_name = body.get('admin_name') or session.get('username', 'admin')
+    base_name = body.get('session_name') or template.name
+
+    created = []
+    for i in range(count):
+        session_name = f'{base_name} #{i + 1}' if count > 1 else base_name
+        room_id = provision_room(new_room_data(session_name, session_type, admin_name,
+                                               template.backlog(), list(template.import_errors)))
+        created.append({'room_id': room_id, 'session_name': session_name,
+                        'url': url_for('room', room_id=room_id)})
+    enforce_room_limits()
+
+    session.setdefault('username', admin_name)
+    remember_admin_rooms(room['room_id'] for room in created)
+    log_event('rooms_provisioned', "Salles créées depuis un modèle", template=template_id,
+              count=count, user=admin_name)
+    return jsonify({'template': template_id, 'rooms': created}), 201
+
 @app.route('/join_room', methods=['POST'])
 def join_existing_room():
     """
@@ -203,13 +443,14 @@ def join_existing_room():
     if room_id in rooms:
         # Stocker le pseudo dans la session Flask
         session['username'] = username
-        print(f"Tentative de jointure de salle: {room_id} | Session: {session_name} par {username}")
+        log_event('room_join_request', "Tentative de jointure de salle", room=room_id,
+                  session=session_name, user=username)
         # Redirection vers la page de la salle, où l'événement SocketIO 'join' sera géré
         return redirect(url_for('room', room_id=room_id))
     else:
         # Gérer l'erreur si la salle n'existe pas
         # NOTE: Pour une meilleure UX, vous devriez afficher ce message sur la page home.
-        return f"Erreur: La session avec l'ID **{room_id}** n'existe pas.", 404
+        return f"Erreur: La session avec l'ID **{escape(room_id)}** n'existe pas.", 404
 
 
 @app.route('/room/<room_id>')
@@ -223,7 +464,132 @@ def room(room_id):
         
     return render_template('room.html', 
                            room_id=room_id, 
-                           username=session['username'])
+                           username=session['username'],
+                           socketio_serializer=SOCKETIO_SERIALIZER)
+
+@app.route('/room/<room_id>/backlog')
+def backlog_page(room_id):
+    """
+    @brief Fenêtre du backlog d'une salle (liste virtualisée de la page salle).
+
+    Paramètres : offset (défaut 0) et limit (défaut BACKLOG_PAGE_SIZE, borné par BACKLOG_PAGE_MAX).
+    @return JSON {'count', 'offset', 'items': [tâche + 'index']}
+    """
+    if 'username' not in session:
+        return jsonify({'error': 'Session utilisateur requise.'}), 403
+    if room_id not in rooms:
+        return jsonify({'error': 'Salle introuvable.'}), 404
+
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', app.config['BACKLOG_PAGE_SIZE'], type=int)
+    limit = min(max(limit, 1), app.config['BACKLOG_PAGE_MAX'])
+    count, stories = rooms.backlog_page(room_id, offset, limit)
+    return jsonify({
+        'count': count,
+        'offset': offset,
+        'items': [dict(story, index=offset + i) for i, story in enumerate(stories)]
+    })
+
+def export_authorized(room_id):
+    """
+    @brief Contrôle d'accès de l'export : administrateur de la salle ou EXPORT_TOKEN.
+
+    L'administrateur est reconnu à sa session Flask (salle créée depuis ce navigateur).
+    Avec EXPORT_TOKEN, l'en-tête `Authorization: Bearer <jeton>` ouvre l'export de toute salle.
+    """
+    token = os.environ.get('EXPORT_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return room_id in session.get('admin_rooms', [])
+
+@app.route('/room/<room_id>/export')
+def export_backlog(room_id):
+    """
+    @brief Export du backlog estimé, envoyé en flux (réponse découpée).
+
+    Paramètres : format (json, csv ou ndjson ; défaut json) et fields
+    (champs optionnels séparés par des virgules parmi final_vote, consensus_rule, votes ;
+    tous par défaut, chaîne vide pour aucun).
+    """
+    if not export_authorized(room_id):
+        return jsonify({'error': "Export réservé à l'administrateur de la salle."}), 403
+    if room_id not in rooms:
+        return jsonify({'error': 'Salle introuvable.'}), 404
+    fmt = request.args.get('format', 'json').lower()
+    try:
+        fields = export.parse_fields(request.args.get('fields'))
+        chunks = export.stream_export(guarded_backlog(room_id), fmt, fields)
+    except export.ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    mimetype, extension = export.EXPORT_FORMATS[fmt]
+    log_event('backlog_download', "Export du backlog", room=room_id, format=fmt)
+    return Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="backlog_{room_id}.{extension}"',
+        'Cache-Control': 'no-store',
+    })
+
+def guarded_backlog(room_id):
+    """
+    @brief Tâches du backlog pour l'export ; une salle supprimée en cours d'envoi termine le flux.
+    """
+    try:
+        yield from rooms.iter_backlog(room_id, batch_size=app.config['BACKLOG_PAGE_MAX'])
+    except KeyError:
+        log_event('export_interrupted', "Salle supprimée pendant l'export", level=logging.WARNING,
+                  room=room_id)
+
+@app.route('/stats')
+def stats():
+    """
+    @brief Compteurs des salles (vivantes, évincées) et des votes regroupés.
+    """
+    return jsonify(dict(lifecycle.stats(), coalescing=vote_buffer.stats(),
+                        throttling={'dropped_events': rate_limiter.dropped,
+                                    'slow_consumers_disconnected': slow_consumers.disconnected}))
+
+def metrics_authorized(local_only=False):
+    """
+    @brief Contrôle d'accès des routes d'observation.
+
+    Avec METRICS_TOKEN, l'en-tête `Authorization: Bearer <jeton>` est exigé.
+    Sans jeton, /metrics est ouvert et le profileur n'accepte que la machine locale.
+    """
+    token = os.environ.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    return not local_only or request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    @brief Métriques au format texte Prometheus.
+    """
+    if not metrics_authorized():
+        return jsonify({'error': 'Accès refusé.'}), 403
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/metrics/profile', methods=['GET', 'POST'])
+def profiler_control():
+    """
+    @brief Pilotage du profileur par échantillonnage.
+
+    POST JSON {'enabled': bool, 'interval_ms': int, 'reset': bool} : démarre ou arrête.
+    GET : piles au format folded (paramètre limit : nombre de piles).
+    """
+    if not metrics_authorized(local_only=True):
+        return jsonify({'error': 'Accès refusé.'}), 403
+    if request.method == 'GET':
+        return Response(profiler.folded(request.args.get('limit', type=int)), mimetype='text/plain')
+    options = request.get_json(silent=True) or {}
+    if options.get('reset'):
+        profiler.reset()
+    if options.get('enabled') is True:
+        interval_ms = options.get('interval_ms')
+        profiler.start(interval=interval_ms / 1000 if isinstance(interval_ms, int) and interval_ms > 0 else None)
+    elif options.get('enabled') is False:
+        profiler.stop()
+    return jsonify(profiler.stats())
 
 # --- Gestion des Événements SocketIO (Temps Réel) ---
 
@@ -234,158 +600,256 @@ def on_join(data):
     """
     username = data.get('username')
     room_id = data.get('room_id')
-    
-    if room_id in rooms and username:
-        room_data = rooms[room_id] # Référence aux données de la salle
-        
+    previous = None
+
+    with room_locks.hold(room_id):
+        room_data = rooms.get_room(room_id) if room_id else None
+        if room_data is None or not username:
+            return emit('error', {'msg': 'Erreur lors de la jointure de la salle.'})
+
         # 1. Joindre le canal de la salle
         join_room(room_id)
         
-        # 2. Enregistrer l'utilisateur (sid) et son nom dans la salle
-        room_data['participants'][request.sid] = username
+        # 2. Enregistrer l'utilisateur (sid) et son nom dans la salle et le registre
+        previous = connections.register(request.sid, room_id, username)
+        rooms.add_participant(room_id, request.sid, username)
         
         # 3. CORRECTION 2 : Définir l'admin_sid si c'est la première connexion de l'admin
         # Nous supposons que l'administrateur est le premier à se connecter via SocketIO
         # ET que son nom correspond au 'admin_name' défini à la création de la salle.
         if room_data['admin_sid'] is None and username == room_data['admin_name']:
-             room_data['admin_sid'] = request.sid
-        
-        # Enregistrer le pseudo dans la structure : { 'sid': 'pseudo' }
-        rooms[room_id]['participants'][request.sid] = username
-        
-        # Envoyer la liste complète des participants (pseudos)
-        # On utilise values() pour avoir uniquement les pseudos dans le front
-        current_participants = list(rooms[room_id]['participants'].values())
-        
-        emit('status', 
-             {'msg': f'{username} a rejoint la salle.',
-              'participants': current_participants, # <- Envoi des PSEUDOS
-              'current_state': rooms[room_id]}, 
-             room=room_id)
-        
-        print(f"{username} a rejoint la salle {room_id}")
-    else:
-        emit('error', {'msg': 'Erreur lors de la jointure de la salle.'})
+             rooms.update_room(room_id, admin_sid=request.sid)
+        
+        # 4. Les autres clients reçoivent un patch, le nouveau venu un snapshot complet
+        room_data = rooms.get_room(room_id)
+        broadcast_patch(room_id, 'participant_joined',
+                        {'sid': request.sid, 'username': username,
+                         'progress': round_progress(room_data)},
+                        msg=f'{username} a rejoint la salle.',
+                        skip_sid=request.sid)
+        emit('state_snapshot', state_sync.snapshot(room_data), room=request.sid)
+
+    if previous and previous.room_id != room_id:
+        # Le même sid change de salle : on le retire de l'ancienne (jamais deux verrous de salle à la fois)
+        with room_locks.hold(previous.room_id) as exists:
+            if exists:
+                # Comme on_disconnect : le sid quitte le canal et l'ancienne salle est prévenue
+                removed = rooms.remove_participant(previous.room_id, request.sid)
+                if removed is not None:
+                    journal_event(previous.room_id, 'leave', {'u': removed})  # Son vote est retiré
+                old_username = removed or previous.username
+                leave_room(previous.room_id)
+                broadcast_patch(previous.room_id, 'participant_left',
+                                {'sid': request.sid, 'username': old_username,
+                                 'progress': round_progress(rooms.get_room_state(previous.room_id))},
+                                msg=f'{old_username} a quitté la salle.')
+    
+    # Surveillance des files d'envoi, lancée avec la première connexion à une salle
+    slow_consumers.start(socketio.server.eio, socketio.start_background_task, socketio.sleep)
+    log_event('join', "Participant entré", room=room_id, user=username)
 
 @socketio.on('disconnect')
 def on_disconnect():
     """
     @brief Gestion de la déconnexion d'un participant.
     """
-    # Trouver l'utilisateur et la salle qu'il quitte
-    for room_id, room_data in rooms.items():
-        if request.sid in room_data['participants']:
-            # On récupère le pseudo (username) grâce au request.sid
-            username = room_data['participants'].pop(request.sid)
-            
-            # Retirer le vote de l'utilisateur (on avait besoin de la clé 'username' ici)
-            # NOTE: Pour gérer les votes plus tard, il faudra stocker le vote par PSEUDO ou SID.
-            # Simplifions pour l'instant la structure de vote par PSEUDO pour la clarté :
-            if username in room_data['votes']:
-                 room_data['votes'].pop(username)
-                 
-            current_participants = list(room_data['participants'].values())
-                 
-            # Notifier la salle que l'utilisateur est parti
-            emit('status', 
-                 {'msg': f'{username} a quitté la salle.',
-                  'participants': current_participants, # <- Envoi des PSEUDOS mis à jour
-                  'current_state': room_data}, 
-                 room=room_id)
-            
-            leave_room(room_id)
-            print(f"{username} a quitté la salle {room_id}")
+    # Trouver l'utilisateur et la salle qu'il quitte grâce au registre (O(1))
+    connection = connections.unregister(request.sid)
+    if connection is None:
+        return
+
+    room_id = connection.room_id
+    with room_locks.hold(room_id) as exists:
+        if not exists:
             return
+        # Retirer le participant et son vote (les votes sont stockés par PSEUDO)
+        removed = rooms.remove_participant(room_id, request.sid)
+        if removed is not None:
+            journal_event(room_id, 'leave', {'u': removed})
+        username = removed or connection.username
+             
+        # Notifier la salle que l'utilisateur est parti
+        leave_room(room_id)
+        broadcast_patch(room_id, 'participant_left',
+                        {'sid': request.sid, 'username': username,
+                         'progress': round_progress(rooms.get_room_state(room_id))},
+                        msg=f'{username} a quitté la salle.')
+    
+    log_event('leave', "Participant parti", room=room_id, user=username)
 
 # ... (Après on_join, on_disconnect, et submit_vote)
 
+def round_progress(room_data, round_tally=None):
+    """
+    @brief Avancement de la manche (votants / participants) à partir des agrégats.
+
+    @param round_tally Agrégats à utiliser (par défaut ceux de la salle)
+    @return dict {'voted', 'total', 'voted_all'}
+    """
+    if round_tally is None:
+        round_tally = room_data.get('tally') or tally.empty_tally()
+    return tally.progress(round_tally, len(room_data['participants']))
+
+def is_room_admin(room_data):
+    """
+    @brief Indique si la connexion courante est celle de l'administrateur de la salle.
+    """
+    return room_data is not None and request.sid == room_data.get('admin_sid')
+
+def room_transition(handler):
+    """
+    @brief Exécute un handler sous le verrou de la salle data['room_id'] (voir poker/locks.py).
+
+    Les vérifications et les modifications du handler forment une seule transition
+    atomique ; les handlers des autres salles s'exécutent en parallèle.
+    """
+    @functools.wraps(handler)
+    def locked(data, *args):
+        with room_locks.hold(data.get('room_id') if isinstance(data, dict) else None):
+            return handler(data, *args)
+    return locked
+
 @socketio.on('start_session')
+@room_transition
 def on_start_session(data):
     """ @brief Démarre la session de vote, avec ou sans timer."""
     room_id = data.get('room_id')
     use_timer = data.get('use_timer', False)
     duration = data.get('duration', 60)
+    room_data = rooms.get_room(room_id) if room_id else None
     
-    if room_id in rooms and request.sid == rooms[room_id].get('admin_sid'):
-        room_data = rooms[room_id]
-        
+    if is_room_admin(room_data):
         if not room_data['backlog']:
              return emit('error', {'msg': 'Le backlog est vide. Impossible de démarrer.'}, room=request.sid)
 
-        room_data['is_started'] = True
-        room_data['use_timer'] = use_timer
-        room_data['timer_duration'] = int(duration)
-        room_data['is_revealed'] = False
-        room_data['votes'] = {} # Réinitialisation des votes au démarrage
+        rooms.update_room(room_id,
+                          is_started=True,
+                          use_timer=use_timer,
+                          timer_duration=int(duration))
+        rooms.clear_votes(room_id) # Réinitialisation des votes au démarrage
+        journal_event(room_id, 'start', {'use_timer': use_timer, 'timer_duration': int(duration)})
         
-        emit('session_started', {
-            'is_started': True,
-            'use_timer': use_timer,
-            'duration': room_data['timer_duration'],
-            'current_story': room_data['backlog'][room_data['current_story_index']]
-        }, room=room_id)
+        # Si un timer est utilisé, le serveur programme la révélation automatique
+        timer_end_time = start_round_timer(room_id, use_timer, int(duration))
         
-        # Si un timer est utilisé, on lance la logique de fin de timer
-        if use_timer:
-            # NOTE: La logique de décompte réel (thread) est complexe et sera simplifiée en JS pour l'instant
-            # mais le serveur doit garder une trace pour la révélation automatique
-            pass # Ici, dans un vrai système, vous lanceriez un thread pour la révélation auto
+        broadcast_patch(room_id, 'session_started', {
+            'use_timer': use_timer,
+            'duration': int(duration),
+            'timer_end_time': timer_end_time,
+            'progress': round_progress(room_data, tally.empty_tally())
+        })
 
 
-@socketio.on('reveal_votes')
-def on_reveal_votes(data):
-    """ @brief Révèle les votes (manuellement ou par timer) et calcule le consensus."""
-    room_id = data.get('room_id')
+def start_round_timer(room_id, use_timer, duration):
+    """
+    @brief Programme (ou annule) l'échéance de la manche en cours.
+
+    @return Timestamp de fin du timer (secondes epoch), ou None sans timer
+    """
+    if not use_timer:
+        deadlines.cancel(room_id)
+        timer_end_time = None
+    else:
+        deadlines.schedule(room_id, duration)
+        timer_end_time = time.time() + duration
+    rooms.update_room(room_id, timer_end_time=timer_end_time)
+    return timer_end_time
+
+
+def reveal_room(room_id):
+    """
+    @brief Révèle les votes d'une salle et calcule le consensus.
+
+    Utilisée par l'admin (reveal_votes) et par l'expiration du timer.
+    @return True si la révélation a eu lieu (False si déjà révélée)
+    """
+    # Appelée aussi par le timer : la transition se fait sous le verrou de la salle
+    with room_locks.hold(room_id):
+        room_data = rooms.get_room_state(room_id)  # Sans le backlog, lu tâche par tâche
     
-    if room_id in rooms and request.sid == rooms[room_id].get('admin_sid'):
-        room_data = rooms[room_id]
-        
-        if room_data['is_revealed']:
-             return 
+        # Vérification et passage à l'état révélé en une seule opération atomique
+        if room_data is None or not rooms.try_reveal(room_id):
+             return False
 
-        room_data['is_revealed'] = True
+        # La manche est terminée : son échéance éventuelle n'a plus lieu d'être
+        deadlines.cancel(room_id)
         current_index = room_data['current_story_index']
-        
-        # --- CALCUL DU RÉSULTAT ---
+        votes = room_data['votes']  # Copie {pseudo: carte} lue une fois
+    
+        # --- CALCUL DU RÉSULTAT (valeurs triées déduites de l'histogramme de la manche) ---
+        round_tally = room_data.get('tally')
         final_result, calculation_details = calculate_consensus(
-            room_data['votes'], 
-            room_data['session_type']
+            votes, 
+            room_data['session_type'],
+            # Agrégats ignorés s'ils ne couvrent pas tous les votes (salle modifiée hors du stockage)
+            histogram=round_tally['histogram'] if round_tally and round_tally['count'] == len(votes) else None
         )
-        
+    
         # --- ENREGISTREMENT DU RÉSULTAT DANS LE BACKLOG ---
-        if current_index < len(room_data['backlog']):
-            # Assurez-vous que l'index est valide
-            room_data['backlog'][current_index]['final_vote'] = final_result
-            room_data['backlog'][current_index]['consensus_rule'] = room_data['session_type']
-            room_data['backlog'][current_index]['votes_submitted'] = room_data['votes'] # Optionnel: Sauvegarde des votes bruts
+        if current_index < rooms.backlog_length(room_id):
+            # Assurez-vous que l'index est valide (les votes bruts sont aussi sauvegardés)
+            rooms.save_story_result(room_id, current_index, final_result,
+                                    room_data['session_type'], votes)
+        journal_event(room_id, 'reveal', {'i': current_index, 'result': final_result,
+                                          'rule': room_data['session_type'], 'votes': votes})
         # ---------------------------------------------------
-        
-        # 1. Émettre l'événement de révélation avec le résultat
-        emit('votes_revealed', {
-            'votes': room_data['votes'],
+    
+        # Émettre le patch de révélation avec le résultat
+        broadcast_patch(room_id, 'votes_revealed', {
+            'votes': votes,
             'result': final_result,
-            'details': calculation_details
-        }, room=room_id)
-        
-        # 2. Envoyer un message de statut général
-        emit('status', 
-             {'msg': f"Les votes ont été révélés. Résultat ({room_data['session_type']}) : {final_result}",
-              'participants': list(room_data['participants'].values()),
-              'current_state': room_data}, 
-             room=room_id)
-        
-        print(f"Votes révélés dans la salle {room_id}. Résultat: {final_result}")
+            'details': calculation_details,
+            'rule': room_data['session_type'],
+            'index': current_index,
+            'progress': round_progress(room_data)
+        }, msg=f"Les votes ont été révélés. Résultat ({room_data['session_type']}) : {final_result}")
+    
+        log_event('reveal', "Votes révélés", room=room_id, result=final_result)
+        return True
+
+
+# Une seule tâche de fond gère les échéances de toutes les salles (pas de thread par salle)
+deadlines = DeadlineScheduler(on_expire=reveal_room,
+                              start_task=socketio.start_background_task,
+                              sleep=socketio.sleep)
+
+
+def on_room_evicted(room_id, room_data):
+    """
+    @brief Nettoie ce qui référence une salle évincée (timer, connexions, canal).
+    """
+    deadlines.cancel(room_id)
+    vote_buffer.discard(room_id)
+    journal_event(room_id, 'delete', {})
+    connections.discard_room(room_id)
+    if room_data['participants']:
+        socketio.emit('session_ended', {'msg': 'La salle a été fermée par le serveur.'}, to=room_id)
+    socketio.close_room(room_id)
+    log_event('room_evicted', "Salle évincée", room=room_id)
+
+lifecycle.add_hook(on_room_evicted)
+
+
+@socketio.on('reveal_votes')
+@room_transition
+def on_reveal_votes(data):
+    """ @brief Révèle les votes à la demande de l'admin (le timer passe par reveal_room)."""
+    room_id = data.get('room_id')
+    room_data = rooms.get_room_state(room_id) if room_id else None
+    
+    if is_room_admin(room_data):
+        reveal_room(room_id)
     else:
         emit('error', {'msg': 'Seul l\'administrateur peut révéler les votes.'}, room=request.sid)
 
 @socketio.on('next_task')
-
+@room_transition
 def on_next_task(data):
     """ @brief Passe à la tâche suivante (Admin only)."""
     room_id = data.get('room_id')
+    room_data = rooms.get_room_state(room_id) if room_id else None
     
-    if room_id in rooms and request.sid == rooms[room_id].get('admin_sid'):
-        room_data = rooms[room_id]
+    if is_room_admin(room_data):
         current_index = room_data['current_story_index']
         
         # VÉRIFICATION: S'assurer que le vote a été révélé avant de passer à la tâche suivante
@@ -393,127 +857,116 @@ def on_next_task(data):
             emit('error', {'msg': "Veuillez d'abord révéler les votes pour la tâche actuelle."}, room=request.sid)
             return
 
-        # 2. Vérification si toutes les tâches sont terminées
-        if current_index + 1 >= len(room_data['backlog']):
+        # 2. Vérification si toutes les tâches sont terminées (seule la tâche suivante est lue)
+        _, next_stories = rooms.backlog_page(room_id, current_index + 1, 1)
+        if not next_stories:
             emit('session_ended', {'msg': 'Toutes les tâches du backlog ont été estimées !'}, room=room_id)
             return
             
-        # 3. Préparation de la nouvelle manche
-        room_data['current_story_index'] += 1
-        new_index = room_data['current_story_index']
-        room_data['votes'] = {}
-        room_data['is_revealed'] = False
-        
-        use_timer = room_data.get('use_timer', False)
-        duration = room_data.get('timer_duration', 60)
-
-        emit('new_round', {
-            'current_story': room_data['backlog'][new_index],
-            'index': new_index,
-            'use_timer': use_timer,     # <-- DOIT ÊTRE PRÉSENT
-            'duration': duration
-        }, room=room_id)
-        
-        # Envoyer un message de statut général
-        emit('status', {
-            'msg': f"Passage à la tâche suivante : {room_data['backlog'][new_index]['name']}.",
-            'participants': list(room_data['participants'].values()),
-            'current_state': room_data,
-            'use_timer': use_timer,     # <-- AJOUT
-            'duration': duration
-        },  room=room_id)
+        # 3. Préparation de la nouvelle manche (index incrémenté, votes vidés)
+        new_index = rooms.advance_story(room_id)
+        journal_event(room_id, 'next', {'i': new_index})
+        timer_end_time = start_round_timer(room_id, room_data.get('use_timer', False),
+                                           room_data.get('timer_duration', 60))
+        
+        # Les clients ont déjà le backlog et la config du timer : seul l'index voyage
+        broadcast_patch(room_id, 'story_advanced',
+                        {'index': new_index, 'timer_end_time': timer_end_time,
+                         'progress': round_progress(room_data, tally.empty_tally())},
+                        msg=f"Passage à la tâche suivante : {next_stories[0]['name']}.")
         
 # Fichier : app.py
 
 @socketio.on('restart_vote')
+@room_transition
 def on_restart_vote(data):
     """ @brief Relance le vote pour la tâche actuelle (Admin only)."""
     room_id = data.get('room_id')
+    room_data = rooms.get_room_state(room_id) if room_id else None
     
-    if room_id in rooms and request.sid == rooms[room_id].get('admin_sid'):
-        room_data = rooms[room_id]
-        use_timer = room_data.get('use_timer', False)
-        duration = room_data.get('timer_duration', 60)
-        room_data['votes'] = {}
-        room_data['is_revealed'] = False
+    if is_room_admin(room_data):
+        rooms.clear_votes(room_id)
+        journal_event(room_id, 'restart', {})
+        timer_end_time = start_round_timer(room_id, room_data.get('use_timer', False),
+                                           room_data.get('timer_duration', 60))
         
-        emit('vote_restarted',{
-            'use_timer': use_timer,     # <-- AJOUT
-            'duration': duration
-        }, room=room_id)
-        
-        # Envoyer un message de statut général
-        emit('status', 
-             {'msg': "Le vote a été relancé par l'administrateur. Veuillez voter à nouveau.",
-              'participants': list(room_data['participants'].values()),
-              'current_state': room_data}, 
-             room=room_id)
+        broadcast_patch(room_id, 'vote_restarted',
+                        {'timer_end_time': timer_end_time,
+                         'progress': round_progress(room_data, tally.empty_tally())},
+                        msg="Le vote a été relancé par l'administrateur. Veuillez voter à nouveau.")
 
 @socketio.on('submit_vote')
+@room_transition
 def on_submit_vote(data):
     """
-    @brief Enregistrement du vote d'un participant.
+    @brief Enregistrement (ou retrait, avec un vote vide) du vote d'un participant.
     """
     room_id = data.get('room_id')
     username = data.get('username')
-    vote = data.get('vote')
+    vote = data.get('vote') or None  # '' ou None : le participant retire son vote
+    room_data = rooms.get_room_state(room_id) if room_id else None
+
+    if vote is not None and not isinstance(vote, str):
+        return emit('error', {'msg': "Vote invalide."}, room=request.sid)
     
     # Vérification (la salle doit exister et la session doit être démarrée)
-    if room_id in rooms and rooms[room_id].get('is_started'):
-        room_data = rooms[room_id]
-        
+    if room_data is not None and room_data.get('is_started'):
         # S'assurer que le vote n'est pas soumis après la révélation
         if room_data.get('is_revealed'):
              return emit('error', {'msg': "Impossible de voter après la révélation."}, room=request.sid)
 
-        # Enregistre le vote
-        if username in room_data['participants'].values():
-            room_data['votes'][username] = vote
-            
-            participants_count = len(room_data['participants'])
-            votes_count = len(room_data['votes'])
-            
-            current_participants = list(room_data['participants'].values())
-
-            # --- ÉMISSION CRUCIALE ---
-            # Envoyer l'événement pour mettre à jour l'interface de TOUS les clients.
-            emit('vote_submitted', {
-                'msg': f'{username} a voté.',
-                'participants': current_participants,
-                'current_state': room_data, # <--- ENVOI DE L'ÉTAT MIS À JOUR
-                'voted_all': (participants_count == votes_count)
-            }, room=room_id)
+        # Enregistre le vote (le registre garantit que ce sid a rejoint la salle sous ce pseudo)
+        if connections.lookup(request.sid) == (room_id, username):
+            # Les agrégats de la manche sont mis à jour avec le vote : aucun recomptage
+            if vote is None:
+                round_tally = rooms.withdraw_vote(room_id, username)
+            else:
+                try:
+                    round_tally = rooms.record_vote(room_id, username, vote)
+                except ValueError:  # Carte hors paquet refusée (voir model.CardTable)
+                    return emit('error', {'msg': "Vote invalide."}, room=request.sid)
+            journal_event(room_id, 'vote', {'u': username, 'v': vote})
+
+            # Seul le vote modifié voyage, avec l'avancement déjà calculé ;
+            # en rafale, les votes d'une même fenêtre partent en un seul patch
+            round_progress_data = round_progress(room_data, round_tally)
+            if vote_buffer.enabled:
+                vote_buffer.add_vote(room_id, username, vote, round_progress_data)
+            else:
+                broadcast_patch(room_id, 'vote_cast', {
+                    'username': username,
+                    'vote': vote,
+                    'progress': round_progress_data
+                })
             
-            print(f"Vote enregistré pour {username} dans la salle {room_id}: {vote}")
+            log_event('vote', "Vote enregistré", room=room_id, user=username, vote=vote)
                 
     else:
         emit('error', {'msg': "Impossible de voter. Session non démarrée ou salle introuvable."}, room=request.sid)
 
-# Fichier : app.py (Ajouter cette nouvelle fonction SocketIO)
-
-@socketio.on('request_backlog_download')
-def on_request_backlog_download(data):
+@socketio.on('request_state')
+@room_transition
+def on_request_state(data):
     """
-    @brief Envoie le backlog finalisé à l'administrateur.
+    @brief Renvoie un snapshot complet à un client dont la révision est périmée.
     """
     room_id = data.get('room_id')
-    
-    if room_id in rooms and request.sid == rooms[room_id].get('admin_sid'):
-        room_data = rooms[room_id]
-        
-        # Émettre l'événement de téléchargement UNIQUEMENT à l'admin demandeur
-        emit('backlog_updated', {
-            'backlog_data': room_data['backlog']
-        }, room=request.sid) 
-        
-        print(f"Admin de la salle {room_id} a demandé le téléchargement du backlog.")
+    room_data = rooms.get_room(room_id) if room_id else None
+
+    if room_data is not None:
+        if state_sync.is_stale(room_data, data.get('revision')):
+            emit('state_snapshot', state_sync.snapshot(room_data), room=request.sid)
     else:
-        emit('error', {'msg': "Action réservée à l'administrateur."}, room=request.sid)
+        emit('error', {'msg': 'Salle introuvable.'}, room=request.sid)
 
+# Tous les handlers sont déclarés : mesure de leur durée et des émissions,
+# puis limitation de débit en tête (un événement ignoré n'est pas mesuré)
+metrics.instrument_socketio(socketio)
+rate_limiter.instrument_socketio(socketio)
 
 if __name__ == '__main__':
     """
     @brief Point d'entrée principal de l'application.
     """
-    # Utiliser 'run' de socketio pour que les WebSockets fonctionnent correctement
+    # Serveur de développement (debug + reloader) ; en production, utiliser serve.py
     socketio.run(app, debug=True)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+@file bench_disconnect.py
+@brief Benchmark : latence de on_disconnect selon le nombre de salles
+
+Crée N salles occupées, connecte un client de test, le fait rejoindre
+une salle puis mesure le temps de sa déconnexion. Grâce au registre
+des connexions, la latence doit rester stable quand N augmente.
+
+Usage : python benchmarks/bench_disconnect.py
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, connections, rooms, socketio  # noqa: E402
+
+ROOM_COUNTS = [10, 100, 1000, 10000, 50000]
+PARTICIPANTS_PER_ROOM = 5
+REPEAT = 200
+
+
+def fill_rooms(count):
+    """
+    @brief Remplit le stockage avec `count` salles contenant des participants fictifs.
+    """
+    rooms.clear()
+    for i in range(count):
+        room_id = f'BENCH{i}'
+        participants = {f'{room_id}-sid{j}': f'user{j}' for j in range(PARTICIPANTS_PER_ROOM)}
+        rooms[room_id] = {
+            'participants': participants,
+            'admin_name': 'admin',
+            'admin_sid': None,
+            'backlog': [],
+            'votes': {},
+            'is_started': False,
+            'is_revealed': False,
+        }
+        for sid, username in participants.items():
+            connections.register(sid, room_id, username)
+
+
+def measure(count):
+    """
+    @brief Mesure la latence médiane (µs) d'une déconnexion avec `count` salles.
+    """
+    fill_rooms(count)
+    target = f'BENCH{count - 1}'
+    samples = []
+    for _ in range(REPEAT):
+        client = socketio.test_client(app)
+        client.emit('join', {'username': 'bench', 'room_id': target})
+        client.get_received()
+        start = time.perf_counter()
+        client.disconnect()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+if __name__ == '__main__':
+    print(f"{'salles':>8} | {'déconnexion (µs, médiane)':>26}")
+    for count in ROOM_COUNTS:
+        print(f"{count:>8} | {measure(count):>26.1f}")
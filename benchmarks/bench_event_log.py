@@ -0,0 +1,121 @@
+"""
+@file bench_event_log.py
+@brief Benchmark : coût d'écriture du journal d'événements et temps de reprise
+
+Écrit un million d'événements (1000 salles, 8 votants, manches complètes)
+avec le fsync groupé de la production, puis mesure le rejeu au
+démarrage : journal complet, puis avec snapshots par salle.
+
+Usage : python benchmarks/bench_event_log.py [nombre d'événements]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poker.eventlog import EventLog, apply_event  # noqa: E402
+from poker.store import InMemoryRoomStore  # noqa: E402
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+ROOMS = 1000
+VOTERS = 8
+CARDS = ["1", "2", "3", "5", "8", "13"]
+
+
+def background(task):
+    """ @brief Lanceur de tâche de fond (équivalent de socketio.start_background_task). """
+    threading.Thread(target=task, daemon=True).start()
+
+
+def generate_events(count):
+    """
+    @brief Produit `count` événements réalistes répartis sur ROOMS salles.
+    """
+    produced = 0
+    for room_index in range(ROOMS):
+        yield f'R{room_index}', 'create', {
+            'session_name': f'Sprint {room_index}', 'session_type': 'average', 'admin_name': 'admin',
+            'backlog': [{'name': f'Tâche {i}', 'description': 'x' * 40, 'votes': {}} for i in range(20)],
+            'current_story_index': 0, 'votes': {}, 'is_revealed': False, 'is_started': False,
+            'use_timer': False, 'timer_duration': 60}
+        produced += 1
+    story = 0
+    while produced < count:
+        for room_index in range(ROOMS):
+            room_id = f'R{room_index}'
+            yield room_id, 'start', {'use_timer': False, 'timer_duration': 60}
+            for voter in range(VOTERS):
+                yield room_id, 'vote', {'u': f'user{voter}', 'v': CARDS[(voter + story) % len(CARDS)]}
+            yield room_id, 'reveal', {'i': story % 20, 'result': '5.0', 'rule': 'average', 'votes': {}}
+            yield room_id, 'next', {'i': (story + 1) % 20}
+            produced += VOTERS + 3
+            if produced >= count:
+                return
+        story += 1
+
+
+def write_log(directory, snapshot_every):
+    """
+    @brief Écrit le journal et retourne (secondes, événements écrits, compteurs du journal).
+    """
+    log = EventLog(directory, fsync_interval=0.05, snapshot_every=snapshot_every,
+                   start_task=background, sleep=time.sleep)
+    state = {}
+    if snapshot_every:
+        log.set_state_source(state.get)
+    written = 0
+    elapsed = 0.0
+    for room_id, event_type, data in generate_events(EVENTS):
+        if snapshot_every:
+            apply_event(state, room_id, event_type, data)  # Rôle du RoomStore (non chronométré)
+        start = time.perf_counter()
+        log.append(room_id, event_type, data)
+        elapsed += time.perf_counter() - start
+        written += 1
+    start = time.perf_counter()
+    log.close()
+    return elapsed + time.perf_counter() - start, written, log.stats()
+
+
+def baseline_vote_cost(samples=200000):
+    """ @brief Coût d'un vote dans le stockage mémoire seul (µs), pour comparaison. """
+    store = InMemoryRoomStore()
+    store.create_room('R', {'votes': {}, 'participants': {}})
+    start = time.perf_counter()
+    for i in range(samples):
+        store.record_vote('R', f'user{i % VOTERS}', CARDS[i % len(CARDS)])
+    return (time.perf_counter() - start) / samples * 1e6
+
+
+def directory_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def run(label, snapshot_every):
+    directory = tempfile.mkdtemp(prefix='poker-eventlog-')
+    try:
+        write_seconds, written, stats = write_log(directory, snapshot_every)
+        size = directory_size(directory)
+        start = time.perf_counter()
+        rooms = EventLog(directory).replay()
+        replay_seconds = time.perf_counter() - start
+        print(f"{label:<28}{written:>10}{write_seconds / written * 1e6:>14.2f}{stats['fsyncs']:>9}"
+              f"{size / 1e6:>13.1f}{replay_seconds:>12.2f}{len(rooms):>8}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    print(f"Vote dans le stockage mémoire seul : {baseline_vote_cost():.2f} µs")
+    print(f"{'scénario':<28}{'événements':>10}{'écriture (µs)':>14}{'fsyncs':>9}"
+          f"{'disque (Mo)':>13}{'rejeu (s)':>12}{'salles':>8}")
+    run("journal complet", snapshot_every=0)
+    run("snapshots / 1000 événements", snapshot_every=1000)
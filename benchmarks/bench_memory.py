@@ -0,0 +1,130 @@
+"""
+@file bench_memory.py
+@brief Benchmark : mémoire (RSS) de N salles x M tâches, dictionnaires, modèle compact et modèle de backlog partagé
+
+Chaque mesure tourne dans un processus neuf : la RSS est relevée avant
+puis après la construction des salles, --estimated % des tâches étant
+estimées (vote final, règle, votes bruts de VOTERS participants).
+
+- dict : ancien format (salle et tâches en dictionnaires, votes en chaînes,
+  une chaîne par vote comme après le décodage JSON de chaque message) ;
+- model : InMemoryRoomStore (objets à __slots__, votes en codes de cartes,
+  voir poker/model.py) ;
+- template : salles créées depuis un même modèle de backlog (tâches
+  partagées, seules les tâches estimées sont copiées, voir poker/templates.py).
+
+Usage : python benchmarks/bench_memory.py [--rooms 20] [--stories 5000] [--voters 8] [--estimated 100]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poker.consensus import DEFAULT_CARDS  # noqa: E402
+from poker.store import InMemoryRoomStore  # noqa: E402
+from poker.templates import TemplateRegistry  # noqa: E402
+
+LAYOUTS = ('dict', 'model', 'template')
+
+
+def rss_bytes():
+    """ @brief Mémoire résidente actuelle du processus (Linux : /proc/self/statm). """
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def fresh(card):
+    """ @brief Nouvelle chaîne égale à card (comme un vote décodé d'un message). """
+    return card.encode().decode()
+
+
+def make_stories(stories):
+    return [{'name': f'Tâche {i}', 'description': f'Description de la tâche {i}', 'votes': {}}
+            for i in range(stories)]
+
+
+def make_room(room_id, backlog):
+    return {
+        'session_name': f'Session {room_id}', 'session_type': 'average',
+        'admin_name': 'admin', 'admin_sid': None,
+        'backlog': backlog,
+        'import_errors': [], 'current_story_index': 0, 'votes': {}, 'is_revealed': False,
+        'is_started': True, 'use_timer': False, 'timer_duration': 60, 'timer_end_time': None,
+        'participants': {}, 'tally': {'count': 0, 'numeric': 0, 'sum': 0.0, 'histogram': {}},
+        'revision': 0,
+    }
+
+
+def build(layout, n_rooms, n_stories, n_voters, n_estimated):
+    """
+    @brief Construit les salles et estime leurs n_estimated premières tâches.
+
+    @return Objet à garder vivant pendant la mesure
+    """
+    voters = [f'user{j}' for j in range(n_voters)]
+    if layout == 'dict':
+        rooms = {}
+        for r in range(n_rooms):
+            room_data = rooms[f'R{r}'] = make_room(f'R{r}', make_stories(n_stories))
+            for i, story in enumerate(room_data['backlog'][:n_estimated]):
+                votes = {name: fresh(DEFAULT_CARDS[(i + j) % 11]) for j, name in enumerate(voters)}
+                story['final_vote'] = fresh('5.0')
+                story['consensus_rule'] = 'average'
+                story['votes_submitted'] = dict(votes)
+        return rooms
+
+    store = InMemoryRoomStore()
+    template = TemplateRegistry().add('Modèle', make_stories(n_stories)) if layout == 'template' else None
+    for r in range(n_rooms):
+        backlog = template.backlog() if template else make_stories(n_stories)
+        store.create_room(f'R{r}', make_room(f'R{r}', backlog))
+        for i in range(n_estimated):
+            votes = {name: fresh(DEFAULT_CARDS[(i + j) % 11]) for j, name in enumerate(voters)}
+            store.save_story_result(f'R{r}', i, fresh('5.0'), 'average', votes)
+    return store, template
+
+
+def child(args):
+    before = rss_bytes()
+    rooms = build(args.layout, args.rooms, args.stories, args.voters,
+                  args.stories * args.estimated // 100)
+    after = rss_bytes()
+    print(json.dumps({'layout': args.layout, 'rss_bytes': after - before}))
+    return rooms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--stories', type=int, default=5000)
+    parser.add_argument('--voters', type=int, default=8)
+    parser.add_argument('--estimated', type=int, default=100, help="Pourcentage de tâches estimées")
+    parser.add_argument('--layout', choices=LAYOUTS, help=argparse.SUPPRESS)  # Processus de mesure
+    args = parser.parse_args()
+    if args.layout:
+        child(args)
+        return
+
+    total = args.rooms * args.stories
+    print(f"{args.rooms} salles x {args.stories} tâches, {args.estimated} % estimées "
+          f"({total} tâches, {args.voters} votants)\n")
+    print(f"{'format':<10}{'RSS (Mo)':>12}{'octets/tâche':>16}")
+    results = {}
+    for layout in LAYOUTS:
+        output = subprocess.run([sys.executable, __file__, '--layout', layout,
+                                 '--rooms', str(args.rooms), '--stories', str(args.stories),
+                                 '--voters', str(args.voters), '--estimated', str(args.estimated)],
+                                check=True, capture_output=True, text=True).stdout
+        results[layout] = json.loads(output)['rss_bytes']
+        print(f"{layout:<10}{results[layout] / 1e6:>12.1f}{results[layout] / total:>16.0f}")
+    print()
+    for layout in LAYOUTS[1:]:
+        print(f"Gain {layout} : {1 - results[layout] / results['dict']:.0%}")
+
+
+if __name__ == '__main__':
+    main()
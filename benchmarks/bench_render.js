@@ -0,0 +1,302 @@
+/*
+@file bench_render.js
+@brief Benchmark : rendu de la salle par événement selon le nombre de participants
+
+Charge static/js/logic.js et static/js/main.js (dans l'ordre du bundle
+js/room.js) dans un DOM minimal instrumenté, sans navigateur, puis compare :
+- legacy : ancien rendu (#participants-list et #other-votes vidés et
+  reconstruits à chaque événement, journal en innerHTML +=) ;
+- keyed : rendu incrémental (nœuds réutilisés par sid, Set des votants,
+  journal en tampon circulaire).
+
+Pour chaque taille de salle, chaque événement est un vote suivi du rendu,
+comme un patch vote_cast. Le DOM minimal ne calcule ni style ni mise en
+page : les temps mesurent le travail du script, les opérations DOM
+(nœuds créés, insérés, retirés, textes et attributs écrits) donnent
+l'ordre de grandeur du travail laissé au navigateur.
+
+Usage : node benchmarks/bench_render.js [--events 300] [--messages 2000]
+*/
+
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const ROOT = path.join(__dirname, '..');
+const PARTICIPANT_COUNTS = [10, 50, 200, 1000];
+
+const args = process.argv.slice(2);
+const option = (name, fallback) => {
+    const index = args.indexOf(`--${name}`);
+    return index >= 0 ? Number(args[index + 1]) : fallback;
+};
+const EVENTS = option('events', 300);
+const MESSAGES = option('messages', 2000);
+
+// --- DOM MINIMAL INSTRUMENTÉ ---
+
+const counters = { ops: 0 };
+const VOID_TAGS = new Set(['img', 'br', 'input']);
+
+class FakeText {
+    constructor(text) {
+        this.nodeType = 3;
+        this.data = String(text);
+        this.parentNode = null;
+    }
+    get textContent() { return this.data; }
+    serialize() { return this.data.replace(/&/g, '&amp;').replace(/</g, '&lt;'); }
+}
+
+class FakeElement {
+    constructor(tagName) {
+        counters.ops++;
+        this.nodeType = 1;
+        this.tagName = tagName.toLowerCase();
+        this.childNodes = [];
+        this.parentNode = null;
+        this.attributes = new Map();
+        this.scrollTop = 0;
+        this.disabled = false;
+        this.checked = false;
+        this.value = '';
+        const style = {};
+        this.style = new Proxy(style, {
+            set(target, key, value) {
+                counters.ops++;
+                target[key] = value;
+                return true;
+            }
+        });
+        const element = this;
+        this.classList = {
+            contains: (name) => element.className.split(' ').includes(name),
+            add: (name) => { if (!element.classList.contains(name)) element.className = `${element.className} ${name}`.trim(); },
+            remove: (name) => { element.className = element.className.split(' ').filter(c => c && c !== name).join(' '); }
+        };
+    }
+    setAttribute(name, value) { counters.ops++; this.attributes.set(name, String(value)); }
+    getAttribute(name) { return this.attributes.has(name) ? this.attributes.get(name) : null; }
+    get className() { return this.getAttribute('class') || ''; }
+    set className(value) { this.setAttribute('class', value); }
+    get src() { return this.getAttribute('src') || ''; }
+    set src(value) { this.setAttribute('src', value); }
+    get alt() { return this.getAttribute('alt') || ''; }
+    set alt(value) { this.setAttribute('alt', value); }
+    get id() { return this.getAttribute('id') || ''; }
+    get children() { return this.childNodes.filter(node => node.nodeType === 1); }
+    get childElementCount() { return this.children.length; }
+    get firstElementChild() { return this.children[0] || null; }
+    get scrollHeight() { return this.childNodes.length * 20; }
+
+    appendChild(node) {
+        if (node.parentNode) node.parentNode.removeChild(node);
+        counters.ops++;
+        node.parentNode = this;
+        this.childNodes.push(node);
+        return node;
+    }
+    removeChild(node) {
+        counters.ops++;
+        this.childNodes.splice(this.childNodes.indexOf(node), 1);
+        node.parentNode = null;
+        return node;
+    }
+    remove() {
+        if (this.parentNode) this.parentNode.removeChild(this);
+    }
+    replaceChildren(...nodes) {
+        this.childNodes.slice().forEach(node => this.removeChild(node));
+        nodes.forEach(node => this.appendChild(node));
+    }
+
+    get textContent() { return this.childNodes.map(node => node.textContent).join(''); }
+    set textContent(text) {
+        this.childNodes.forEach(node => { node.parentNode = null; });
+        counters.ops++;
+        this.childNodes = text === '' ? [] : [new FakeText(text)];
+        this.childNodes.forEach(node => { node.parentNode = this; });
+    }
+
+    // innerHTML : sérialisation complète en lecture, analyse et nouveaux nœuds en écriture
+    serialize() {
+        const attributes = [...this.attributes].map(([name, value]) => ` ${name}="${value}"`).join('');
+        if (VOID_TAGS.has(this.tagName)) return `<${this.tagName}${attributes}>`;
+        return `<${this.tagName}${attributes}>${this.innerHTML}</${this.tagName}>`;
+    }
+    get innerHTML() { return this.childNodes.map(node => node.serialize()).join(''); }
+    set innerHTML(html) {
+        this.replaceChildren();
+        parseHTML(String(html), this);
+    }
+
+    addEventListener() {}
+    querySelectorAll() { return []; }
+}
+
+// Analyse HTML réduite aux balises et attributs entre guillemets utilisés par la salle
+const parseHTML = (html, parent) => {
+    const stack = [parent];
+    const pattern = /<\/(\w+)\s*>|<(\w+)((?:\s+[\w-]+="[^"]*")*)\s*\/?>|([^<]+)/g;
+    let match;
+    while ((match = pattern.exec(html)) !== null) {
+        const current = stack[stack.length - 1];
+        if (match[1]) {
+            stack.pop();
+        } else if (match[2]) {
+            const element = new FakeElement(match[2]);
+            (match[3].match(/[\w-]+="[^"]*"/g) || []).forEach(pair => {
+                const [name, value] = pair.split('="');
+                element.setAttribute(name, value.slice(0, -1));
+            });
+            current.appendChild(element);
+            if (!VOID_TAGS.has(element.tagName)) stack.push(element);
+        } else if (match[4].trim()) {
+            counters.ops++;
+            const text = new FakeText(match[4]);
+            text.parentNode = current;
+            current.childNodes.push(text);
+        }
+    }
+};
+
+const createDocument = () => {
+    const elements = new Map();
+    return {
+        createElement: (tagName) => new FakeElement(tagName),
+        getElementById: (id) => {
+            if (!elements.has(id)) {
+                const element = new FakeElement('div');
+                element.attributes.set('id', id);
+                elements.set(id, element);
+            }
+            return elements.get(id);
+        },
+        querySelectorAll: () => []
+    };
+};
+
+// --- ANCIEN RENDU (avant le rendu incrémental), pour comparaison ---
+
+const LEGACY_SOURCE = `
+var legacyUpdateParticipantsAndVotes = (participants, votes) => {
+    const listElement = document.getElementById('participants-list');
+    const votesElement = document.getElementById('other-votes');
+    listElement.innerHTML = '';
+    votesElement.innerHTML = '';
+    participants.forEach(username => {
+        const hasVoted = Object.keys(votes).includes(username);
+        const li = document.createElement('li');
+        li.textContent = username;
+        li.style.fontWeight = hasVoted ? 'bold' : 'normal';
+        li.innerHTML += hasVoted ? ' ✅' : '';
+        listElement.appendChild(li);
+        if (currentState.is_revealed || hasVoted) {
+            const card = document.createElement('div');
+            card.className = 'participant-card';
+            card.setAttribute('data-username', username);
+            if (currentState.is_revealed) {
+                card.classList.add('revealed');
+                if (hasVoted) {
+                    card.innerHTML = '<img src="' + cardImageUrl(cardFileName(votes[username])) + '" class="svg-img-content">';
+                } else {
+                    card.textContent = 'N/A';
+                }
+            } else {
+                card.classList.add('voted');
+                card.textContent = '';
+            }
+            votesElement.appendChild(card);
+        }
+    });
+    document.getElementById('participant-count').textContent = participants.length;
+};
+
+var legacyLogMessage = (msg) => {
+    const messagesDiv = document.getElementById('messages');
+    messagesDiv.innerHTML += '<p><em>' + msg + '</em></p>';
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+};
+`;
+
+// --- CHARGEMENT DES SCRIPTS DE LA SALLE ---
+
+const loadRoom = () => {
+    const socket = { on: () => {}, emit: () => {} };
+    const context = {
+        document: createDocument(),
+        console: { log: () => {}, error: console.error },
+        io: () => socket,
+        requestAnimationFrame: () => 0,
+        fetch: () => new Promise(() => {}),
+        alert: () => {},
+        ROOM_ID: 'BENCH',
+        USERNAME: 'observateur',
+        CARD_SPRITE: '',
+        SOCKETIO_SERIALIZER: 'json'
+    };
+    context.window = context;
+    vm.createContext(context);
+    ['static/js/logic.js', 'static/js/main.js'].forEach(file => {
+        vm.runInContext(fs.readFileSync(path.join(ROOT, file), 'utf8'), context, { filename: file });
+    });
+    vm.runInContext(LEGACY_SOURCE, context, { filename: 'legacy.js' });
+    // Fonctions de main.js déclarées en const : lues dans la portée globale du contexte
+    context.logMessage = vm.runInContext('logMessage', context);
+    return context;
+};
+
+const DECK = ['0', '1', '2', '3', '5', '8', '13', '20', '40', '100', '?', '☕️'];
+
+// Temps et opérations DOM par événement (vote puis rendu) pour une salle de `size` participants
+const measureVotes = (layout, size) => {
+    const room = loadRoom();
+    const participants = {};
+    for (let i = 0; i < size; i++) participants[`sid${i}`] = `user${i}`;
+    Object.assign(room.currentState, { participants: participants, votes: {}, is_started: true, is_revealed: false });
+    const render = layout === 'legacy'
+        ? () => room.legacyUpdateParticipantsAndVotes(Object.values(participants), room.currentState.votes)
+        : () => room.updateParticipantsAndVotes(participants, room.currentState.votes);
+
+    render();  // Premier rendu (création des nœuds), hors mesure
+    counters.ops = 0;
+    const start = process.hrtime.bigint();
+    for (let k = 0; k < EVENTS; k++) {
+        room.currentState.votes[`user${(k * 7) % size}`] = DECK[k % DECK.length];
+        render();
+    }
+    const elapsed = Number(process.hrtime.bigint() - start) / 1e3;
+    return { us: elapsed / EVENTS, ops: counters.ops / EVENTS };
+};
+
+// Temps par message des 10 % derniers messages d'un journal de `count` lignes
+const measureMessages = (layout, count) => {
+    const room = loadRoom();
+    const log = layout === 'legacy' ? room.legacyLogMessage : room.logMessage;
+    const tail = Math.max(1, Math.floor(count / 10));
+    for (let i = 0; i < count - tail; i++) log(`user${i} a rejoint la salle.`);
+    const start = process.hrtime.bigint();
+    for (let i = count - tail; i < count; i++) log(`user${i} a rejoint la salle.`);
+    const elapsed = Number(process.hrtime.bigint() - start) / 1e3;
+    const lines = room.document.getElementById('messages').childElementCount;
+    return { us: elapsed / tail, lines: lines };
+};
+
+const pad = (value, width) => String(value).padStart(width);
+
+console.log(`Rendu d'un vote (${EVENTS} événements par taille de salle)\n`);
+console.log(`${'participants'.padEnd(14)}${pad('legacy µs', 12)}${pad('keyed µs', 12)}${pad('legacy ops', 13)}${pad('keyed ops', 12)}`);
+PARTICIPANT_COUNTS.forEach(size => {
+    const legacy = measureVotes('legacy', size);
+    const keyed = measureVotes('keyed', size);
+    console.log(`${String(size).padEnd(14)}${pad(legacy.us.toFixed(1), 12)}${pad(keyed.us.toFixed(1), 12)}`
+        + `${pad(legacy.ops.toFixed(0), 13)}${pad(keyed.ops.toFixed(0), 12)}`);
+});
+
+console.log(`\nJournal d'activité (${MESSAGES} messages, temps par message en fin de session)\n`);
+['legacy', 'keyed'].forEach(layout => {
+    const result = measureMessages(layout, MESSAGES);
+    console.log(`${layout.padEnd(14)}${pad(result.us.toFixed(1), 10)} µs${pad(result.lines, 8)} lignes gardées`);
+});
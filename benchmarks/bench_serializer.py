@@ -0,0 +1,107 @@
+"""
+@file bench_serializer.py
+@brief Benchmark : paquets Socket.IO JSON contre MessagePack
+
+Encode puis décode, avec les classes de paquets de python-socketio
+(celles qu'utilise le serveur), les charges historiques `status`,
+`vote_submitted` et `new_round` (état complet de la salle à chaque
+événement) ainsi que leurs équivalents actuels (snapshot et patchs).
+Le rapport donne la taille sur le fil et les temps d'encodage/décodage.
+
+Usage : python benchmarks/bench_serializer.py [participants] [tâches du backlog]
+Dépendances : pip install msgpack
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet  # noqa: E402
+from socketio.msgpack_packet import MsgPackPacket  # noqa: E402
+
+from poker import state_sync, tally  # noqa: E402
+
+PARTICIPANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+TASKS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+CARDS = ["1", "2", "3", "5", "8", "13"]
+REPEAT = 2000
+
+
+def build_room():
+    """ @brief Salle en cours de vote, comme dans app.py (rooms[room_id]). """
+    backlog = [{'name': f'Tâche {i}', 'description': f'En tant qu\'utilisateur, je veux la fonctionnalité {i}.',
+                'votes': {}} for i in range(TASKS)]
+    for story in backlog[:TASKS // 2]:
+        story['votes'] = {f'user{p}': CARDS[p % len(CARDS)] for p in range(PARTICIPANTS)}
+        story['estimation'] = '5.0'
+    room = {
+        'session_name': 'Sprint 42', 'session_type': 'average', 'admin_name': 'user0',
+        'participants': {f'sid{p:020d}': f'user{p}' for p in range(PARTICIPANTS)},
+        'backlog': backlog, 'current_story_index': TASKS // 2,
+        'votes': {f'user{p}': CARDS[p % len(CARDS)] for p in range(PARTICIPANTS - 1)},
+        'is_revealed': False, 'is_started': True, 'use_timer': True, 'timer_duration': 60,
+        'tally': tally.empty_tally(),
+    }
+    for vote in room['votes'].values():
+        tally.apply_delta(room['tally'], tally.vote_delta(None, vote))
+    return room
+
+
+def payloads(room):
+    """
+    @brief Charges émises par le serveur : (libellé, nom d'événement, données).
+
+    `status`, `vote_submitted` et `new_round` reprennent la forme des
+    événements d'origine (avant les patchs d'état).
+    """
+    participants = list(room['participants'].values())
+    index = room['current_story_index']
+    progress = tally.progress(room['tally'], len(participants))
+    return [
+        ('status (historique)', 'status', {
+            'msg': 'user3 a rejoint la salle.', 'participants': participants, 'current_state': room}),
+        ('vote_submitted (historique)', 'vote_submitted', {
+            'msg': 'user3 a voté.', 'participants': participants, 'current_state': room,
+            'voted_all': False}),
+        ('new_round (historique)', 'new_round', {
+            'current_story': room['backlog'][index], 'index': index,
+            'use_timer': room['use_timer'], 'duration': room['timer_duration']}),
+        ('state_snapshot', 'state_snapshot', state_sync.snapshot(dict(room, rev=1))),
+        ('state_patch vote_cast', 'state_patch', state_sync.make_patch(
+            2, 'vote_cast', {'username': 'user3', 'vote': '5', 'progress': progress})),
+        ('state_patch story_advanced', 'state_patch', state_sync.make_patch(
+            3, 'story_advanced', {'index': index, 'use_timer': True, 'duration': 60,
+                                  'progress': progress}, msg='Passage à la tâche suivante.')),
+    ]
+
+
+def measure(packet_class, event, data):
+    """
+    @brief Encode et décode REPEAT fois un paquet EVENT.
+
+    @return (octets sur le fil, µs par encodage, µs par décodage)
+    """
+    encoded = packet_class(packet.EVENT, data=[event, data], namespace='/').encode()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        packet_class(packet.EVENT, data=[event, data], namespace='/').encode()
+    encode_us = (time.perf_counter() - start) / REPEAT * 1e6
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        packet_class(encoded_packet=encoded)
+    decode_us = (time.perf_counter() - start) / REPEAT * 1e6
+    size = len(encoded.encode('utf-8') if isinstance(encoded, str) else encoded)
+    return size, encode_us, decode_us
+
+
+if __name__ == '__main__':
+    print(f"Salle : {PARTICIPANTS} participants, {TASKS} tâches, {REPEAT} itérations")
+    print(f"{'charge':<30}{'JSON (o)':>10}{'msgpack (o)':>13}{'gain':>7}"
+          f"{'enc. JSON':>11}{'enc. mp':>9}{'déc. JSON':>11}{'déc. mp':>9}   (µs)")
+    for label, event, data in payloads(build_room()):
+        json_size, json_enc, json_dec = measure(packet.Packet, event, data)
+        mp_size, mp_enc, mp_dec = measure(MsgPackPacket, event, data)
+        print(f"{label:<30}{json_size:>10}{mp_size:>13}{1 - mp_size / json_size:>7.0%}"
+              f"{json_enc:>11.1f}{mp_enc:>9.1f}{json_dec:>11.1f}{mp_dec:>9.1f}")
@@ -0,0 +1,217 @@
+"""
+@file loadtest.py
+@brief Banc de charge : N salles x M votants sur un serveur lancé à part
+
+Chaque salle est créée par HTTP (/create_room), puis un admin et M
+votants (clients python-socketio asynchrones) enchaînent :
+join -> start_session -> submit_vote -> reveal_votes -> next_task.
+La latence d'un événement est le temps entre l'émission et la réception
+du patch correspondant (state_snapshot pour join). Le rapport donne les
+p50/p99 par événement et les connexions simultanées par cœur.
+
+Pour comparer les modes sur une même machine :
+    SOCKETIO_ASYNC_MODE=threading python serve.py   (puis gevent, eventlet)
+    python benchmarks/loadtest.py --rooms 50 --voters 10 --server-pid <pid>
+
+Dépendances : pip install "python-socketio[asyncio_client]"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+import aiohttp
+import socketio
+
+# Patch attendu en réponse à chaque événement émis
+EXPECTED_PATCH = {
+    'start_session': 'session_started',
+    'submit_vote': 'vote_cast',
+    'reveal_votes': 'votes_revealed',
+    'next_task': 'story_advanced',
+}
+CARDS = ["1", "2", "3", "5", "8", "13"]
+
+
+class Bot:
+    """
+    @brief Participant simulé : un client Socket.IO qui attend ses patchs.
+    """
+
+    def __init__(self, url, room_id, username, latencies, transports, serializer='default'):
+        self.url = url
+        self.room_id = room_id
+        self.username = username
+        self.latencies = latencies
+        self.transports = transports
+        # Doit correspondre à SOCKETIO_SERIALIZER côté serveur
+        self.client = socketio.AsyncClient(reconnection=False, serializer=serializer)
+        self._waiters = defaultdict(list)  # {'type de patch': [(prédicat, future)]}
+        self.client.on('state_snapshot', self._on_snapshot)
+        self.client.on('state_patch', self._on_patch)
+
+    def _resolve(self, patch_type, payload):
+        pending = []
+        for predicate, future in self._waiters.pop(patch_type, []):
+            if future.done():
+                continue
+            if predicate(payload):
+                future.set_result(payload)
+            else:
+                pending.append((predicate, future))
+        if pending:
+            self._waiters[patch_type].extend(pending)
+
+    async def _on_snapshot(self, snapshot):
+        self._resolve('state_snapshot', snapshot)
+
+    async def _on_patch(self, patch):
+        if patch['type'] == 'votes_cast':
+            # Votes regroupés (voir poker/coalesce.py) : un vote_cast par participant
+            for username, vote in patch['data']['votes'].items():
+                self._resolve('vote_cast', {'data': {'username': username, 'vote': vote}})
+        self._resolve(patch['type'], patch)
+
+    def expect(self, patch_type, predicate=lambda payload: True):
+        """ @brief Future résolue à la réception du prochain patch correspondant. """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[patch_type].append((predicate, future))
+        return future
+
+    async def timed(self, event, data, patch_type, predicate=lambda payload: True, timeout=30):
+        """ @brief Émet un événement et enregistre la latence jusqu'au patch attendu. """
+        future = self.expect(patch_type, predicate)
+        start = time.perf_counter()
+        await self.client.emit(event, data)
+        await asyncio.wait_for(future, timeout)
+        self.latencies[event].append(time.perf_counter() - start)
+
+    async def connect_and_join(self):
+        start = time.perf_counter()
+        await self.client.connect(self.url, transports=self.transports, wait_timeout=30)
+        self.latencies['connect'].append(time.perf_counter() - start)
+        await self.timed('join', {'username': self.username, 'room_id': self.room_id}, 'state_snapshot')
+
+
+async def create_room(http, url, index, tasks):
+    """
+    @brief Crée une salle par le formulaire HTTP et retourne son identifiant.
+    """
+    backlog = json.dumps([{'name': f'Tâche {i}', 'description': 'Banc de charge'} for i in range(tasks)])
+    form = aiohttp.FormData()
+    form.add_field('username', 'admin')
+    form.add_field('session_name', f'Charge {index}')
+    form.add_field('session_type', 'average')
+    form.add_field('backlog_file', backlog, filename='backlog.json', content_type='application/json')
+    async with http.post(f'{url}/create_room', data=form, allow_redirects=False) as response:
+        if response.status not in (301, 302, 303):
+            raise RuntimeError(f"Création de salle impossible ({response.status}) : {await response.text()}")
+        return response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+
+async def run_room(url, room_id, voters, rounds, latencies, transports, connected, serializer):
+    """
+    @brief Déroule une session complète dans une salle.
+    """
+    admin = Bot(url, room_id, 'admin', latencies, transports, serializer)
+    bots = [Bot(url, room_id, f'votant{i}', latencies, transports, serializer) for i in range(voters)]
+    await admin.connect_and_join()
+    await asyncio.gather(*(bot.connect_and_join() for bot in bots))
+    connected[0] += len(bots) + 1
+    await connected[1].wait()  # Toutes les salles sont connectées : la charge est maximale
+
+    try:
+        await admin.timed('start_session', {'room_id': room_id, 'use_timer': False}, 'session_started')
+        for round_index in range(rounds):
+            await asyncio.gather(*(
+                bot.timed('submit_vote',
+                          {'room_id': room_id, 'username': bot.username,
+                           'vote': CARDS[(i + round_index) % len(CARDS)]},
+                          'vote_cast', lambda patch, name=bot.username: patch['data']['username'] == name)
+                for i, bot in enumerate(bots)))
+            await admin.timed('reveal_votes', {'room_id': room_id}, 'votes_revealed')
+            if round_index + 1 < rounds:
+                await admin.timed('next_task', {'room_id': room_id}, 'story_advanced')
+    finally:
+        await asyncio.gather(*(bot.client.disconnect() for bot in [admin] + bots),
+                             return_exceptions=True)
+
+
+def cpu_seconds(pid):
+    """ @brief Temps CPU (utilisateur + système) consommé par un processus Linux. """
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def percentile(samples, fraction):
+    """ @brief Percentile (interpolation au plus proche rang) d'une liste non vide. """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def main(args):
+    latencies = defaultdict(list)
+    transports = ['websocket'] if args.transport == 'websocket' else ['polling']
+    cores = os.cpu_count() or 1
+    all_connected = asyncio.Event()
+    connected = [0, all_connected]
+
+    async with aiohttp.ClientSession() as http:
+        room_ids = await asyncio.gather(*(create_room(http, args.url, i, args.rounds)
+                                          for i in range(args.rooms)))
+
+    cpu_start = cpu_seconds(args.server_pid) if args.server_pid else None
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(run_room(args.url, room_id, args.voters, args.rounds,
+                                            latencies, transports, connected,
+                                            'msgpack' if args.serializer == 'msgpack' else 'default'))
+             for room_id in room_ids]
+    expected = args.rooms * (args.voters + 1)
+    while connected[0] < expected and not any(task.done() for task in tasks):
+        await asyncio.sleep(0.05)
+    peak_connections = connected[0]
+    all_connected.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    failures = [r for r in results if isinstance(r, BaseException)]
+    print(f"Salles : {args.rooms} x {args.voters} votants, {args.rounds} manche(s), "
+          f"transport {args.transport} ({args.serializer}), durée {elapsed:.1f} s")
+    print(f"Connexions simultanées : {peak_connections} | cœurs : {cores} | "
+          f"connexions/cœur : {peak_connections / cores:.0f}")
+    if cpu_start is not None:
+        cpu_used = cpu_seconds(args.server_pid) - cpu_start
+        print(f"CPU serveur : {cpu_used:.1f} s ({100 * cpu_used / elapsed:.0f} % d'un cœur)")
+    print(f"{'événement':<15}{'n':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'max (ms)':>12}")
+    for event in ['connect', 'join'] + list(EXPECTED_PATCH):
+        samples = latencies.get(event)
+        if samples:
+            print(f"{event:<15}{len(samples):>8}{1000 * statistics.median(samples):>12.1f}"
+                  f"{1000 * percentile(samples, 0.99):>12.1f}{1000 * max(samples):>12.1f}")
+    async with aiohttp.ClientSession() as http:
+        async with http.get(f'{args.url}/stats') as response:
+            coalescing = (await response.json()).get('coalescing') if response.status == 200 else None
+    if coalescing:
+        print(f"Votes regroupés : {coalescing['events']} votes -> {coalescing['patches']} patchs "
+              f"(fenêtre {coalescing['window_ms']} ms, {coalescing['messages_saved']} messages évités)")
+    if failures:
+        print(f"Salles en échec : {len(failures)} (ex: {failures[0]!r})")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Banc de charge Planning Poker (Socket.IO)")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--rooms', type=int, default=20, help="Nombre de salles (N)")
+    parser.add_argument('--voters', type=int, default=10, help="Votants par salle (M)")
+    parser.add_argument('--rounds', type=int, default=3, help="Tâches votées par salle")
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    parser.add_argument('--serializer', choices=['json', 'msgpack'], default='json',
+                        help="Encodage des paquets (SOCKETIO_SERIALIZER du serveur)")
+    parser.add_argument('--server-pid', type=int, help="PID du serveur pour mesurer son CPU (Linux)")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
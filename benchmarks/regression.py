@@ -0,0 +1,316 @@
+"""
+@file regression.py
+@brief Suite de non-régression des performances : taille des messages et latences, avec budgets
+
+Mesures faites avec les test_client de Flask et Flask-SocketIO (sans serveur) :
+- bytes.<événement>[:<type de patch>] : plus grande taille encodée de chaque message
+  reçu par un client au cours d'une session type (octets, déterministe) ;
+- consensus.<règle>.<n> : calculate_consensus pour n votes (µs par appel) ;
+- handler.<événement> : submit_vote, reveal_votes, next_task dans une salle de
+  HANDLER_VOTERS votants (µs par événement, diffusion comprise) ;
+- create_room.<n> : création d'une salle avec un backlog JSON de n tâches (ms).
+
+Chaque mesure est comparée :
+- à son budget explicite (BUDGETS), limite absolue revue avec le code ;
+- à la référence enregistrée (benchmarks/baseline.json) : au-delà de la
+  tolérance (TOLERANCES), la mesure est une régression.
+Le script termine avec le code 1 si une mesure dépasse son budget ou sa référence.
+Les latences retenues sont les meilleures de --repeat passes (bruit de la machine).
+
+Usage : python benchmarks/regression.py [--only bytes|latency] [--repeat 5] [--update-baseline]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from app import app, calculate_consensus, lifecycle, room_locks, socketio  # noqa: E402
+from poker import consensus  # noqa: E402
+from poker.metrics import encoded_size  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Tolérance par rapport à la référence enregistrée, par famille de mesures :
+# les tailles sont exactes, les latences varient du simple au double d'une exécution à l'autre
+TOLERANCES = {'bytes': 0.10, 'consensus': 1.0, 'handler': 1.0, 'create_room': 1.0}
+
+# Limites absolues (octets, µs ou ms selon la mesure)
+BUDGETS = {
+    'bytes.state_snapshot': 2048,
+    'bytes.state_patch:participant_joined': 320,
+    'bytes.state_patch:participant_left': 320,
+    'bytes.state_patch:session_started': 256,
+    'bytes.state_patch:vote_cast': 192,
+    'bytes.state_patch:votes_revealed': 768,
+    'bytes.state_patch:story_advanced': 320,
+    'bytes.state_patch:vote_restarted': 384,
+    'bytes.error': 128,
+    'consensus.average.1000': 2000,
+    'consensus.fibonacci.1000': 2000,
+    'consensus.median.1000': 2000,
+    'consensus.mode.1000': 2000,
+    'consensus.outliers.1000': 2000,
+    'consensus.strict.1000': 2000,
+    'consensus.trimmed_mean.1000': 2000,
+    'handler.submit_vote': 5000,
+    'handler.reveal_votes': 8000,
+    'handler.next_task': 6000,
+    'create_room.1000': 50,
+    'create_room.20000': 1000,
+}
+
+VOTERS = 8            # Votants de la session type (tailles des messages)
+HANDLER_VOTERS = 20   # Votants de la salle des mesures de handlers
+HANDLER_ROUNDS = 30
+CONSENSUS_SIZES = (10, 100, 1000)
+BACKLOG_SIZES = (1000, 20000)
+CARDS = ('1', '2', '3', '5', '8', '13', '?')
+MIN_RUN_SECONDS = 0.05  # Durée minimale d'une passe de mesure de calculate_consensus
+
+
+@contextlib.contextmanager
+def quiet_app():
+    """
+    @brief Mesure les handlers seuls : un patch par vote, sans limitation de débit ni journalisation.
+    """
+    logger = logging.getLogger('poker')
+    saved = (app_module.vote_buffer.window, app_module.rate_limiter.limits, logger.level)
+    app_module.vote_buffer.window = 0
+    app_module.rate_limiter.limits = {}
+    logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        app_module.vote_buffer.window, app_module.rate_limiter.limits, level = saved
+        logger.setLevel(level)
+
+
+def backlog_upload(size):
+    """ @brief Fichier backlog.json de `size` tâches, prêt pour un formulaire multipart. """
+    stories = [{'name': f'Tâche {i}', 'description': f'En tant qu\'utilisateur, je veux la fonctionnalité {i}.'}
+               for i in range(size)]
+    return io.BytesIO(json.dumps(stories).encode('utf-8')), 'backlog.json'
+
+
+def open_room(voters, stories, rule='average'):
+    """
+    @brief Crée une salle par /create_room et y fait entrer l'administrateur et `voters` votants.
+
+    @return tuple (room_id, client de l'admin, [clients des votants])
+    """
+    http = app.test_client()
+    response = http.post('/create_room', content_type='multipart/form-data', data={
+        'username': 'admin', 'session_name': 'Benchmark', 'session_type': rule,
+        'backlog_file': backlog_upload(stories)})
+    room_id = response.headers['Location'].rsplit('/', 1)[-1]
+    admin = socketio.test_client(app, flask_test_client=http)
+    admin.emit('join', {'username': 'admin', 'room_id': room_id})
+    clients = []
+    for i in range(voters):
+        client = socketio.test_client(app)
+        client.emit('join', {'username': f'user{i}', 'room_id': room_id})
+        clients.append(client)
+    return room_id, admin, clients
+
+
+def close_room(room_id, clients):
+    for client in clients:
+        if client.is_connected():
+            client.disconnect()
+    room_locks.delete_room(room_id)
+    lifecycle.forget(room_id)
+
+
+def measure_payloads():
+    """
+    @brief Plus grande taille de chaque type de message reçu par l'administrateur au cours d'une session.
+
+    @return dict {'bytes.<événement>[:<type>]': octets}
+    """
+    sizes = {}
+
+    def collect(client):
+        for message in client.get_received():
+            name = message['name']
+            payload = message['args'][0] if message['args'] else None
+            key = f'bytes.{name}'
+            if name == 'state_patch' and isinstance(payload, dict):
+                key = f"{key}:{payload['type']}"
+            sizes[key] = max(sizes.get(key, 0), encoded_size(socketio.server.packet_class, name, message['args']))
+
+    with quiet_app():
+        room_id, admin, voters = open_room(VOTERS, stories=20)
+        clients = [admin] + voters
+        admin.emit('start_session', {'room_id': room_id})
+        for i, client in enumerate(voters):
+            client.emit('submit_vote', {'username': f'user{i}', 'room_id': room_id, 'vote': CARDS[i % len(CARDS)]})
+        admin.emit('reveal_votes', {'room_id': room_id})
+        admin.emit('restart_vote', {'room_id': room_id})
+        admin.emit('reveal_votes', {'room_id': room_id})
+        admin.emit('next_task', {'room_id': room_id})
+        admin.emit('submit_vote', {'username': 'admin', 'room_id': room_id, 'vote': ['5']})  # Vote invalide
+        voters[-1].disconnect()
+        collect(admin)
+        close_room(room_id, clients)
+    return sizes
+
+
+def best_of(repeat, run):
+    """ @brief Meilleure valeur de `repeat` exécutions de run() (la moins bruitée). """
+    return min(run() for _ in range(repeat))
+
+
+def measure_consensus(repeat):
+    """
+    @return dict {'consensus.<règle>.<n>': µs par appel}
+    """
+    results = {}
+    for size in CONSENSUS_SIZES:
+        votes = {f'user{i}': CARDS[i % (len(CARDS) - 1)] for i in range(size)}
+        for rule in sorted(consensus.RULES):
+            def run():
+                calls = 0
+                start = time.perf_counter()
+                while True:
+                    for _ in range(10):
+                        calculate_consensus(votes, rule)
+                    calls += 10
+                    elapsed = time.perf_counter() - start
+                    if elapsed >= MIN_RUN_SECONDS:
+                        return elapsed / calls * 1e6
+            results[f'consensus.{rule}.{size}'] = best_of(repeat, run)
+    return results
+
+
+def measure_handlers(repeat):
+    """
+    @brief Tours complets (votes, révélation, tâche suivante) dans une salle de HANDLER_VOTERS votants.
+
+    @return dict {'handler.<événement>': µs par événement}
+    """
+    def run():
+        totals = {'submit_vote': 0.0, 'reveal_votes': 0.0, 'next_task': 0.0}
+        room_id, admin, voters = open_room(HANDLER_VOTERS, stories=HANDLER_ROUNDS + 1)
+        clients = [admin] + voters
+        admin.emit('start_session', {'room_id': room_id})
+        for round_index in range(HANDLER_ROUNDS):
+            for client in clients:
+                client.get_received()  # Hors mesure : vide les files du client de test
+            start = time.perf_counter()
+            for i, client in enumerate(voters):
+                client.emit('submit_vote', {'username': f'user{i}', 'room_id': room_id,
+                                            'vote': CARDS[(i + round_index) % len(CARDS)]})
+            totals['submit_vote'] += time.perf_counter() - start
+            for event in ('reveal_votes', 'next_task'):
+                start = time.perf_counter()
+                admin.emit(event, {'room_id': room_id})
+                totals[event] += time.perf_counter() - start
+        close_room(room_id, clients)
+        return {'submit_vote': totals['submit_vote'] / (HANDLER_ROUNDS * HANDLER_VOTERS) * 1e6,
+                'reveal_votes': totals['reveal_votes'] / HANDLER_ROUNDS * 1e6,
+                'next_task': totals['next_task'] / HANDLER_ROUNDS * 1e6}
+
+    with quiet_app():
+        runs = [run() for _ in range(repeat)]
+    return {f'handler.{event}': min(result[event] for result in runs) for event in runs[0]}
+
+
+def measure_create_room(repeat):
+    """
+    @return dict {'create_room.<n>': ms par création (import du backlog compris)}
+    """
+    results = {}
+    http = app.test_client()
+    with quiet_app():
+        for size in BACKLOG_SIZES:
+            def run():
+                upload = backlog_upload(size)
+                start = time.perf_counter()
+                response = http.post('/create_room', content_type='multipart/form-data', data={
+                    'username': 'admin', 'session_name': 'Benchmark', 'session_type': 'average',
+                    'backlog_file': upload})
+                elapsed = (time.perf_counter() - start) * 1e3
+                close_room(response.headers['Location'].rsplit('/', 1)[-1], [])
+                return elapsed
+            results[f'create_room.{size}'] = best_of(repeat, run)
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(measures, path=BASELINE_PATH):
+    """ @brief Enregistre les mesures comme nouvelle référence (les autres entrées sont gardées). """
+    baseline = dict(load_baseline(path))
+    baseline.update({name: round(value, 3) for name, value in measures.items()})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(baseline.items())), f, indent=2)
+        f.write('\n')
+
+
+def check(measures, baseline):
+    """
+    @brief Compare les mesures à leurs budgets et à la référence.
+
+    @return Liste des dépassements (messages lisibles), vide si tout est dans les limites
+    """
+    failures = []
+    for name, value in sorted(measures.items()):
+        budget = BUDGETS.get(name)
+        if budget is not None and value > budget:
+            failures.append(f'{name} : {value:.1f} dépasse le budget {budget}')
+        reference = baseline.get(name)
+        tolerance = TOLERANCES[name.split('.', 1)[0]]
+        if reference is not None and value > reference * (1 + tolerance):
+            failures.append(f'{name} : {value:.1f} dépasse la référence {reference} de plus de {tolerance:.0%}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--only', choices=('bytes', 'latency'), help="Ne lancer qu'une famille de mesures")
+    parser.add_argument('--repeat', type=int, default=5, help="Passes par mesure de latence")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Enregistrer les mesures comme référence (benchmarks/baseline.json)")
+    args = parser.parse_args()
+
+    measures = {}
+    if args.only != 'latency':
+        measures.update(measure_payloads())
+    if args.only != 'bytes':
+        measures.update(measure_consensus(args.repeat))
+        measures.update(measure_handlers(args.repeat))
+        measures.update(measure_create_room(args.repeat))
+
+    baseline = load_baseline()
+    print(f"{'mesure':<42}{'valeur':>12}{'référence':>12}{'budget':>10}")
+    for name, value in sorted(measures.items()):
+        reference = baseline.get(name)
+        print(f"{name:<42}{value:>12.1f}{reference if reference is not None else '-':>12}"
+              f"{BUDGETS.get(name, '-'):>10}")
+
+    if args.update_baseline:
+        save_baseline(measures)
+        print(f"\nRéférence enregistrée : {BASELINE_PATH}")
+        return 0
+    failures = check(measures, baseline)
+    for failure in failures:
+        print(f'ÉCHEC {failure}')
+    print(f"\n{len(measures)} mesures, {len(failures)} dépassement(s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+@file __init__.py
+@brief Modules internes du serveur de Planning Poker
+
+Ce paquet regroupe la logique réutilisée par app.py
+(synchronisation d'état, stockage des salles, consensus...).
+"""
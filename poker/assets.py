@@ -0,0 +1,268 @@
+"""
+@file assets.py
+@brief Ressources statiques : bundles, sprite des cartes, empreintes et précompression
+
+Sans construction, les pages chargent chaque fichier de static/ séparément
+(client Socket.IO, scripts, feuilles de style, une image SVG par carte).
+`python -m poker.assets` prépare une version de production dans static/dist/ :
+- un bundle JS par page (client Socket.IO local + parser msgpack + scripts) ;
+- les cartes regroupées dans un sprite SVG (une <view> par carte) ;
+- des noms contenant l'empreinte du contenu (room.3f2a9c1b7d.js) ;
+- des variantes .gz et .br (brotli si la bibliothèque est installée) ;
+- un manifest.json qui associe chaque nom logique à son fichier.
+
+Ces fichiers sont servis sous /assets/ avec `Cache-Control: immutable`
+et la variante compressée acceptée par le navigateur. Sans manifest
+(développement), asset_urls() retombe sur les fichiers sources.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Les variantes .br sont facultatives
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 10
+COMPRESSIBLE = ('.js', '.css', '.svg', '.json')
+
+# Nom logique -> fichiers sources (relatifs à static/), concaténés dans l'ordre
+BUNDLES = {
+    'js/room.js': ['vendor/socket.io.min.js', 'js/msgpack-parser.js', 'js/logic.js', 'js/main.js'],
+    'css/room.css': ['css/room.css'],
+    'css/style.css': ['css/style.css'],
+}
+SPRITE_NAME = 'cartes/sprite.svg'
+CARD_FILES = ['cartes_0', 'cartes_1', 'cartes_2', 'cartes_3', 'cartes_5', 'cartes_8', 'cartes_13',
+              'cartes_20', 'cartes_40', 'cartes_100', 'cartes_interro', 'cartes_cafe']
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+SPRITE_GAP = 1  # Espace entre deux cartes du sprite (pas de débordement d'une vue sur l'autre)
+SOURCE_MAP_COMMENT = re.compile(r'^\s*//# sourceMappingURL=.*$', re.MULTILINE)
+
+
+# -----------------------------
+# Construction
+# -----------------------------
+
+def bundle(static_dir, sources):
+    """
+    @brief Concatène des fichiers sources en un seul contenu.
+
+    Les commentaires sourceMappingURL sont retirés (les fichiers .map ne sont pas livrés).
+    @return bytes
+    """
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_dir, source), encoding='utf-8') as f:
+            text = f.read()
+        if source.endswith('.js'):
+            text = SOURCE_MAP_COMMENT.sub('', text).rstrip() + '\n;'
+        parts.append(f'/* {source} */\n{text.rstrip()}\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def _prefix_ids(element, prefix):
+    """ @brief Préfixe les id d'une carte (et leurs références) pour éviter les collisions dans le sprite. """
+    for node in element.iter():
+        if 'id' in node.attrib:
+            node.set('id', prefix + node.get('id'))
+        for name, value in list(node.attrib.items()):
+            if name in ('href', f'{{{XLINK_NS}}}href') and value.startswith('#'):
+                node.set(name, '#' + prefix + value[1:])
+            elif 'url(#' in value:
+                node.set(name, value.replace('url(#', f'url(#{prefix}'))
+
+
+def _number(value):
+    """ @brief Nombre SVG compact (4 décimales au plus). """
+    return f'{value:.4f}'.rstrip('0').rstrip('.')
+
+
+def build_sprite(cards_dir, names=CARD_FILES):
+    """
+    @brief Regroupe les cartes SVG en un sprite horizontal.
+
+    Chaque carte est un <svg> imbriqué, et une <view id="nom"> donne son cadre :
+    `<img src="sprite.svg#cartes_5">` affiche la carte 5.
+    @return bytes (document SVG)
+    """
+    ET.register_namespace('', SVG_NS)
+    ET.register_namespace('xlink', XLINK_NS)
+    sprite = ET.Element(f'{{{SVG_NS}}}svg')
+    x = 0.0
+    height = 0.0
+    for name in names:
+        card = ET.parse(os.path.join(cards_dir, f'{name}.svg')).getroot()
+        _, _, width, card_height = (float(v) for v in card.get('viewBox').split())
+        _prefix_ids(card, f'{name}-')
+        nested = ET.SubElement(sprite, f'{{{SVG_NS}}}svg', {
+            'x': _number(x), 'y': '0', 'width': _number(width), 'height': _number(card_height),
+            'viewBox': card.get('viewBox')})
+        # Seuls les éléments SVG sont gardés (métadonnées Inkscape, sodipodi... exclues)
+        nested.extend(child for child in card if child.tag.startswith(f'{{{SVG_NS}}}'))
+        ET.SubElement(sprite, f'{{{SVG_NS}}}view', {
+            'id': name, 'viewBox': f'{_number(x)} 0 {_number(width)} {_number(card_height)}'})
+        x += width + SPRITE_GAP
+        height = max(height, card_height)
+    sprite.set('viewBox', f'0 0 {_number(x - SPRITE_GAP)} {_number(height)}')
+    return ET.tostring(sprite, encoding='utf-8', xml_declaration=True)
+
+
+def hashed_name(name, content):
+    """
+    @brief Nom de fichier avec l'empreinte du contenu (js/room.js -> js/room.<hash>.js).
+    """
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+def write_asset(dist_dir, name, content):
+    """
+    @brief Écrit un fichier et ses variantes compressées (.gz, .br).
+
+    @return list des chemins écrits
+    """
+    path = os.path.join(dist_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    variants = [(path, content)]
+    if name.endswith(COMPRESSIBLE):
+        # mtime=0 : même contenu -> mêmes octets (constructions reproductibles)
+        variants.append((path + '.gz', gzip.compress(content, compresslevel=9, mtime=0)))
+        if brotli is not None:
+            variants.append((path + '.br', brotli.compress(content, quality=11)))
+    for variant_path, data in variants:
+        with open(variant_path, 'wb') as f:
+            f.write(data)
+    return [variant_path for variant_path, _ in variants]
+
+
+def build(static_dir):
+    """
+    @brief Construit static/dist/ et son manifest.
+
+    @param static_dir Dossier static/ de l'application
+    @return dict manifest {'nom logique': 'chemin avec empreinte'}
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    outputs = {name: bundle(static_dir, sources) for name, sources in BUNDLES.items()}
+    outputs[SPRITE_NAME] = build_sprite(os.path.join(static_dir, 'cartes'))
+
+    manifest = {}
+    for name, content in outputs.items():
+        manifest[name] = hashed_name(name, content)
+        write_asset(dist_dir, manifest[name], content)
+    # Le manifest est écrit en dernier : un serveur ne voit jamais de fichiers manquants
+    tmp_path = os.path.join(dist_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(dist_dir, MANIFEST_NAME))
+    return manifest
+
+
+# -----------------------------
+# Service par Flask
+# -----------------------------
+
+def load_manifest(static_dir):
+    """
+    @brief Lit le manifest de static/dist/.
+
+    @return dict, ou None si les ressources n'ont pas été construites
+    """
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def init_app(app):
+    """
+    @brief Enregistre la route /assets/ et les fonctions de gabarit asset_urls / asset_url.
+
+    Le manifest est lu une fois au démarrage ; ASSETS_DEBUG=1 l'ignore
+    pour travailler directement sur les sources.
+    """
+    static_dir = app.static_folder
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    manifest = None if os.environ.get('ASSETS_DEBUG') == '1' else load_manifest(static_dir)
+    app.config['ASSETS_MANIFEST'] = manifest
+    built_files = set(manifest.values()) if manifest else set()
+
+    def asset_urls(name):
+        """ @brief URLs à charger pour une ressource logique (une seule une fois construite). """
+        if manifest and name in manifest:
+            return [url_for('asset', filename=manifest[name])]
+        if name == SPRITE_NAME:
+            return []  # Pas de sprite en développement : une image par carte
+        return [url_for('static', filename=source) for source in BUNDLES.get(name, [name])]
+
+    def asset_url(name):
+        """ @brief URL unique d'une ressource, ou None si elle n'existe qu'en version construite. """
+        urls = asset_urls(name)
+        return urls[0] if len(urls) == 1 else None
+
+    app.jinja_env.globals.update(asset_urls=asset_urls, asset_url=asset_url)
+
+    @app.route('/assets/<path:filename>')
+    def asset(filename):
+        """
+        @brief Ressource construite, immuable (le nom change avec le contenu).
+
+        Envoie la variante .br ou .gz si le navigateur l'accepte.
+        """
+        if filename not in built_files:
+            abort(404)
+        served, encoding = filename, None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings.quality(candidate) > 0 and \
+                    os.path.exists(os.path.join(dist_dir, filename + suffix)):
+                served, encoding = filename + suffix, candidate
+                break
+        response = send_from_directory(dist_dir, served, max_age=ASSET_MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            response.mimetype = _mimetype(filename)
+        response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def _mimetype(filename):
+    """ @brief Type MIME du fichier d'origine d'une variante compressée. """
+    return {'.js': 'text/javascript', '.css': 'text/css', '.svg': 'image/svg+xml',
+            '.json': 'application/json'}.get(os.path.splitext(filename)[1], 'application/octet-stream')
+
+
+def main(argv=None):
+    """
+    @brief Point d'entrée : python -m poker.assets [dossier static]
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    static_dir = argv[0] if argv else os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+    manifest = build(static_dir)
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    for name, hashed in sorted(manifest.items()):
+        sizes = [os.path.getsize(os.path.join(dist_dir, hashed + suffix))
+                 for suffix in ('', '.gz', '.br') if os.path.exists(os.path.join(dist_dir, hashed + suffix))]
+        print(f"{name:<20} -> {hashed:<32} " + ' / '.join(f'{size} o' for size in sizes))
+    if brotli is None:
+        print("brotli non installé : variantes .br non générées (pip install brotli)")
+
+
+if __name__ == '__main__':
+    main()
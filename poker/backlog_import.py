@@ -0,0 +1,276 @@
+"""
+@file backlog_import.py
+@brief Import du backlog en flux (JSON, NDJSON, CSV) avec validation
+
+Le fichier téléchargé est lu par morceaux et les tâches sont produites
+une par une : on ne garde jamais en mémoire à la fois les octets bruts,
+la chaîne décodée et la liste parsée. Les éléments invalides sont
+signalés avec leur index (JSON) ou leur ligne (NDJSON, CSV) au lieu de
+faire échouer tout l'import.
+"""
+
+import codecs
+import csv
+import json
+from collections import namedtuple
+
+# Formats acceptés selon l'extension du fichier
+FORMATS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_ITEMS = 50000
+CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 50
+
+# Au-delà de cette distance de la fin du texte lu, une erreur JSON ne vient pas
+# d'une coupure entre deux morceaux (le plus long jeton est "-Infinity")
+TRUNCATION_WINDOW = 16
+
+# Résultat d'un import : tâches valides + messages d'erreur ("élément 3 : ...")
+ImportResult = namedtuple('ImportResult', ['stories', 'errors'])
+
+
+class BacklogImportError(Exception):
+    """ @brief Erreur qui empêche tout l'import (format non supporté, limite dépassée). """
+
+
+class BacklogTooLargeError(BacklogImportError):
+    """ @brief Le fichier dépasse la taille ou le nombre de tâches autorisés. """
+
+
+class _InvalidItem(ValueError):
+    """ @brief Élément du backlog rejeté (signalé, l'import continue). """
+
+
+def detect_format(filename):
+    """
+    @brief Déduit le format du backlog de l'extension du fichier.
+
+    @return 'json', 'ndjson' ou 'csv'
+    """
+    lowered = (filename or '').lower()
+    for extension, fmt in FORMATS.items():
+        if lowered.endswith(extension):
+            return fmt
+    raise BacklogImportError(
+        f"Format de backlog non supporté ({filename}). Formats acceptés : {', '.join(FORMATS)}")
+
+
+def to_story(item):
+    """
+    @brief Convertit un élément brut en tâche du backlog.
+
+    Accepte 'name' ou 'nom' pour le titre.
+    @return dict {'name', 'description'}
+    """
+    if not isinstance(item, dict):
+        raise _InvalidItem(f"objet attendu, reçu {type(item).__name__}")
+
+    name = item.get('name') or item.get('nom')
+    description = item.get('description')
+    if not name and not description:
+        raise _InvalidItem("tâche vide (ni 'name'/'nom' ni 'description')")
+    if name is not None and not isinstance(name, str):
+        raise _InvalidItem("'name' doit être une chaîne")
+    if description is not None and not isinstance(description, str):
+        raise _InvalidItem("'description' doit être une chaîne")
+
+    return {
+        "name": name or 'Tâche sans nom',
+        "description": description or 'Pas de description fournie.',
+    }
+
+
+def iter_text_chunks(stream, max_bytes=DEFAULT_MAX_BYTES, chunk_size=CHUNK_SIZE):
+    """
+    @brief Lit un flux binaire par morceaux et les décode en UTF-8 (BOM toléré).
+
+    @throw BacklogTooLargeError si le flux dépasse max_bytes
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise BacklogTooLargeError(
+                f"Le fichier backlog dépasse la taille maximale ({max_bytes} octets).")
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise BacklogImportError("Le fichier backlog n'est pas encodé en UTF-8.")
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_lines(chunks):
+    """
+    @brief Découpe un flux de morceaux de texte en lignes terminées par '\\n'.
+
+    Seul '\\n' sépare les lignes ('\\r\\n' devient '\\n') : les autres fins
+    de ligne Unicode (U+2028, U+0085, \\x0b, \\x0c...) restent dans le texte.
+    """
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + chunk).split('\n')
+        # La dernière ligne peut être incomplète : on la garde pour le morceau suivant
+        pending = lines.pop()
+        for line in lines:
+            yield (line[:-1] if line.endswith('\r') else line) + '\n'
+    if pending.endswith('\r'):
+        pending = pending[:-1]
+    if pending:
+        yield pending
+
+
+def iter_json_array(chunks):
+    """
+    @brief Parse un tableau JSON élément par élément, sans charger tout le texte.
+
+    @return Générateur de (index, élément)
+    @throw BacklogImportError si le document n'est pas un tableau
+    @throw ValueError(index, message) si la syntaxe JSON est invalide plus loin
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_blank():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip_blank()
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise BacklogImportError("Le fichier backlog JSON doit contenir un tableau de tâches.")
+    pos += 1
+
+    index = 0
+    while True:
+        skip_blank()
+        if pos >= len(buffer):
+            raise ValueError(index, "tableau JSON non terminé")
+        if buffer[pos] == ']':
+            return
+        if index > 0:
+            if buffer[pos] != ',':
+                raise ValueError(index, "',' attendue entre deux éléments")
+            pos += 1
+            skip_blank()
+
+        # Décoder l'élément suivant ; s'il est coupé par la fin du morceau, on relit
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # Une valeur non suivie d'un séparateur peut être tronquée (ex: "12" de "12.5")
+                if (eof or (end < len(buffer) and buffer[end] in ',] \t\r\n')
+                        or len(buffer) - end > TRUNCATION_WINDOW):
+                    break
+            except json.JSONDecodeError as e:
+                # Erreur loin de la fin du texte lu : la suite du fichier n'y changera rien
+                truncated = (e.msg.startswith('Unterminated string')
+                             or len(buffer) - e.pos <= TRUNCATION_WINDOW)
+                if eof or not truncated:
+                    raise ValueError(index, f"JSON invalide ({e.msg})")
+            fill()
+        pos = end
+        yield index, item
+        index += 1
+
+
+def iter_ndjson(chunks):
+    """
+    @brief Parse du NDJSON (un objet JSON par ligne).
+
+    @return Générateur de (numéro de ligne, élément ou exception)
+    """
+    for line_number, line in enumerate(iter_lines(chunks), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, _InvalidItem(f"JSON invalide ({e.msg})")
+
+
+def iter_csv(chunks):
+    """
+    @brief Parse un CSV avec en-tête (colonnes name/nom et description).
+
+    @return Générateur de (numéro de ligne, élément)
+    """
+    reader = csv.DictReader(iter_lines(chunks))
+    for row in reader:
+        row = {(key or '').strip().lower(): (value or '').strip()
+               for key, value in row.items() if isinstance(value, str)}
+        yield reader.line_num, row
+
+
+def import_backlog(stream, filename, max_bytes=DEFAULT_MAX_BYTES, max_items=DEFAULT_MAX_ITEMS):
+    """
+    @brief Importe un backlog téléchargé en flux.
+
+    @param stream Flux binaire du fichier (ex: FileStorage.stream)
+    @param filename Nom du fichier (détermine le format)
+    @param max_bytes Taille maximale du fichier (0 = illimitée)
+    @param max_items Nombre maximal de tâches (0 = illimité)
+    @return ImportResult(stories, errors)
+    @throw BacklogImportError si l'import est impossible
+    """
+    fmt = detect_format(filename)
+    chunks = iter_text_chunks(stream, max_bytes)
+    label = 'élément' if fmt == 'json' else 'ligne'
+    stories, errors = [], []
+
+    def report(position, message):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(f"{label} {position} : {message}")
+        elif len(errors) == MAX_REPORTED_ERRORS:
+            errors.append("... erreurs suivantes non affichées.")
+
+    if fmt == 'json':
+        items = iter_json_array(chunks)
+    elif fmt == 'ndjson':
+        items = iter_ndjson(chunks)
+    else:
+        items = iter_csv(chunks)
+
+    try:
+        for position, item in items:
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                story = to_story(item)
+            except _InvalidItem as e:
+                report(position, str(e))
+                continue
+            if max_items and len(stories) >= max_items:
+                raise BacklogTooLargeError(
+                    f"Le backlog dépasse le nombre maximal de tâches ({max_items}).")
+            stories.append(story)
+    except ValueError as e:
+        # Syntaxe JSON cassée : on garde les tâches déjà lues et on signale où
+        position, message = e.args if len(e.args) == 2 else ('?', str(e))
+        report(position, message)
+    except csv.Error as e:
+        report('?', f"CSV invalide ({e})")
+
+    return ImportResult(stories, errors)
@@ -0,0 +1,117 @@
+"""
+@file coalesce.py
+@brief Regroupement par salle des votes diffusés (rafales de votes)
+
+Au début d'une manche, tous les participants votent en une ou deux
+secondes, et certains changent plusieurs fois de carte. Au lieu d'un
+patch 'vote_cast' par clic, les votes d'une salle sont gardés pendant
+une courte fenêtre (50 ms par défaut) puis envoyés en un seul patch
+'votes_cast' où seul le dernier vote de chaque participant est gardé.
+
+Seule la diffusion est retardée : les votes sont enregistrés dans le
+stockage immédiatement. Les autres patchs (révélation, changement de
+manche...) ne passent pas par le tampon ; ils vident d'abord celui de
+leur salle pour garder l'ordre des révisions.
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+
+from poker.scheduler import DeadlineScheduler
+
+
+class VoteCoalescer:
+    """
+    @brief Tampon de votes par salle, vidé à la fin de chaque fenêtre.
+    """
+
+    def __init__(self, on_flush, window=0.05, start_task=None, sleep=time.sleep,
+                 clock=time.monotonic, room_lock=None):
+        """
+        @param on_flush Fonction appelée avec (room_id, votes, progress) à chaque envoi
+        @param window Durée de la fenêtre de regroupement en secondes (0 = pas de tampon)
+        @param start_task Lanceur de tâche de fond (ex: socketio.start_background_task)
+        @param sleep Fonction d'attente compatible avec le mode async (ex: socketio.sleep)
+        @param clock Horloge monotone (injectable pour les tests)
+        @param room_lock Fabrique de verrou par salle (ex: RoomLocks.hold), tenu pendant l'envoi
+        """
+        self.window = window
+        self._room_lock = room_lock or (lambda room_id: nullcontext())
+        self._on_flush = on_flush
+        self._pending = {}  # {'room_id': {'votes': {pseudo: vote}, 'progress': dict, 'events': int}}
+        self._lock = threading.Lock()
+        # Même ordonnanceur que les timers, avec une vérification à chaque fenêtre
+        self._deadlines = DeadlineScheduler(on_expire=self.flush, start_task=start_task,
+                                            sleep=sleep, clock=clock, tick=window or 0.25)
+        self.events = 0            # Votes reçus
+        self.patches = 0           # Patchs regroupés envoyés
+        self.messages_saved = 0    # Messages individuels évités (patchs évités x destinataires)
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def add_vote(self, room_id, username, vote, progress):
+        """
+        @brief Ajoute un vote (None = retrait) au tampon de la salle.
+
+        @param progress Avancement de la manche après ce vote (voir tally.progress)
+        """
+        with self._lock:
+            self.events += 1
+            entry = self._pending.get(room_id)
+            is_new = entry is None
+            if is_new:
+                entry = self._pending[room_id] = {'votes': {}, 'progress': None, 'events': 0}
+            entry['votes'][username] = vote
+            entry['progress'] = progress
+            entry['events'] += 1
+        if is_new:
+            self._deadlines.schedule(room_id, self.window)
+
+    def flush(self, room_id):
+        """
+        @brief Envoie immédiatement les votes en attente d'une salle.
+
+        @return True si un patch a été envoyé
+        """
+        # Sous le verrou de la salle : aucun autre patch ne s'intercale entre retrait et envoi
+        with self._room_lock(room_id):
+            with self._lock:
+                entry = self._pending.pop(room_id, None)
+                if entry is None:
+                    return False
+                self.patches += 1
+                recipients = entry['progress']['total'] if entry['progress'] else 0
+                self.messages_saved += (entry['events'] - 1) * recipients
+            self._deadlines.cancel(room_id)
+            self._on_flush(room_id, entry['votes'], entry['progress'])
+        return True
+
+    def flush_all(self):
+        """ @brief Vide les tampons de toutes les salles. """
+        for room_id in list(self._pending):
+            self.flush(room_id)
+
+    def discard(self, room_id):
+        """ @brief Oublie les votes en attente d'une salle supprimée. """
+        with self._lock:
+            self._pending.pop(room_id, None)
+        self._deadlines.cancel(room_id)
+
+    def stats(self):
+        """
+        @brief Compteurs du regroupement.
+
+        @return dict {'window_ms', 'events', 'patches', 'patches_saved', 'messages_saved'}
+        """
+        with self._lock:
+            return {
+                'window_ms': int(self.window * 1000),
+                'events': self.events,
+                'patches': self.patches,
+                'patches_saved': self.events - self.patches - sum(
+                    entry['events'] for entry in self._pending.values()),
+                'messages_saved': self.messages_saved,
+            }
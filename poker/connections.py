@@ -0,0 +1,79 @@
+"""
+@file connections.py
+@brief Registre des connexions Socket.IO (sid -> salle, pseudo)
+
+Permet de retrouver en temps constant la salle et le pseudo associés
+à un sid, sans parcourir toutes les salles (déconnexion, vote, admin).
+"""
+
+from collections import namedtuple
+
+# Entrée du registre : salle rejointe et pseudo utilisé par la connexion
+Connection = namedtuple('Connection', ['room_id', 'username'])
+
+
+class ConnectionRegistry:
+    """
+    @brief Index inverse sid -> (salle, pseudo) et salle -> {sid}.
+    """
+
+    def __init__(self):
+        self._by_sid = {}   # {'sid': Connection}
+        self._by_room = {}  # {'room_id': {'sid', ...}}
+
+    def register(self, sid, room_id, username):
+        """
+        @brief Associe un sid à une salle et un pseudo.
+
+        Si le sid était déjà inscrit dans une autre salle, l'ancienne
+        inscription est remplacée.
+        @return Connection précédente ou None
+        """
+        previous = self.unregister(sid)
+        self._by_sid[sid] = Connection(room_id, username)
+        self._by_room.setdefault(room_id, set()).add(sid)
+        return previous
+
+    def unregister(self, sid):
+        """
+        @brief Retire un sid du registre.
+
+        @return Connection retirée ou None si le sid était inconnu
+        """
+        connection = self._by_sid.pop(sid, None)
+        if connection is not None:
+            sids = self._by_room.get(connection.room_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._by_room[connection.room_id]
+        return connection
+
+    def lookup(self, sid):
+        """
+        @brief Retourne la Connection d'un sid (ou None).
+        """
+        return self._by_sid.get(sid)
+
+    def sids_in_room(self, room_id):
+        """
+        @brief Retourne l'ensemble des sids inscrits dans une salle.
+        """
+        return frozenset(self._by_room.get(room_id, ()))
+
+    def discard_room(self, room_id):
+        """
+        @brief Oublie toutes les connexions d'une salle (suppression de la salle).
+
+        @return Liste des sids retirés
+        """
+        sids = self._by_room.pop(room_id, set())
+        for sid in sids:
+            self._by_sid.pop(sid, None)
+        return list(sids)
+
+    def __contains__(self, sid):
+        return sid in self._by_sid
+
+    def __len__(self):
+        return len(self._by_sid)
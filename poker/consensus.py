@@ -0,0 +1,266 @@
+"""
+@file consensus.py
+@brief Moteur de consensus : paquet de cartes pré-parsé et règles enregistrables
+
+- Deck : les valeurs des cartes sont converties une seule fois en nombres
+  (table de correspondance), les cartes spéciales ('?', '☕️') valent None
+- Règles : chaque règle s'enregistre avec @register_rule et reçoit les
+  votes numériques déjà triés
+- score_backlog : calcul vectorisé (NumPy) des statistiques de nombreuses
+  tâches à partir de leurs 'votes_submitted', pour les rétrospectives
+"""
+
+import math
+from collections import namedtuple
+
+# Cartes du paquet : mêmes valeurs que cardValues de static/js/logic.js
+DEFAULT_CARDS = ["0", "1", "2", "3", "5", "8", "13", "20", "40", "100", "?", "☕️"]
+
+
+class Deck:
+    """
+    @brief Paquet de cartes avec table {carte: valeur numérique ou None}.
+    """
+
+    def __init__(self, cards):
+        self.cards = list(cards)
+        self._values = {card: self._parse(card) for card in self.cards}
+        # Valeurs numériques triées du paquet (pour l'arrondi à la carte la plus proche)
+        self.numeric_values = sorted(v for v in self._values.values() if v is not None)
+
+    @staticmethod
+    def _parse(card):
+        try:
+            value = float(card)
+        except (TypeError, ValueError):
+            return None  # Carte spéciale ('?', '☕️')
+        return value if math.isfinite(value) else None
+
+    def value(self, card):
+        """
+        @brief Valeur numérique d'une carte (None pour une carte spéciale).
+
+        Les votes hors paquet sont refusés à l'enregistrement (voir model.CardTable) ;
+        une valeur inconnue ici (ex: résultat importé) est parsée sans être gardée.
+        """
+        try:
+            return self._values[card]
+        except KeyError:
+            return self._parse(card)
+        except TypeError:
+            return None  # Vote non hashable (ex: liste) : ignoré
+
+    def nearest(self, value):
+        """
+        @brief Carte numérique du paquet la plus proche d'une valeur.
+        """
+        return min(self.numeric_values, key=lambda card: (abs(card - value), -card))
+
+    def steps_between(self, low, high):
+        """
+        @brief Nombre de cartes du paquet qui séparent deux valeurs.
+        """
+        cards = self.numeric_values
+        return abs(cards.index(self.nearest(high)) - cards.index(self.nearest(low)))
+
+
+DEFAULT_DECK = Deck(DEFAULT_CARDS)
+
+# Votes d'une manche : valeurs numériques triées et votes bruts {pseudo: carte}
+VoteSample = namedtuple('VoteSample', ['values', 'votes', 'deck'])
+
+# Règle enregistrée : fonction de calcul et libellé affiché dans le formulaire
+Rule = namedtuple('Rule', ['name', 'label', 'compute'])
+
+RULES = {}
+
+
+def register_rule(name, label=None):
+    """
+    @brief Décorateur d'enregistrement d'une règle de consensus.
+
+    La fonction reçoit un VoteSample (au moins un vote numérique) et
+    retourne (resultat, details).
+    """
+    def decorator(compute):
+        RULES[name] = Rule(name, label or name, compute)
+        return compute
+    return decorator
+
+
+def available_rules():
+    """
+    @brief Liste des règles enregistrées (ordre d'enregistrement).
+    """
+    return list(RULES.values())
+
+
+def sample_votes(votes, deck=DEFAULT_DECK, histogram=None):
+    """
+    @brief Convertit {pseudo: carte} en VoteSample (cartes spéciales ignorées).
+
+    @param histogram Histogramme {carte: nombre} déjà tenu à jour (voir tally.py) :
+                     les valeurs triées en sont déduites sans reparcourir les votes
+    """
+    if histogram is not None:
+        counted = sorted((deck.value(card), count) for card, count in histogram.items()
+                         if deck.value(card) is not None)
+        values = [value for value, count in counted for _ in range(count)]
+    else:
+        values = sorted(value for value in map(deck.value, votes.values()) if value is not None)
+    return VoteSample(values, votes, deck)
+
+
+def calculate(votes, rule_name, deck=DEFAULT_DECK, histogram=None):
+    """
+    @brief Calcule le résultat d'une manche avec la règle demandée.
+
+    @param votes Dictionnaire des votes {pseudo: valeur}
+    @param rule_name Nom d'une règle enregistrée
+    @param histogram Histogramme optionnel des votes de la manche (voir tally.py)
+    @return tuple (resultat_final, details_du_calcul)
+    """
+    sample = sample_votes(votes, deck, histogram)
+    if not sample.values:
+        # Si aucun vote numérique n'est soumis
+        return "N/A (Non numérique)", "Aucun vote numérique soumis pour le calcul."
+
+    rule = RULES.get(rule_name)
+    if rule is None:
+        return "N/A (Règle Inconnue)", "Le type de session spécifié n'est pas reconnu."
+
+    result, details = rule.compute(sample)
+    return str(result), details
+
+
+def _median(values):
+    """ @brief Médiane d'une liste déjà triée. """
+    n = len(values)
+    if n % 2 == 1:
+        return values[n // 2]
+    return (values[n // 2 - 1] + values[n // 2]) / 2
+
+
+# ------------------ Règles historiques ------------------
+
+@register_rule('strict', 'Strict')
+def strict_rule(sample):
+    """ @brief Consensus total : tous les votes numériques doivent être identiques. """
+    if sample.values[0] == sample.values[-1]:
+        return sample.values[0], "Consensus atteint : Tous les votes numériques sont identiques."
+    return "NO CONSENSUS", "Divergence détectée. Le vote est relancé par l'admin."
+
+
+@register_rule('median', 'Médiane')
+def median_rule(sample):
+    """ @brief Valeur centrale des votes (déjà triés). """
+    median = _median(sample.values)
+    return median, f"Médiane des votes numériques ({len(sample.values)}) : {median}"
+
+
+@register_rule('average', 'Moyenne')
+def average_rule(sample):
+    """ @brief Moyenne simple arrondie à une décimale. """
+    result = round(sum(sample.values) / len(sample.values), 1)
+    return result, f"Moyenne simple des votes numériques ({len(sample.values)}) : {result}"
+
+
+# ------------------ Nouvelles règles ------------------
+
+@register_rule('mode', 'Vote majoritaire')
+def mode_rule(sample):
+    """ @brief Valeur la plus votée (la plus haute en cas d'égalité). """
+    counts = {}
+    for value in sample.values:
+        counts[value] = counts.get(value, 0) + 1
+    best = max(counts, key=lambda value: (counts[value], value))
+    return best, f"Valeur la plus votée ({counts[best]} vote(s) sur {len(sample.values)}) : {best}"
+
+
+@register_rule('trimmed_mean', 'Moyenne tronquée')
+def trimmed_mean_rule(sample):
+    """ @brief Moyenne sans les 10 % de votes extrêmes de chaque côté (au moins un à partir de 3 votes). """
+    values = sample.values
+    cut = max(1, len(values) // 10) if len(values) >= 3 else 0
+    kept = values[cut:len(values) - cut]
+    result = round(sum(kept) / len(kept), 1)
+    return result, f"Moyenne tronquée ({len(kept)} votes gardés sur {len(values)}) : {result}"
+
+
+@register_rule('fibonacci', 'Moyenne arrondie à la carte')
+def fibonacci_rule(sample):
+    """ @brief Moyenne ramenée à la carte la plus proche du paquet (0, 1, 2, 3, 5, 8, 13...). """
+    average = sum(sample.values) / len(sample.values)
+    card = sample.deck.nearest(average)
+    return card, f"Moyenne {round(average, 1)} arrondie à la carte la plus proche : {card}"
+
+
+@register_rule('outliers', 'Médiane avec discussion des extrêmes')
+def outliers_rule(sample, max_steps=2):
+    """
+    @brief Déclenche une discussion si le plus petit et le plus grand vote
+    sont séparés de plus de max_steps cartes, sinon retourne la médiane.
+    """
+    low, high = sample.values[0], sample.values[-1]
+    if sample.deck.steps_between(low, high) > max_steps:
+        low_users = sorted(user for user, card in sample.votes.items() if sample.deck.value(card) == low)
+        high_users = sorted(user for user, card in sample.votes.items() if sample.deck.value(card) == high)
+        return "DISCUSSION", (f"Écart important : {', '.join(low_users)} ({low}) et "
+                              f"{', '.join(high_users)} ({high}) expliquent leur estimation.")
+    return median_rule(sample)
+
+
+# ------------------ API par lots (rétrospectives) ------------------
+
+def score_backlog(backlog, deck=DEFAULT_DECK):
+    """
+    @brief Statistiques vectorisées des votes de nombreuses tâches.
+
+    Toutes les valeurs sont aplaties dans un seul tableau NumPy et
+    regroupées par tâche : aucun parcours Python par vote.
+    @param backlog Liste de tâches (utilise 'votes_submitted' si présent)
+    @return Liste de dicts {'index', 'name', 'count', 'mean', 'median', 'min', 'max', 'std'}
+            (valeurs None pour les tâches sans vote numérique)
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("NumPy est requis pour score_backlog (pip install numpy).")
+
+    values, groups = [], []
+    for index, story in enumerate(backlog):
+        for card in (story.get('votes_submitted') or {}).values():
+            value = deck.value(card)
+            if value is not None:
+                values.append(value)
+                groups.append(index)
+
+    n_stories = len(backlog)
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups, dtype=np.int64)
+    counts = np.bincount(groups, minlength=n_stories)
+    has_votes = counts > 0
+    safe_counts = np.maximum(counts, 1)
+
+    sums = np.bincount(groups, weights=values, minlength=n_stories)
+    squares = np.bincount(groups, weights=values * values, minlength=n_stories)
+    means = sums / safe_counts
+    stds = np.sqrt(np.maximum(squares / safe_counts - means * means, 0.0))
+
+    # Tri par (tâche, valeur) : chaque tâche devient une tranche contiguë et triée
+    sorted_values = np.append(values[np.lexsort((values, groups))], 0.0)  # sentinelle
+    starts = np.cumsum(counts) - counts
+    minimums = sorted_values[starts]
+    maximums = sorted_values[starts + safe_counts - 1]
+    medians = (sorted_values[starts + (safe_counts - 1) // 2] + sorted_values[starts + safe_counts // 2]) / 2
+
+    results = []
+    for index, story in enumerate(backlog):
+        if has_votes[index]:
+            stats = {'count': int(counts[index]), 'mean': float(means[index]),
+                     'median': float(medians[index]), 'min': float(minimums[index]),
+                     'max': float(maximums[index]), 'std': float(stds[index])}
+        else:
+            stats = {'count': 0, 'mean': None, 'median': None, 'min': None, 'max': None, 'std': None}
+        results.append(dict(index=index, name=story.get('name'), **stats))
+    return results
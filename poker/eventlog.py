@@ -0,0 +1,422 @@
+"""
+@file eventlog.py
+@brief Persistance des salles : journal d'événements en ajout seul + snapshots
+
+Chaque modification durable d'une salle (création, démarrage, vote,
+départ d'un participant, révélation, tâche suivante, relance, suppression)
+est ajoutée au journal sous forme d'une ligne JSON compacte
+{"s": séquence, "r": salle, "t": type, "d": données}.
+Les écritures sont regroupées : un fsync par intervalle (50 ms par défaut)
+au lieu d'un par événement.
+
+Quand une salle accumule assez d'événements, son état compacté est écrit
+dans snapshots/<salle>.json. Les segments du journal entièrement couverts
+par des snapshots sont supprimés. Au démarrage, replay() relit les
+snapshots puis les événements plus récents pour reconstruire les salles.
+
+Les événements affectent des valeurs (pas d'incréments) : rejouer un
+événement déjà inclus dans un snapshot ne change pas l'état.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from poker.logs import log_event
+from poker.tally import apply_delta, empty_tally, vote_delta
+
+SEGMENT_PREFIX = 'events-'
+SEGMENT_SUFFIX = '.log'
+
+# Champs liés aux connexions ou recalculés : jamais persistés
+TRANSIENT_FIELDS = ('participants', 'admin_sid', 'timer_end_time', 'tally', 'revision', 'last_activity')
+
+
+class CorruptEventLogError(Exception):
+    """ @brief Journal illisible ou incomplet : le rejouer donnerait un état faux. """
+
+
+def durable_state(room_data):
+    """ @brief Copie de l'état d'une salle sans les champs transitoires. """
+    return {key: value for key, value in room_data.items() if key not in TRANSIENT_FIELDS}
+
+
+def restore_state(state):
+    """
+    @brief Complète un état rejoué avec les champs transitoires (salle sans connexion).
+    """
+    room_data = dict(state, participants={}, admin_sid=None, timer_end_time=None, revision=0)
+    room_tally = empty_tally()
+    for vote in room_data.get('votes', {}).values():
+        apply_delta(room_tally, vote_delta(None, vote))
+    room_data['tally'] = room_tally
+    return room_data
+
+
+# ------------------ Application des événements (rejeu) ------------------
+
+def _on_create(rooms, room_id, data):
+    rooms[room_id] = durable_state(data)
+
+
+def _on_start(rooms, room_id, data):
+    room = rooms[room_id]
+    room.update(is_started=True, use_timer=data['use_timer'], timer_duration=data['timer_duration'],
+                votes={}, is_revealed=False)
+
+
+def _on_vote(rooms, room_id, data):
+    votes = rooms[room_id]['votes']
+    if data['v'] is None:
+        votes.pop(data['u'], None)
+    else:
+        votes[data['u']] = data['v']
+
+
+def _on_leave(rooms, room_id, data):
+    # Le participant parti perd son vote de la manche en cours
+    rooms[room_id]['votes'].pop(data['u'], None)
+
+
+def _on_reveal(rooms, room_id, data):
+    room = rooms[room_id]
+    room['is_revealed'] = True
+    if 0 <= data['i'] < len(room['backlog']):
+        story = room['backlog'][data['i']]
+        story.update(final_vote=data['result'], consensus_rule=data['rule'],
+                     votes_submitted=dict(data['votes']))
+
+
+def _on_next(rooms, room_id, data):
+    rooms[room_id].update(current_story_index=data['i'], votes={}, is_revealed=False)
+
+
+def _on_restart(rooms, room_id, data):
+    rooms[room_id].update(votes={}, is_revealed=False)
+
+
+def _on_delete(rooms, room_id, data):
+    rooms.pop(room_id, None)
+
+
+EVENT_HANDLERS = {
+    'create': _on_create,
+    'start': _on_start,
+    'vote': _on_vote,
+    'leave': _on_leave,
+    'reveal': _on_reveal,
+    'next': _on_next,
+    'restart': _on_restart,
+    'delete': _on_delete,
+}
+
+
+def apply_event(rooms, room_id, event_type, data):
+    """
+    @brief Applique un événement du journal sur {room_id: état durable}.
+
+    Les événements d'une salle inconnue (déjà supprimée) sont ignorés.
+    """
+    if event_type != 'create' and room_id not in rooms:
+        return
+    EVENT_HANDLERS[event_type](rooms, room_id, data)
+
+
+def _read_header(line):
+    """
+    @brief Lit (séquence, salle) d'une ligne du journal sans décoder l'événement.
+
+    @throw ValueError si la ligne n'a pas la forme écrite par EventLog.append
+    """
+    if line.startswith('{"s":'):
+        comma = line.find(',"r":"', 5)
+        end = line.find('","t":"', comma + 6)
+        if comma > 0 and end > 0 and '\\' not in line[comma + 6:end]:
+            return int(line[5:comma]), line[comma + 6:end]
+    record = json.loads(line)  # Forme inattendue : décodage complet
+    return record['s'], record['r']
+
+
+class EventLog:
+    """
+    @brief Journal en ajout seul, découpé en segments, avec snapshots par salle.
+    """
+
+    def __init__(self, directory, fsync_interval=0.05, snapshot_every=1000,
+                 segment_bytes=16 * 1024 * 1024, start_task=None, sleep=time.sleep):
+        """
+        @param directory Dossier du journal (segments events-*.log et snapshots/)
+        @param fsync_interval Intervalle (s) entre deux fsync groupés (0 = fsync à chaque événement)
+        @param snapshot_every Événements d'une salle avant l'écriture de son snapshot (0 = jamais)
+        @param segment_bytes Taille d'un segment avant de passer au suivant
+        @param start_task Lanceur de tâche de fond (ex: socketio.start_background_task)
+        @param sleep Fonction d'attente compatible avec le mode async (ex: socketio.sleep)
+        """
+        self.directory = directory
+        self.snapshot_dir = os.path.join(directory, 'snapshots')
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.segment_bytes = segment_bytes
+        self._start_task = start_task
+        self._sleep = sleep
+        self._state_source = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # Un seul sync() à la fois (snapshots, compaction)
+        self._running = False
+
+        self._seq = 0
+        self._file = None
+        self._segment_first = None
+        self._segments = []         # [(première séquence, dernière séquence, {salles})] segments fermés
+        self._segment_rooms = set()  # Salles du segment courant
+        self._covered = {}          # {'room_id': séquence couverte par son snapshot (ou sa suppression)}
+        self._pending_counts = {}   # {'room_id': événements depuis le dernier snapshot}
+        self._due = set()           # Salles dont le snapshot est à écrire
+        self._dirty = False
+
+        self.appended = 0
+        self.fsyncs = 0
+        self.snapshots_written = 0
+
+    def set_state_source(self, get_state):
+        """
+        @brief Fonction get_state(room_id) -> état de la salle (ou None), lue pour les snapshots.
+        """
+        self._state_source = get_state
+
+    # ------------------ Fichiers ------------------
+
+    def _segment_path(self, first_seq):
+        return os.path.join(self.directory, f'{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}')
+
+    def _snapshot_path(self, room_id):
+        return os.path.join(self.snapshot_dir, f'{room_id}.json')
+
+    def _segment_files(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _open_segment(self):
+        self._segment_first = self._seq + 1
+        self._segment_rooms = set()
+        self._file = open(self._segment_path(self._segment_first), 'a', encoding='utf-8')
+
+    # ------------------ Rejeu ------------------
+
+    def replay(self):
+        """
+        @brief Reconstruit les salles à partir des snapshots et du journal.
+
+        À appeler une fois au démarrage, avant tout append(). Seule la dernière
+        ligne du dernier segment peut être incomplète (arrêt brutal) : elle est
+        retirée du fichier.
+        @return dict {'room_id': room_data} prêt pour RoomStore.create_room
+        @throw CorruptEventLogError si un enregistrement est illisible ou si la séquence a un trou
+        """
+        rooms, floors = {}, {}
+        for name in os.listdir(self.snapshot_dir):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(self.snapshot_dir, name), encoding='utf-8') as f:
+                snapshot = json.load(f)
+            rooms[snapshot['room_id']] = snapshot['state']
+            floors[snapshot['room_id']] = snapshot['seq']
+        self._covered = dict(floors)
+
+        segments = self._segment_files()
+        expected = None  # Séquence attendue : les segments restants se suivent sans trou
+        for number, path in enumerate(segments):
+            first = last = None
+            segment_rooms = set()
+            valid_bytes = 0
+            with open(path, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        if number < len(segments) - 1:
+                            raise CorruptEventLogError(f"{path} : ligne incomplète avant la fin du journal")
+                        # Dernière ligne tronquée par un arrêt brutal : retirée pour les prochains rejeux
+                        log_event('event_log_truncated', "Dernière ligne du journal tronquée, ignorée",
+                                  level=logging.WARNING, path=path)
+                        os.truncate(path, valid_bytes)
+                        break
+                    try:
+                        line = raw.decode('utf-8')
+                        if floors:
+                            # Avec des snapshots, les événements déjà couverts ne sont pas décodés
+                            seq, room_id = _read_header(line)
+                            record = json.loads(line) if seq > floors.get(room_id, 0) else None
+                        else:
+                            record = json.loads(line)
+                            seq, room_id = record['s'], record['r']
+                        if expected is not None and seq != expected:
+                            raise CorruptEventLogError(f"{path} : séquence {seq} au lieu de {expected}")
+                        if record is not None:
+                            apply_event(rooms, room_id, record['t'], record['d'])
+                    except (ValueError, KeyError, TypeError) as e:
+                        raise CorruptEventLogError(
+                            f"{path} : enregistrement illisible (séquence attendue {expected})") from e
+                    expected = seq + 1
+                    valid_bytes += len(raw)
+                    first = seq if first is None else first
+                    last = seq
+                    segment_rooms.add(room_id)
+            if not valid_bytes:
+                os.remove(path)  # Segment vide (sa seule ligne était tronquée)
+            if last is not None:
+                self._segments.append((first, last, segment_rooms))
+                self._seq = max(self._seq, last)
+        return {room_id: restore_state(state) for room_id, state in rooms.items()}
+
+    # ------------------ Écriture ------------------
+
+    def append(self, room_id, event_type, data):
+        """
+        @brief Ajoute un événement au journal (rendu durable au prochain fsync groupé).
+
+        @return Numéro de séquence de l'événement
+        """
+        if event_type not in EVENT_HANDLERS:
+            raise ValueError(f"Type d'événement inconnu : {event_type}")
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._seq += 1
+            self._file.write(json.dumps({'s': self._seq, 'r': room_id, 't': event_type, 'd': data},
+                                        separators=(',', ':'), ensure_ascii=False) + '\n')
+            self._segment_rooms.add(room_id)
+            self._dirty = True
+            self.appended += 1
+
+            if event_type == 'delete':
+                self._covered[room_id] = self._seq
+                self._pending_counts.pop(room_id, None)
+                self._due.discard(room_id)
+            elif self.snapshot_every:
+                count = self._pending_counts.get(room_id, 0) + 1
+                self._pending_counts[room_id] = count
+                if count >= self.snapshot_every:
+                    self._due.add(room_id)
+
+            if self._file.tell() >= self.segment_bytes:
+                self._rotate()
+            seq = self._seq
+
+        if event_type == 'delete':
+            try:
+                os.remove(self._snapshot_path(room_id))
+            except FileNotFoundError:
+                pass
+        if not self.fsync_interval:
+            self.sync()
+        else:
+            self._ensure_running()
+        return seq
+
+    def _rotate(self):
+        """ @brief Ferme le segment courant (appelée sous le verrou). """
+        self._fsync_locked()
+        self._file.close()
+        self._segments.append((self._segment_first, self._seq, self._segment_rooms))
+        # Snapshot périodique des salles du segment : il pourra ensuite être supprimé
+        self._due.update(room_id for room_id in self._segment_rooms
+                         if self._covered.get(room_id, 0) < self._seq)
+        self._file = None
+
+    def _fsync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self.fsyncs += 1
+
+    def sync(self):
+        """
+        @brief fsync groupé, puis snapshots dus et suppression des segments couverts.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if self._file is not None and self._dirty:
+                    self._fsync_locked()
+                due, self._due = self._due, set()
+            for room_id in due:
+                self.write_snapshot(room_id)
+            if due:
+                self.compact()
+
+    def write_snapshot(self, room_id):
+        """
+        @brief Écrit l'état compacté d'une salle (fichier temporaire puis renommage atomique).
+        """
+        if self._state_source is None:
+            return False
+        with self._lock:
+            seq = self._seq
+        room_data = self._state_source(room_id)
+        if room_data is None:
+            return False
+        path = self._snapshot_path(room_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'room_id': room_id, 'seq': seq, 'state': durable_state(room_data)},
+                      f, separators=(',', ':'), ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._covered[room_id] = max(self._covered.get(room_id, 0), seq)
+            self._pending_counts.pop(room_id, None)
+            self.snapshots_written += 1
+        return True
+
+    def compact(self):
+        """
+        @brief Supprime les plus anciens segments fermés dont toutes les salles ont un snapshot plus récent.
+
+        @return Nombre de segments supprimés
+        """
+        removed = 0
+        with self._lock:
+            while self._segments:
+                first, last, segment_rooms = self._segments[0]
+                if any(self._covered.get(room_id, 0) < last for room_id in segment_rooms):
+                    break
+                self._segments.pop(0)
+                os.remove(self._segment_path(first))
+                removed += 1
+        return removed
+
+    def close(self):
+        """ @brief Rend tout durable et ferme le segment courant. """
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        """ @brief Compteurs du journal. """
+        return {'seq': self._seq, 'appended': self.appended, 'fsyncs': self.fsyncs,
+                'snapshots': self.snapshots_written, 'segments': len(self._segments) + (self._file is not None)}
+
+    # ------------------ Tâche de fond ------------------
+
+    def _run(self):
+        while True:
+            self._sleep(self.fsync_interval)
+            try:
+                self.sync()
+            except Exception:
+                log_event('event_log_error', "Erreur lors de la synchronisation du journal",
+                          level=logging.ERROR, exc_info=True)
+
+    def _ensure_running(self):
+        if self._start_task is None or self._running:
+            return
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._start_task(self._run)
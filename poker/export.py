@@ -0,0 +1,126 @@
+"""
+@file export.py
+@brief Export en flux du backlog estimé (JSON, CSV, NDJSON)
+
+Le backlog est lu par pages dans le stockage (RoomStore.iter_backlog)
+et chaque tâche est écrite dès qu'elle est lue : le document complet
+n'existe jamais en mémoire. Les lignes sont regroupées en morceaux
+d'environ CHUNK_BYTES pour la réponse HTTP découpée (chunked).
+
+Colonnes : index, name, description, puis les champs optionnels choisis
+parmi final_vote, consensus_rule et votes (votes bruts de la manche).
+"""
+
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+BASE_FIELDS = ('index', 'name', 'description')
+OPTIONAL_FIELDS = ('final_vote', 'consensus_rule', 'votes')
+DEFAULT_FIELDS = OPTIONAL_FIELDS
+CHUNK_BYTES = 64 * 1024
+
+
+class ExportError(ValueError):
+    """ @brief Paramètre d'export invalide (format ou champ inconnu). """
+
+
+def parse_fields(spec):
+    """
+    @brief Lit la liste des champs optionnels ("final_vote,votes").
+
+    @param spec Chaîne séparée par des virgules, ou None pour les champs par défaut
+    @return tuple des champs optionnels, dans l'ordre de OPTIONAL_FIELDS
+    @throw ExportError si un champ est inconnu
+    """
+    if spec is None:
+        return DEFAULT_FIELDS
+    requested = {field.strip() for field in spec.split(',') if field.strip()}
+    unknown = requested - set(OPTIONAL_FIELDS)
+    if unknown:
+        raise ExportError(f"Champ(s) d'export inconnu(s) : {', '.join(sorted(unknown))} "
+                          f"(disponibles : {', '.join(OPTIONAL_FIELDS)})")
+    return tuple(field for field in OPTIONAL_FIELDS if field in requested)
+
+
+def export_row(index, story, fields):
+    """
+    @brief Tâche exportée : colonnes de base puis champs optionnels demandés.
+    """
+    row = {'index': index, 'name': story.get('name', ''), 'description': story.get('description', '')}
+    for field in fields:
+        # Les votes bruts sont stockés sous 'votes_submitted' à la révélation
+        row[field] = story.get('votes_submitted' if field == 'votes' else field)
+    return row
+
+
+def _json_lines(stories, fields):
+    for index, story in enumerate(stories):
+        yield json.dumps(export_row(index, story, fields), ensure_ascii=False)
+
+
+def _ndjson(stories, fields):
+    for line in _json_lines(stories, fields):
+        yield line + '\n'
+
+
+def _json(stories, fields):
+    yield '['
+    separator = '\n'
+    for line in _json_lines(stories, fields):
+        yield separator + line
+        separator = ',\n'
+    yield '\n]\n'
+
+
+def _csv(stories, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(BASE_FIELDS + fields)
+    for index, story in enumerate(stories):
+        row = export_row(index, story, fields)
+        if 'votes' in row:
+            row['votes'] = json.dumps(row['votes'], ensure_ascii=False) if row['votes'] is not None else ''
+        writer.writerow(['' if value is None else value for value in row.values()])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+WRITERS = {'json': _json, 'ndjson': _ndjson, 'csv': _csv}
+
+
+def _chunks(parts, chunk_bytes):
+    """ @brief Regroupe de petits morceaux de texte en blocs encodés d'environ chunk_bytes. """
+    pending = []
+    size = 0
+    for part in parts:
+        pending.append(part)
+        size += len(part)
+        if size >= chunk_bytes:
+            yield ''.join(pending).encode('utf-8')
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending).encode('utf-8')
+
+
+def stream_export(stories, fmt='json', fields=DEFAULT_FIELDS, chunk_bytes=CHUNK_BYTES):
+    """
+    @brief Générateur des octets de l'export.
+
+    @param stories Itérable de tâches (ex: RoomStore.iter_backlog), consommé au fil de l'eau
+    @param fmt 'json', 'ndjson' ou 'csv'
+    @param fields Champs optionnels (voir parse_fields)
+    @throw ExportError si le format est inconnu
+    """
+    if fmt not in WRITERS:
+        raise ExportError(f"Format d'export non supporté : {fmt} ({', '.join(EXPORT_FORMATS)})")
+    return _chunks(WRITERS[fmt](stories, tuple(fields)), chunk_bytes)
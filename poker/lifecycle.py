@@ -0,0 +1,274 @@
+"""
+@file lifecycle.py
+@brief Cycle de vie des salles : activité, TTL d'inactivité et éviction LRU
+
+Les salles n'étaient jamais supprimées. Ce gestionnaire suit la dernière
+activité de chaque salle, supprime les salles vides restées inactives
+plus longtemps que le TTL, et applique une limite sur le nombre de salles
+ou leur taille totale estimée (éviction de la moins récemment utilisée).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from poker.logs import log_event
+from poker.model import SharedBacklog, to_plain
+
+
+def estimate_room_bytes(room_data):
+    """
+    @brief Estime la taille d'une salle (taille de sa sérialisation JSON).
+
+    Les tâches d'un modèle de backlog, partagées, ne comptent pas : seules
+    les tâches copiées dans la salle (estimées) s'ajoutent à sa taille.
+    """
+    backlog = room_data.get('backlog')
+    if isinstance(backlog, SharedBacklog):
+        plain = to_plain({key: value for key, value in room_data.items() if key != 'backlog'})
+        plain['backlog'] = to_plain(backlog.owned())
+    else:
+        plain = to_plain(room_data)
+    return len(json.dumps(plain, default=str, ensure_ascii=False).encode('utf-8'))
+
+
+def backlog_snapshot_hook(directory):
+    """
+    @brief Crée un hook d'éviction qui sauvegarde le backlog estimé en JSON.
+
+    @param directory Dossier de destination (<directory>/<room_id>.json)
+    @return Fonction hook(room_id, room_data)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    def hook(room_id, room_data):
+        path = os.path.join(directory, f'{room_id}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'session_name': room_data.get('session_name'),
+                       'backlog': to_plain(room_data.get('backlog', []))},
+                      f, ensure_ascii=False, indent=2)
+
+    return hook
+
+
+class RoomLifecycle:
+    """
+    @brief Suivi LRU de l'activité des salles et politique d'éviction.
+
+    - TTL : une salle vide, inactive depuis plus de idle_ttl secondes, est supprimée
+    - Limites : au-delà de max_rooms salles (ou max_bytes octets estimés),
+      les salles les moins récemment utilisées sont supprimées, les vides en premier
+    """
+
+    def __init__(self, store, idle_ttl=3600, max_rooms=0, max_bytes=0,
+                 on_evict=None, clock=time.time, locks=None):
+        """
+        @param store RoomStore des salles
+        @param idle_ttl Durée d'inactivité (s) avant éviction d'une salle vide
+        @param max_rooms Nombre maximal de salles (0 = illimité)
+        @param max_bytes Taille totale estimée maximale (0 = illimitée)
+        @param on_evict Hook optionnel appelé avec (room_id, room_data) avant suppression
+        @param clock Horloge murale (injectable pour les tests)
+        @param locks RoomLocks optionnel : l'éviction attend la fin des transitions de la salle
+        """
+        self._store = store
+        self._locks = locks
+        self.idle_ttl = idle_ttl
+        self.max_rooms = max_rooms
+        self.max_bytes = max_bytes
+        self._hooks = [on_evict] if on_evict else []
+        self._clock = clock
+        self._last_activity = OrderedDict()  # {'room_id': timestamp}, du plus ancien au plus récent
+        self._persisted = {}                 # {'room_id': timestamp écrit dans le stockage}
+        self._lru_lock = threading.Lock()    # touch() est appelé par des handlers concurrents
+        self._running = False
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def add_hook(self, hook):
+        """ @brief Ajoute un hook appelé avant chaque éviction. """
+        self._hooks.append(hook)
+
+    def touch(self, room_id):
+        """
+        @brief Note une activité sur la salle (la place en fin de LRU).
+
+        Le timestamp est aussi écrit dans le stockage (au plus une fois par
+        dixième de TTL) pour que les autres workers voient l'activité.
+        """
+        now = self._clock()
+        with self._lru_lock:
+            self._last_activity[room_id] = now
+            self._last_activity.move_to_end(room_id)
+            persist = now - self._persisted.get(room_id, 0) >= self.idle_ttl / 10
+            if persist:
+                self._persisted[room_id] = now
+        if persist:
+            if room_id in self._store:
+                self._store.update_room(room_id, last_activity=now)
+
+    def forget(self, room_id):
+        """ @brief Arrête le suivi d'une salle (supprimée par ailleurs). """
+        with self._lru_lock:
+            self._last_activity.pop(room_id, None)
+            self._persisted.pop(room_id, None)
+
+    def _evict(self, room_id, evictable):
+        """
+        @brief Relit la salle sous son verrou, appelle les hooks puis la supprime.
+
+        La salle a été choisie sans verrou : un join a pu la remplir entre-temps.
+        @param evictable Prédicat sur l'état relu de la salle (False = on la garde)
+        @return True si la salle a été supprimée
+        """
+        with self._locks.hold(room_id) if self._locks is not None else nullcontext(True) as exists:
+            room_data = self._store.get_room(room_id) if exists else None
+            if room_data is None:
+                self.forget(room_id)
+                return False
+            if not evictable(room_data):
+                return False
+            for hook in self._hooks:
+                try:
+                    hook(room_id, room_data)
+                except Exception:
+                    log_event('eviction_hook_error', "Erreur du hook d'éviction", level=logging.ERROR,
+                              exc_info=True, room=room_id)
+            if self._locks is not None:
+                self._locks.delete_room(room_id)
+            else:
+                self._store.delete_room(room_id)
+        self.forget(room_id)
+        return True
+
+    def _is_idle(self, room_id, room_data, now):
+        """ @brief Salle vide et sans activité (locale ou d'un autre worker) depuis idle_ttl. """
+        with self._lru_lock:
+            seen = self._last_activity.get(room_id, 0)
+        last_activity = max(seen, room_data.get('last_activity') or 0)
+        return not room_data['participants'] and now - last_activity >= self.idle_ttl
+
+    def sweep(self):
+        """
+        @brief Applique le TTL puis les limites de capacité.
+
+        @return Liste des salles évincées
+        """
+        now = self._clock()
+        evicted = []
+
+        # Salles connues du stockage mais jamais vues par ce processus
+        known = self._store.room_ids()
+        with self._lru_lock:
+            for room_id in known:
+                if room_id not in self._last_activity:
+                    self._last_activity[room_id] = now
+                    self._last_activity.move_to_end(room_id, last=False)
+            activity = list(self._last_activity.items())
+
+        # 1. TTL : salles vides et inactives
+        for room_id, last_seen in activity:
+            if now - last_seen < self.idle_ttl:
+                break  # Ordre LRU : toutes les suivantes sont plus récentes
+            room_data = self._store.get_room(room_id)
+            if room_data is None:
+                self.forget(room_id)
+                continue
+            # Un autre worker a peut-être vu une activité plus récente
+            stored = room_data.get('last_activity') or 0
+            if now - stored < self.idle_ttl:
+                with self._lru_lock:
+                    self._last_activity[room_id] = stored
+                    self._last_activity.move_to_end(room_id)
+                continue
+            if not room_data['participants'] and \
+                    self._evict(room_id, lambda data: self._is_idle(room_id, data, now)):
+                self.evicted_idle += 1
+                evicted.append(room_id)
+
+        # 2. Limites : nombre de salles et taille estimée
+        evicted += self.enforce_capacity()
+        return evicted
+
+    def enforce_capacity(self, include_bytes=True):
+        """
+        @brief Évince en LRU (salles vides d'abord) jusqu'à respecter les limites.
+
+        La salle la plus récemment utilisée n'est jamais évincée (ex: salle
+        qui vient d'être créée).
+        @param include_bytes Vérifier aussi max_bytes (coûteux : sérialise chaque salle)
+        @return Liste des salles évincées
+        """
+        check_bytes = include_bytes and bool(self.max_bytes)
+        if not self.max_rooms and not check_bytes:
+            return []
+
+        sizes = {}
+        if check_bytes:
+            for room_id in list(self._last_activity):
+                room_data = self._store.get_room(room_id)
+                if room_data is not None:
+                    sizes[room_id] = estimate_room_bytes(room_data)
+
+        def over_capacity():
+            if self.max_rooms and len(self._last_activity) > self.max_rooms:
+                return True
+            return check_bytes and sum(sizes.values()) > self.max_bytes
+
+        evicted = []
+        for empty_only in (True, False):
+            for room_id in list(self._last_activity)[:-1]:
+                if not over_capacity():
+                    return evicted
+                room_data = self._store.get_room(room_id)
+                if room_data is None:
+                    self.forget(room_id)
+                    sizes.pop(room_id, None)
+                    continue
+                if empty_only and room_data['participants']:
+                    continue
+                if not self._evict(room_id, lambda data: not (empty_only and data['participants'])):
+                    if room_id not in self._store:
+                        sizes.pop(room_id, None)
+                    continue
+                sizes.pop(room_id, None)
+                self.evicted_capacity += 1
+                evicted.append(room_id)
+        return evicted
+
+    def stats(self):
+        """
+        @brief Compteurs pour dimensionner les instances.
+
+        @return dict {'live_rooms', 'tracked_rooms', 'evicted_idle', 'evicted_capacity', 'evicted_total'}
+        """
+        return {
+            'live_rooms': len(self._store),
+            'tracked_rooms': len(self._last_activity),
+            'evicted_idle': self.evicted_idle,
+            'evicted_capacity': self.evicted_capacity,
+            'evicted_total': self.evicted_idle + self.evicted_capacity,
+        }
+
+    def start(self, start_task, sleep, interval=60):
+        """
+        @brief Lance (une seule fois) la tâche de fond de balayage périodique.
+        """
+        if self._running:
+            return
+        self._running = True
+
+        def run():
+            while True:
+                sleep(interval)
+                try:
+                    self.sweep()
+                except Exception:
+                    log_event('sweep_error', "Erreur lors du balayage des salles", level=logging.ERROR,
+                              exc_info=True)
+
+        start_task(run)
@@ -0,0 +1,96 @@
+"""
+@file locks.py
+@brief Verrou par salle et verrou court du registre des salles
+
+Les handlers lisent puis modifient l'état d'une salle en plusieurs
+étapes (vérifier is_revealed puis révéler, vérifier l'index puis
+avancer...). Sans synchronisation, deux handlers concurrents (serveur
+threadé ou greenlets) peuvent entrelacer ces étapes.
+
+Chaque salle a son propre verrou (réentrant : reveal_room est appelée
+depuis un handler qui tient déjà le verrou). Les transitions d'une salle
+sont atomiques, et des salles indépendantes avancent en parallèle. Un
+verrou global distinct, tenu très brièvement, protège seulement la
+création et la suppression des salles (et de leurs verrous).
+
+Ordre des verrous : salle, puis registre ; jamais deux salles à la fois.
+Les verrous sont propres au processus : entre workers (Redis), chaque
+opération du stockage reste atomique (transactions), mais pas les
+transitions en plusieurs étapes.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class RoomLocks:
+    """
+    @brief Registre {salle -> verrou}, créé à la demande pour les salles existantes.
+    """
+
+    def __init__(self, store, lock_factory=threading.RLock):
+        """
+        @param store RoomStore des salles (création, suppression, existence)
+        @param lock_factory Fabrique des verrous de salle (réentrants)
+        """
+        self._store = store
+        self._lock_factory = lock_factory
+        self._locks = {}  # {'room_id': verrou}
+        self._registry_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._locks)
+
+    def lock_for(self, room_id):
+        """
+        @brief Verrou d'une salle existante.
+
+        Les salles créées ailleurs (autre worker, rejeu du journal) reçoivent
+        leur verrou au premier accès ; un identifiant inconnu n'en crée pas.
+        @return Le verrou, ou None si la salle n'existe pas
+        """
+        lock = self._locks.get(room_id)
+        if lock is None and isinstance(room_id, str):
+            with self._registry_lock:
+                lock = self._locks.get(room_id)
+                if lock is None and room_id in self._store:
+                    lock = self._locks[room_id] = self._lock_factory()
+        return lock
+
+    @contextmanager
+    def hold(self, room_id):
+        """
+        @brief Tient le verrou de la salle le temps d'une transition.
+
+        @return (via with) True si la salle existe encore une fois le verrou obtenu
+        """
+        lock = self.lock_for(room_id)
+        if lock is None:
+            yield False
+            return
+        with lock:
+            # La salle a pu être supprimée pendant l'attente
+            yield self._locks.get(room_id) is lock
+
+    def create_room(self, room_id, room_data):
+        """
+        @brief Crée la salle dans le stockage et enregistre son verrou.
+
+        @throw KeyError si l'identifiant est déjà pris
+        """
+        with self._registry_lock:
+            if room_id in self._store:
+                raise KeyError(room_id)
+            self._store.create_room(room_id, room_data)
+            self._locks[room_id] = self._lock_factory()
+
+    def delete_room(self, room_id):
+        """
+        @brief Supprime la salle et oublie son verrou.
+
+        À appeler en tenant le verrou de la salle (voir hold) : la suppression
+        n'interrompt pas une transition en cours.
+        """
+        with self._registry_lock:
+            self._store.delete_room(room_id)
+            self._locks.pop(room_id, None)
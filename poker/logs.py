@@ -0,0 +1,290 @@
+"""
+@file logs.py
+@brief Journalisation structurée non bloquante
+
+Les handlers n'écrivent plus sur la sortie standard : log_event() crée
+un enregistrement (événement + champs) et le pose dans une file en
+mémoire (logging.handlers.QueueHandler). Un thread le formate et l'écrit :
+le QueueListener de la bibliothèque standard, ou BackgroundWriter, un
+thread système, sous gevent/eventlet. La boucle d'événements ne fait donc
+jamais d'E/S pour journaliser.
+
+Pour chaque type d'événement, on peut fixer un niveau minimal, et
+limiter le débit des événements fréquents (les votes individuels, par
+exemple). Au-delà du débit, les enregistrements sont ignorés. Leur
+nombre est ajouté au suivant (champ sampled_out).
+
+Variables d'environnement :
+- LOG_FORMAT : text (défaut) ou json (une ligne JSON par enregistrement)
+- LOG_LEVEL : niveau global (INFO par défaut)
+- LOG_EVENT_LEVELS : niveaux par événement, ex. "vote=WARNING,join=DEBUG"
+- LOG_SAMPLE_RATES : débit maximal par événement (par seconde), ex. "vote=20"
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from poker.server import native_threading
+
+LOGGER_NAME = 'poker'
+LOG_FORMATS = ('text', 'json')
+DEFAULT_SAMPLE_RATES = 'vote=20'
+
+logger = logging.getLogger(LOGGER_NAME)
+_event_levels = {}   # {'événement': niveau minimal}
+_sampler = None      # EventSampler actif (None = pas d'échantillonnage)
+_traceback_formatter = logging.Formatter()
+
+
+def parse_mapping(spec, convert, variable):
+    """
+    @brief Lit une configuration "cle=valeur,cle=valeur".
+
+    @throw ValueError si une entrée est invalide
+    """
+    mapping = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        key, sep, value = item.partition('=')
+        try:
+            if not sep or not key.strip():
+                raise ValueError(item)
+            mapping[key.strip()] = convert(value.strip())
+        except ValueError:
+            raise ValueError(f"{variable} invalide : {item!r} (attendu : evenement=valeur)")
+    return mapping
+
+
+def parse_level(name):
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(name)
+    return level
+
+
+class EventSampler:
+    """
+    @brief Limite le débit d'enregistrement par événement (seau à jetons).
+    """
+
+    def __init__(self, rates, clock=time.monotonic):
+        """
+        @param rates dict {'événement': enregistrements par seconde}
+        """
+        self.rates = dict(rates)
+        self._clock = clock
+        self._buckets = {}  # {'événement': [jetons, dernière recharge, ignorés]}
+        self._lock = threading.Lock()
+
+    def allow(self, event):
+        """
+        @brief Décide si un enregistrement de l'événement est écrit.
+
+        @return (accepté, nombre d'enregistrements ignorés depuis le dernier accepté)
+        """
+        rate = self.rates.get(event)
+        if not rate:
+            return True, 0
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = [rate, now, 0]
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False, 0
+            bucket[0] -= 1
+            skipped, bucket[2] = bucket[2], 0
+            return True, skipped
+
+
+def log_event(event, msg, level=logging.INFO, exc_info=False, **fields):
+    """
+    @brief Journalise un événement structuré (sans E/S dans l'appelant).
+
+    @param event Type d'événement (ex: 'vote', 'join', 'room_created')
+    @param msg Message lisible
+    @param level Niveau de l'enregistrement
+    @param exc_info True pour joindre l'exception en cours
+    @param fields Champs structurés (room, user, ...)
+    """
+    threshold = _event_levels.get(event)
+    if threshold is None:
+        if not logger.isEnabledFor(level):
+            return
+    elif level < threshold:
+        return
+    if _sampler is not None:
+        accepted, skipped = _sampler.allow(event)
+        if not accepted:
+            return
+        if skipped:
+            fields['sampled_out'] = skipped
+    # La trace est mise en texte ici : QueueHandler.prepare() retire exc_info et exc_text
+    exc = _traceback_formatter.formatException(sys.exc_info()) if exc_info else None
+    # Le niveau par événement peut être plus bas que celui du logger : on contourne isEnabledFor
+    record = logger.makeRecord(logger.name, level, '(poker)', 0, msg, None, None,
+                               extra={'event': event, 'fields': fields, 'exc': exc})
+    logger.handle(record)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    @brief Ligne lisible : date niveau événement message cle=valeur...
+    """
+
+    def format(self, record):
+        fields = ' '.join(f'{key}={value}' for key, value in getattr(record, 'fields', {}).items())
+        line = f"{self.formatTime(record)} {record.levelname} {getattr(record, 'event', '-')} " \
+               f"{record.getMessage()}{' ' + fields if fields else ''}"
+        if getattr(record, 'exc', None):
+            line += '\n' + record.exc
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    @brief Une ligne JSON par enregistrement.
+    """
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': getattr(record, 'event', None),
+            'msg': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        if getattr(record, 'exc', None):
+            data['exc'] = record.exc
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    @brief Écrit sur le sys.stdout courant (comme logging.lastResort pour stderr).
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class QueueWriter(logging.handlers.QueueListener):
+    """
+    @brief QueueListener de la bibliothèque standard, qu'on peut arrêter plusieurs fois.
+    """
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class BackgroundWriter:
+    """
+    @brief Thread système qui vide la file et écrit les enregistrements (gevent/eventlet).
+
+    Après un monkey patching, QueueListener démarrerait un threading.Thread
+    devenu greenlet : les écritures bloquantes sur la sortie passeraient par
+    la boucle d'événements, et rien ne serait écrit tant qu'elle est occupée.
+    Ce thread-ci et sa file viennent des primitives d'origine (native_threading).
+    """
+
+    _STOP = object()
+
+    def __init__(self, handler):
+        """
+        @param handler Handler final (ex: StreamHandler avec TextFormatter ou JsonFormatter)
+        """
+        self._native = native_threading()
+        self.queue = self._native.SimpleQueue()
+        self.handler = handler
+        self._stopped = self._native.allocate_lock()
+        self._running = False
+
+    def start(self):
+        self._stopped.acquire()
+        self._running = True
+        self._native.start_new_thread(self._run, ())
+
+    def _run(self):
+        try:
+            while True:
+                record = self.queue.get()
+                if record is self._STOP:
+                    return
+                self.handler.handle(record)
+        finally:
+            self._stopped.release()
+
+    def stop(self):
+        """
+        @brief Écrit les enregistrements en attente puis arrête le thread.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self.queue.put(self._STOP)
+        self._stopped.acquire()
+        self._stopped.release()
+        self.handler.flush()
+
+
+def configure(fmt='text', level='INFO', event_levels='', sample_rates=DEFAULT_SAMPLE_RATES, stream=None):
+    """
+    @brief Installe la file, le thread d'écriture et les filtres par événement.
+
+    @return QueueWriter ou BackgroundWriter démarré (à arrêter en fin de processus)
+    @throw ValueError si un paramètre est invalide
+    """
+    global _event_levels, _sampler
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"LOG_FORMAT non supporté : {fmt} ({', '.join(LOG_FORMATS)})")
+    levels = parse_mapping(event_levels, parse_level, 'LOG_EVENT_LEVELS')
+    rates = parse_mapping(sample_rates, float, 'LOG_SAMPLE_RATES')
+    try:
+        global_level = parse_level(level)
+    except ValueError:
+        raise ValueError(f"LOG_LEVEL invalide : {level}")
+
+    output = logging.StreamHandler(stream) if stream is not None else StdoutHandler()
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    if native_threading().patched:
+        writer = BackgroundWriter(output)
+    else:
+        writer = QueueWriter(queue.SimpleQueue(), output)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(writer.queue))
+    logger.setLevel(global_level)
+    logger.propagate = False
+    _event_levels = levels
+    _sampler = EventSampler(rates) if rates else None
+    writer.start()
+    return writer
+
+
+def configure_from_env():
+    """
+    @brief configure() avec les variables d'environnement LOG_*.
+    """
+    return configure(fmt=(os.environ.get('LOG_FORMAT') or 'text').lower(),
+                     level=os.environ.get('LOG_LEVEL') or 'INFO',
+                     event_levels=os.environ.get('LOG_EVENT_LEVELS', ''),
+                     sample_rates=os.environ.get('LOG_SAMPLE_RATES', DEFAULT_SAMPLE_RATES))
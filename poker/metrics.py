@@ -0,0 +1,326 @@
+"""
+@file metrics.py
+@brief Instrumentation du serveur et exposition au format texte Prometheus
+
+Mesure, sans dépendance externe :
+- la latence de chaque handler Socket.IO et de chaque route HTTP (histogrammes) ;
+- les émissions Socket.IO : appels, messages reçus par les clients (fan-out)
+  et octets sérialisés, par événement, type de patch et taille de salle ;
+- des jauges lues au moment de la collecte (salles, participants...).
+
+Les octets sont ceux du paquet encodé par le sérialiseur du serveur
+(JSON ou msgpack) multipliés par le nombre de destinataires locaux.
+Encoder chaque paquet une seconde fois doublerait le coût de sérialisation :
+la taille n'est mesurée que sur une émission sur size_sample par étiquettes
+(événement, type, taille de salle) et réutilisée pour les suivantes. Le
+compteur d'octets est donc une estimation (poker_emitted_bytes_estimated_total) :
+elle est juste pour les patchs de forme fixe, mais peut s'écarter nettement
+pour les événements de taille variable (state_snapshot, votes regroupés).
+Avec une file de messages partagée, chaque worker compte ses propres clients.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import g, request
+from socketio import packet
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Tranches de taille de salle (nombre de connexions dans la salle visée)
+ROOM_SIZE_BUCKETS = ((1, '1'), (5, '2-5'), (10, '6-10'), (25, '11-25'), (50, '26-50'), (100, '51-100'))
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Une émission sur SIZE_SAMPLE (par étiquettes) est réencodée pour mesurer sa taille
+SIZE_SAMPLE = 16
+
+
+def room_size_bucket(size):
+    """
+    @brief Tranche de taille d'une salle (étiquette room_size des compteurs d'émission).
+    """
+    for limit, label in ROOM_SIZE_BUCKETS:
+        if size <= limit:
+            return label
+    return '100+'
+
+
+def encoded_size(packet_class, event, args, namespace='/'):
+    """
+    @brief Taille d'un paquet d'événement tel qu'encodé par le sérialiseur (JSON ou msgpack).
+
+    @param packet_class Classe de paquet du serveur (socketio.server.packet_class)
+    """
+    encoded = packet_class(packet.EVENT, data=[event] + list(args), namespace=namespace).encode()
+    parts = encoded if isinstance(encoded, list) else [encoded]
+    return sum(len(part.encode('utf-8')) if isinstance(part, str) else len(part) for part in parts)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    @brief Compteur croissant, éventuellement étiqueté.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # {(valeurs d'étiquettes): total}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(total)}'
+                for labels, total in items]
+
+
+class Histogram:
+    """
+    @brief Histogramme cumulatif (buckets, somme et nombre d'observations).
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # {(valeurs d'étiquettes): [compteurs par bucket..., somme, nombre]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            return series[-1] if series else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in items:
+            cumulative = []
+            for observed in series[:len(self.buckets)]:
+                cumulative.append((cumulative[-1] if cumulative else 0) + observed)
+            cumulative.append(series[-1])  # le="+Inf" : toutes les observations
+            for bound, total in zip(self.buckets + (float('inf'),), cumulative):
+                lines.append(f'{self.name}_bucket'
+                             f'{_format_labels(self.labelnames, labels, [("le", _format_value(bound))])}'
+                             f' {total}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}')
+        return lines
+
+
+class Gauge:
+    """
+    @brief Jauge lue au moment de la collecte (fonction sans argument).
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, read):
+        self.name = name
+        self.documentation = documentation
+        self._read = read
+
+    def render(self):
+        return [f'{self.name} {_format_value(self._read())}']
+
+
+class Registry:
+    """
+    @brief Ensemble de métriques rendu au format d'exposition Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, read):
+        return self.register(Gauge(name, documentation, read))
+
+    def render(self):
+        """
+        @return str au format texte Prometheus 0.0.4
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """
+    @brief Mesures des handlers HTTP et Socket.IO et des émissions.
+    """
+
+    def __init__(self, registry=None, clock=time.perf_counter, size_sample=SIZE_SAMPLE):
+        """
+        @param size_sample Mesurer la taille d'une émission sur size_sample par étiquettes (1 = toutes)
+        """
+        self.registry = registry or Registry()
+        self._clock = clock
+        self.size_sample = size_sample
+        self._sizes = {}  # {étiquettes: [dernière taille mesurée, émissions depuis la mesure]}
+        self.http_seconds = self.registry.histogram(
+            'poker_http_request_seconds', "Durée des requêtes HTTP par route.", ('endpoint',))
+        self.http_responses = self.registry.counter(
+            'poker_http_responses_total', "Réponses HTTP par route et code.", ('endpoint', 'status'))
+        self.handler_seconds = self.registry.histogram(
+            'poker_socketio_handler_seconds', "Durée des handlers Socket.IO par événement.", ('event',))
+        self.handler_errors = self.registry.counter(
+            'poker_socketio_handler_errors_total', "Exceptions levées par les handlers Socket.IO.", ('event',))
+        labels = ('event', 'type', 'room_size')
+        self.emits = self.registry.counter(
+            'poker_emits_total', "Appels à emit (un par diffusion).", labels)
+        self.emitted_messages = self.registry.counter(
+            'poker_emitted_messages_total', "Messages reçus par les clients (fan-out).", labels)
+        self.emitted_bytes = self.registry.counter(
+            'poker_emitted_bytes_estimated_total',
+            "Octets sérialisés envoyés aux clients (fan-out), estimés par échantillonnage.", labels)
+
+    # --- HTTP ---
+
+    def instrument_flask(self, app):
+        """
+        @brief Mesure la durée et le code de réponse de chaque route Flask.
+        """
+        @app.before_request
+        def _start_timer():
+            g.metrics_start = self._clock()
+
+        @app.after_request
+        def _record_request(response):
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                endpoint = request.endpoint or 'inconnu'
+                self.http_seconds.observe(self._clock() - start, (endpoint,))
+                self.http_responses.inc(1, (endpoint, str(response.status_code)))
+            return response
+
+    # --- Socket.IO ---
+
+    def instrument_socketio(self, socketio):
+        """
+        @brief Enveloppe les handlers Socket.IO enregistrés et la méthode emit.
+
+        À appeler une fois tous les handlers déclarés (fin de app.py).
+        """
+        for handlers in socketio.server.handlers.values():
+            for event, handler in list(handlers.items()):
+                handlers[event] = self.timed_handler(event, handler)
+
+        server = socketio.server
+        original_emit = socketio.emit
+
+        @wraps(original_emit)
+        def emit(event, *args, **kwargs):
+            self.record_emit(server, event, args, kwargs)
+            return original_emit(event, *args, **kwargs)
+
+        # flask_socketio.emit() passe aussi par cette méthode
+        socketio.emit = emit
+
+    def timed_handler(self, event, handler):
+        """
+        @brief Handler qui enregistre sa durée et ses exceptions.
+        """
+        @wraps(handler)
+        def timed(*args):
+            start = self._clock()
+            try:
+                return handler(*args)
+            except Exception:
+                self.handler_errors.inc(1, (event,))
+                raise
+            finally:
+                self.handler_seconds.observe(self._clock() - start, (event,))
+        return timed
+
+    def record_emit(self, server, event, args, kwargs):
+        """
+        @brief Compte une émission : destinataires locaux et taille du paquet encodé.
+        """
+        namespace = kwargs.get('namespace') or '/'
+        to = kwargs.get('to', kwargs.get('room'))
+        members = server.manager.rooms.get(namespace, {}).get(to) or {}
+        size = len(members)
+        skip = kwargs.get('skip_sid')
+        skipped = skip if isinstance(skip, (list, tuple, set)) else ([skip] if skip else [])
+        recipients = size - sum(1 for sid in skipped if sid in members)
+
+        payload = args[0] if args else None
+        patch_type = payload.get('type', '') if isinstance(payload, dict) else ''
+        labels = (event, patch_type if isinstance(patch_type, str) else '', room_size_bucket(size))
+        self.emits.inc(1, labels)
+        if recipients <= 0:
+            return
+        self.emitted_messages.inc(recipients, labels)
+        self.emitted_bytes.inc(recipients * self.sampled_size(server, event, args, namespace, labels), labels)
+
+    def sampled_size(self, server, event, args, namespace, labels):
+        """
+        @brief Taille du paquet, réencodé une fois sur size_sample émissions de mêmes étiquettes.
+        """
+        sample = self._sizes.get(labels)
+        if sample is not None and sample[1] < self.size_sample:
+            sample[1] += 1
+            return sample[0]
+        size = encoded_size(server.packet_class, event, args, namespace)
+        self._sizes[labels] = [size, 1]
+        return size
+
+    def render(self):
+        return self.registry.render()
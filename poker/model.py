@@ -0,0 +1,484 @@
+"""
+@file model.py
+@brief Modèle compact des salles : objets à __slots__ et votes en tableaux d'octets
+
+Une salle était un dictionnaire d'une quinzaine de clés, et chaque tâche
+du backlog un dictionnaire qui grossissait de 'final_vote',
+'consensus_rule' et 'votes_submitted' (encore un dictionnaire). Avec des
+dizaines de milliers de tâches en mémoire, le coût fixe de ces
+dictionnaires domine la mémoire du processus.
+
+- Room, Story, Round et Participant sont des classes à __slots__ (pas de
+  __dict__ par objet) ;
+- un vote est un petit entier : l'indice de la carte dans CARDS. Les votes
+  de la manche sont dans un array('B'), ceux d'une tâche estimée dans un
+  bytes, à côté d'un tuple de votants partagé entre tâches consécutives ;
+- Room et Story gardent un accès façon dictionnaire (room_data['votes'],
+  story.get('final_vote')...) pour le code existant. Les valeurs calculées
+  (votes, participants) sont des copies : on modifie une salle par le
+  stockage (voir store.py), jamais par ces vues ;
+- une salle créée depuis un modèle de backlog (voir templates.py) partage
+  ses tâches en lecture seule (SharedStory) ; seules les tâches estimées
+  sont copiées dans la salle (SharedBacklog, copie à l'écriture) ;
+- to_plain() produit les charges utiles (snapshots, export, journal) en
+  types JSON simples, que la salle soit un objet Room ou un dict (Redis).
+"""
+
+from array import array
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+
+from poker.consensus import DEFAULT_CARDS
+from poker.tally import empty_tally
+
+MISSING = object()  # Champ absent (clé non présente dans l'ancien dictionnaire)
+
+
+class CardTable:
+    """
+    @brief Table {carte: code} du paquet, partagée par toutes les salles.
+
+    Chaque carte du paquet a un code fixe. La table ne change jamais : une
+    carte hors paquet est refusée, un client ne peut donc pas la remplir.
+    """
+
+    def __init__(self, cards):
+        self.cards = tuple(cards)
+        self._codes = {card: code for code, card in enumerate(self.cards)}
+
+    def __contains__(self, card):
+        return isinstance(card, str) and card in self._codes
+
+    def encode(self, card):
+        """
+        @brief Code d'une carte du paquet.
+
+        @throw ValueError si la carte n'est pas dans le paquet
+        """
+        code = self._codes.get(card) if isinstance(card, str) else None
+        if code is None:
+            raise ValueError(f"Carte hors paquet : {card!r}")
+        return code
+
+    def decode(self, codes):
+        """ @brief Cartes correspondant à une suite de codes. """
+        cards = self.cards
+        return [cards[code] for code in codes]
+
+
+CARDS = CardTable(DEFAULT_CARDS)
+
+
+class Participant:
+    """
+    @brief Connexion inscrite dans une salle.
+    """
+
+    __slots__ = ('sid', 'username')
+
+    def __init__(self, sid, username):
+        self.sid = sid
+        self.username = username
+
+    def __repr__(self):
+        return f'Participant({self.sid!r}, {self.username!r})'
+
+
+class ParticipantsView(Mapping):
+    """
+    @brief Vue {sid: pseudo} des participants, sans copie (len en O(1)).
+    """
+
+    __slots__ = ('_participants',)
+
+    def __init__(self, participants):
+        self._participants = participants
+
+    def __getitem__(self, sid):
+        return self._participants[sid].username
+
+    def __iter__(self):
+        return iter(self._participants)
+
+    def __len__(self):
+        return len(self._participants)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Round:
+    """
+    @brief Manche en cours : votants, codes des cartes, agrégats et révélation.
+    """
+
+    __slots__ = ('voters', 'positions', 'cards', 'tally', 'is_revealed')
+
+    def __init__(self, votes=None, tally=None, is_revealed=False):
+        """
+        @param votes dict {'pseudo': carte} initial
+        @param tally Agrégats de la manche (voir tally.py) ; vides par défaut
+        """
+        self.voters = []        # Pseudos (un retrait déplace le dernier votant à sa place)
+        self.positions = {}      # {'pseudo': indice dans voters et cards}
+        self.cards = array('B')  # Code de la carte de chaque votant
+        self.tally = tally if tally is not None else empty_tally()
+        self.is_revealed = is_revealed
+        for username, vote in (votes or {}).items():
+            self.set_vote(username, vote)
+
+    def __len__(self):
+        return len(self.voters)
+
+    def set_vote(self, username, vote):
+        """
+        @brief Enregistre, remplace ou retire (vote None) le vote d'un participant.
+
+        @return Le vote précédent, ou None
+        @throw ValueError si la carte n'est pas dans le paquet (voir CardTable)
+        """
+        code = CARDS.encode(vote) if vote is not None else None
+        position = self.positions.get(username)
+        previous = CARDS.cards[self.cards[position]] if position is not None else None
+        if code is None:
+            if position is not None:
+                # Retrait en O(1) : le dernier votant prend la place libérée
+                del self.positions[username]
+                last_voter, last_code = self.voters.pop(), self.cards.pop()
+                if position < len(self.voters):
+                    self.voters[position] = last_voter
+                    self.cards[position] = last_code
+                    self.positions[last_voter] = position
+        elif position is None:
+            self.positions[username] = len(self.voters)
+            self.voters.append(username)
+            self.cards.append(code)
+        else:
+            self.cards[position] = code
+        return previous
+
+    def votes(self):
+        """ @return dict {'pseudo': carte} (copie) """
+        return dict(zip(self.voters, CARDS.decode(self.cards)))
+
+
+class _Record(Mapping):
+    """
+    @brief Objet à __slots__ lisible comme l'ancien dictionnaire.
+
+    _KEYS associe chaque clé à un attribut ; un attribut valant MISSING est
+    une clé absente. Les clés inconnues vont dans `extra` (créé au besoin).
+    """
+
+    __slots__ = ()
+    _KEYS = {}
+    _CONVERTERS = {}  # {clé: fonction(valeur) -> valeur stockée}
+
+    def __getitem__(self, key):
+        attribute = self._KEYS.get(key)
+        if attribute is None:
+            if self.extra is not None and key in self.extra:
+                return self.extra[key]
+            raise KeyError(key)
+        value = getattr(self, attribute)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for key, attribute in self._KEYS.items():
+            if getattr(self, attribute) is not MISSING:
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __setitem__(self, key, value):
+        convert = self._CONVERTERS.get(key)
+        if convert is not None:
+            value = convert(value)
+        attribute = self._KEYS.get(key)
+        if attribute is not None:
+            setattr(self, attribute, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def to_dict(self):
+        """ @brief Copie en types JSON simples. """
+        return {key: to_plain(self[key]) for key in self}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+class Story(_Record):
+    """
+    @brief Tâche du backlog ; son résultat (vote final, règle, votes bruts) une fois estimée.
+    """
+
+    __slots__ = ('name', 'description', 'final_vote', 'consensus_rule', 'voters', 'cards', 'extra')
+    _KEYS = {
+        'name': 'name',
+        'description': 'description',
+        'final_vote': 'final_vote',
+        'consensus_rule': 'consensus_rule',
+        'votes_submitted': 'votes_submitted',
+    }
+
+    def __init__(self, name=MISSING, description=MISSING):
+        self.name = name
+        self.description = description
+        self.final_vote = MISSING
+        self.consensus_rule = MISSING
+        self.voters = MISSING   # Tuple des votants (partagé entre tâches, voir Room.shared_voters)
+        self.cards = MISSING    # bytes : code de la carte de chaque votant
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, Story):
+            return data
+        story = cls()
+        for key, value in data.items():
+            # Ancien emplacement des votes d'une tâche importée, toujours vide
+            if key != 'votes' or value:
+                story[key] = value
+        return story
+
+    @property
+    def votes_submitted(self):
+        if self.cards is MISSING:
+            return MISSING
+        return dict(zip(self.voters, CARDS.decode(self.cards)))
+
+    @votes_submitted.setter
+    def votes_submitted(self, votes):
+        self.set_votes(votes)
+
+    def set_votes(self, votes, voters=None):
+        """
+        @brief Enregistre les votes bruts de la tâche sous forme compacte.
+
+        @param votes dict {'pseudo': carte}
+        @param voters Tuple des pseudos à réutiliser s'il est identique (économie mémoire)
+        """
+        names = tuple(votes)
+        self.voters = voters if voters == names else names
+        self.cards = bytes(CARDS.encode(vote) for vote in votes.values())
+
+
+class SharedStory(Story):
+    """
+    @brief Tâche d'un modèle de backlog, partagée par plusieurs salles (lecture seule).
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def freeze(cls, story):
+        """ @brief Copie figée d'une tâche (ses chaînes sont partagées, pas copiées). """
+        story = Story.from_dict(story)
+        shared = cls.__new__(cls)
+        for attribute in Story.__slots__:
+            object.__setattr__(shared, attribute, getattr(story, attribute))
+        if story.extra is not None:
+            object.__setattr__(shared, 'extra', MappingProxyType(story.extra))
+        return shared
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Tâche partagée en lecture seule (voir SharedBacklog.writable)")
+
+    def __setitem__(self, key, value):
+        raise TypeError("Tâche partagée en lecture seule (voir SharedBacklog.writable)")
+
+
+class SharedBacklog(Sequence):
+    """
+    @brief Backlog d'une salle qui référence les tâches d'un modèle (copie à l'écriture).
+
+    Les tâches non estimées sont celles du modèle ; une tâche estimée est
+    copiée une fois dans la salle (les chaînes restent partagées). La
+    mémoire d'une salle dépend donc des votes, pas de la taille du backlog.
+    """
+
+    __slots__ = ('_base', '_results')
+
+    def __init__(self, base):
+        """
+        @param base Tuple de SharedStory (voir BacklogTemplate)
+        """
+        self._base = base
+        self._results = None  # {index: Story propre à la salle}, créé au premier résultat
+
+    def __len__(self):
+        return len(self._base)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._base)))]
+        index = range(len(self._base))[index]  # Indices négatifs, IndexError hors bornes
+        if self._results is not None and index in self._results:
+            return self._results[index]
+        return self._base[index]
+
+    def writable(self, index):
+        """
+        @brief Tâche propre à la salle, copiée du modèle au premier appel.
+        """
+        index = range(len(self._base))[index]
+        if self._results is None:
+            self._results = {}
+        story = self._results.get(index)
+        if story is None:
+            base = self._base[index]
+            story = self._results[index] = Story(base.name, base.description)
+            if base.extra is not None:
+                story.extra = dict(base.extra)
+        return story
+
+    def owned(self):
+        """ @brief Tâches copiées dans la salle (estimées), par index croissant. """
+        return [self._results[index] for index in sorted(self._results or ())]
+
+    def __repr__(self):
+        return f'SharedBacklog({len(self)} tâches, {len(self._results or ())} estimées)'
+
+
+class Room(_Record):
+    """
+    @brief État d'une salle (métadonnées, backlog, manche, participants).
+    """
+
+    __slots__ = ('session_name', 'session_type', 'admin_name', 'admin_sid',
+                 'backlog', 'import_errors', 'current_story_index',
+                 'round', 'is_started', 'use_timer', 'timer_duration', 'timer_end_time',
+                 'participants', 'revision', 'last_activity', 'extra', '_voters')
+    _KEYS = {
+        'session_name': 'session_name',
+        'session_type': 'session_type',
+        'admin_name': 'admin_name',
+        'admin_sid': 'admin_sid',
+        'backlog': 'backlog',
+        'import_errors': 'import_errors',
+        'current_story_index': 'current_story_index',
+        'votes': 'votes',
+        'is_revealed': 'is_revealed',
+        'tally': 'tally',
+        'is_started': 'is_started',
+        'use_timer': 'use_timer',
+        'timer_duration': 'timer_duration',
+        'timer_end_time': 'timer_end_time',
+        'participants': 'participant_names',
+        'revision': 'revision',
+        'last_activity': 'last_activity',
+    }
+    _CONVERTERS = {
+        'backlog': lambda stories: stories if isinstance(stories, SharedBacklog)
+        else [Story.from_dict(story) for story in stories],
+        'participants': lambda participants: {sid: Participant(sid, username)
+                                              for sid, username in participants.items()},
+    }
+
+    def __init__(self):
+        for attribute in self.__slots__:
+            setattr(self, attribute, MISSING)
+        self.round = Round()
+        self.participants = {}  # {'sid': Participant}
+        self.extra = None
+        self._voters = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        @brief Construit une salle à partir de l'ancien dictionnaire d'état.
+        """
+        if isinstance(data, Room):
+            return data
+        room = cls()
+        room.round = Round(data.get('votes'), data.get('tally'), data.get('is_revealed', False))
+        for key, value in data.items():
+            if key not in ('votes', 'tally', 'is_revealed'):
+                room[key] = value
+        return room
+
+    # ------------------ Champs calculés (accès façon dictionnaire) ------------------
+
+    @property
+    def votes(self):
+        return self.round.votes()
+
+    @votes.setter
+    def votes(self, votes):
+        self.round = Round(votes, self.round.tally, self.round.is_revealed)
+
+    @property
+    def tally(self):
+        return self.round.tally
+
+    @tally.setter
+    def tally(self, value):
+        self.round.tally = value
+
+    @property
+    def is_revealed(self):
+        return self.round.is_revealed
+
+    @is_revealed.setter
+    def is_revealed(self, value):
+        self.round.is_revealed = value
+
+    @property
+    def participant_names(self):
+        return ParticipantsView(self.participants)
+
+    @participant_names.setter
+    def participant_names(self, participants):
+        self.participants = participants  # Déjà converti par _CONVERTERS
+
+    def writable_story(self, index):
+        """
+        @brief Tâche du backlog modifiable par cette salle (copiée si elle vient d'un modèle).
+        """
+        if isinstance(self.backlog, SharedBacklog):
+            return self.backlog.writable(index)
+        return self.backlog[index]
+
+    def shared_voters(self, votes):
+        """
+        @brief Tuple des votants, partagé avec la tâche précédente s'il est identique.
+        """
+        names = tuple(votes)
+        if names != self._voters:
+            self._voters = names
+        return self._voters
+
+    def to_dict(self, backlog=True):
+        """
+        @brief Copie en types JSON simples.
+
+        @param backlog False pour omettre le backlog (snapshots)
+        """
+        return {key: to_plain(self[key]) for key in self if backlog or key != 'backlog'}
+
+
+def to_plain(value):
+    """
+    @brief Copie d'une valeur du modèle en types JSON simples (dict, list, str...).
+
+    Accepte aussi les dictionnaires de l'ancien format (stockage Redis).
+    """
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, SharedBacklog)):
+        return [to_plain(item) for item in value]
+    return value
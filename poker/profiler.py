@@ -0,0 +1,117 @@
+"""
+@file profiler.py
+@brief Profileur par échantillonnage activable à chaud
+
+Un thread natif relève périodiquement la pile de chaque thread du
+processus (sys._current_frames) et compte les piles identiques. Le
+résultat est au format « folded » (une ligne `f1;f2;f3 nombre`), lisible
+par flamegraph.pl ou speedscope.
+
+Avec gevent ou eventlet, le thread d'échantillonnage est un vrai thread
+système (fonctions d'origine, non patchées) : il voit le greenlet en cours
+d'exécution sur le thread principal, ce qui est le but.
+"""
+
+import os
+import sys
+from collections import Counter
+
+from poker.server import native_threading
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class SamplingProfiler:
+    """
+    @brief Échantillonneur de piles, démarré et arrêté à la demande.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        """
+        @param interval Période d'échantillonnage en secondes
+        @param max_depth Profondeur maximale d'une pile relevée
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = native_threading().allocate_lock()  # Partagé avec le thread système
+        self._running = False
+        self._generation = 0  # Un arrêt suivi d'un démarrage ne relance pas l'ancien thread
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, interval=None):
+        """
+        @brief Démarre l'échantillonnage (sans effet s'il est déjà actif).
+        """
+        if interval:
+            self.interval = interval
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        native = native_threading()
+        native.start_new_thread(self._run, (generation, native.get_ident, native.sleep))
+        return True
+
+    def stop(self):
+        """ @brief Arrête l'échantillonnage ; les piles relevées sont conservées. """
+        with self._lock:
+            was_running = self._running
+            self._running = False
+        return was_running
+
+    def reset(self):
+        """ @brief Oublie les piles relevées. """
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self, generation, get_ident, sleep):
+        own_thread = get_ident()  # Identifiant système, comme les clés de sys._current_frames
+        while self._running and generation == self._generation:
+            self.sample(skip_thread=own_thread)
+            sleep(self.interval)
+
+    def sample(self, skip_thread=None):
+        """
+        @brief Relève une fois la pile de chaque thread.
+        """
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stacks.append(';'.join(reversed(labels)))
+        with self._lock:
+            self._stacks.update(stacks)
+            self.samples += 1
+
+    def folded(self, limit=None):
+        """
+        @brief Piles au format folded, de la plus fréquente à la moins fréquente.
+
+        @return str
+        """
+        with self._lock:
+            items = self._stacks.most_common(limit)
+        return ''.join(f'{stack} {count}\n' for stack, count in items)
+
+    def stats(self):
+        """
+        @return dict {'running', 'interval_ms', 'samples', 'stacks'}
+        """
+        with self._lock:
+            return {'running': self._running, 'interval_ms': int(self.interval * 1000),
+                    'samples': self.samples, 'stacks': len(self._stacks)}
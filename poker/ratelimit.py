@@ -0,0 +1,216 @@
+"""
+@file ratelimit.py
+@brief Limitation de débit des événements Socket.IO et contre-pression des clients lents
+
+Chaque événement reçu déclenche une diffusion à toute la salle : un client
+défaillant (ou malveillant) qui répète submit_vote ou join en boucle
+sature le worker pour tout le monde.
+
+- RateLimiter : un seau à jetons par connexion (sid) et par événement,
+  placé devant les handlers. Un événement en excès est ignoré ; le client
+  reçoit un 'error', au plus une fois par error_interval et par événement.
+- SlowConsumerGuard : un client qui ne lit plus ses messages accumule des
+  paquets dans sa file d'envoi Engine.IO ; au-delà de max_queue paquets,
+  il est déconnecté et sa file est vidée.
+
+Variables d'environnement :
+- SOCKET_RATE_LIMITS : "evenement=debit/rafale,..." (événements par seconde,
+  capacité du seau) ; '*' s'applique aux événements non cités, 0 retire la
+  limite d'un événement, une chaîne vide désactive la limitation
+- SOCKET_MAX_QUEUE : paquets en attente au-delà desquels un client est
+  déconnecté (0 = pas de limite)
+"""
+
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from poker.logs import log_event, parse_mapping
+
+DEFAULT_LIMITS = 'submit_vote=5/10,join=1/3,request_state=2/5,*=5/10'
+DEFAULT_MAX_QUEUE = 1000
+ERROR_INTERVAL = 5.0
+# Événements du cycle de connexion, jamais limités
+UNLIMITED_EVENTS = ('connect', 'disconnect')
+
+
+def parse_limit(value):
+    """
+    @brief Lit une limite "debit/rafale" (rafale = max(debit, 1) par défaut).
+
+    @return tuple (débit par seconde, capacité) ou None pour un débit nul (pas de limite)
+    @throw ValueError si la limite est invalide
+    """
+    rate, sep, burst = value.partition('/')
+    rate = float(rate)
+    burst = float(burst) if sep else max(rate, 1.0)
+    if rate < 0 or burst < 1:
+        raise ValueError(value)
+    return (rate, burst) if rate else None
+
+
+def limits_from_env():
+    """
+    @brief Limites par événement lues dans SOCKET_RATE_LIMITS.
+
+    @throw ValueError si une entrée est invalide
+    """
+    return parse_mapping(os.environ.get('SOCKET_RATE_LIMITS', DEFAULT_LIMITS), parse_limit,
+                         'SOCKET_RATE_LIMITS')
+
+
+class RateLimiter:
+    """
+    @brief Seaux à jetons par connexion et par événement.
+    """
+
+    def __init__(self, limits, clock=time.monotonic, error_interval=ERROR_INTERVAL):
+        """
+        @param limits dict {'événement' ou '*': (débit par seconde, capacité) ou None}
+        @param error_interval Délai minimal entre deux 'error' pour un même sid et événement
+        """
+        self.limits = dict(limits)
+        self.error_interval = error_interval
+        self.dropped = 0
+        self._clock = clock
+        self._buckets = {}  # {sid: {'événement': [jetons, dernière recharge, dernier avertissement]}}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def limit_for(self, event):
+        if event in UNLIMITED_EVENTS:
+            return None
+        return self.limits[event] if event in self.limits else self.limits.get('*')
+
+    def allow(self, sid, event):
+        """
+        @brief Consomme un jeton pour un événement reçu de sid.
+
+        @return (accepté, avertir) : avertir vaut True si le client doit recevoir un 'error'
+        """
+        limit = self.limit_for(event)
+        if limit is None:
+            return True, False
+        rate, burst = limit
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets.setdefault(sid, {})
+            bucket = buckets.get(event)
+            if bucket is None:
+                bucket = buckets[event] = [burst, now, None]
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, False
+            self.dropped += 1
+            if bucket[2] is not None and now - bucket[2] < self.error_interval:
+                return False, False
+            bucket[2] = now
+            return False, True
+
+    def forget(self, sid):
+        """ @brief Oublie les seaux d'une connexion fermée. """
+        with self._lock:
+            self._buckets.pop(sid, None)
+
+    def instrument_socketio(self, socketio):
+        """
+        @brief Place la limitation devant les handlers Socket.IO enregistrés.
+
+        À appeler une fois tous les handlers déclarés (fin de app.py).
+        """
+        for handlers in socketio.server.handlers.values():
+            for event, handler in list(handlers.items()):
+                handlers[event] = self.limited_handler(socketio, event, handler)
+
+    def limited_handler(self, socketio, event, handler):
+        """
+        @brief Handler qui ignore les événements en excès (et oublie le sid à la déconnexion).
+        """
+        if event == 'disconnect':
+            @wraps(handler)
+            def forgetting(sid, *args):
+                try:
+                    return handler(sid, *args)
+                finally:
+                    self.forget(sid)
+            return forgetting
+
+        @wraps(handler)
+        def limited(sid, *args):
+            accepted, warn = self.allow(sid, event)
+            if accepted:
+                return handler(sid, *args)
+            if warn:
+                log_event('rate_limited', "Événements ignorés (débit dépassé)", level=logging.WARNING,
+                          sid=sid, socket_event=event)
+                socketio.emit('error', {'msg': "Trop de requêtes : veuillez patienter un instant."}, to=sid)
+            return None
+        return limited
+
+
+class SlowConsumerGuard:
+    """
+    @brief Déconnecte les clients dont la file d'envoi dépasse max_queue paquets.
+    """
+
+    def __init__(self, max_queue=DEFAULT_MAX_QUEUE):
+        """
+        @param max_queue Paquets en attente tolérés (0 = pas de limite)
+        """
+        self.max_queue = max_queue
+        self.disconnected = 0
+        self._running = False
+
+    def check(self, eio):
+        """
+        @brief Parcourt les connexions Engine.IO et ferme celles qui ne suivent plus.
+
+        @param eio Serveur Engine.IO (socketio.server.eio)
+        @return Nombre de connexions fermées
+        """
+        if not self.max_queue:
+            return 0
+        closed = 0
+        for eio_sid, sock in list(eio.sockets.items()):
+            pending = sock.queue.qsize()
+            if pending <= self.max_queue or sock.closing or sock.closed:
+                continue
+            # Les paquets en attente sont abandonnés : la mémoire est rendue tout de suite
+            while not sock.queue.empty():
+                try:
+                    sock.queue.get_nowait()
+                except Exception:
+                    break
+            # Sans attente ni paquet CLOSE : la connexion ne lit plus (handler 'disconnect' appelé)
+            sock.close(wait=False, abort=True)
+            eio.sockets.pop(eio_sid, None)
+            closed += 1
+            log_event('slow_consumer', "Client lent déconnecté", level=logging.WARNING,
+                      eio_sid=eio_sid, pending=pending)
+        self.disconnected += closed
+        return closed
+
+    def start(self, eio, start_task, sleep, interval=1.0):
+        """
+        @brief Lance (une seule fois) la vérification périodique des files d'envoi.
+        """
+        if self._running or not self.max_queue:
+            return
+        self._running = True
+
+        def run():
+            while True:
+                sleep(interval)
+                try:
+                    self.check(eio)
+                except Exception:
+                    log_event('backpressure_error', "Erreur lors de la vérification des files d'envoi",
+                              level=logging.ERROR, exc_info=True)
+
+        start_task(run)
@@ -0,0 +1,125 @@
+"""
+@file scheduler.py
+@brief Ordonnanceur unique des échéances de timer de toutes les salles
+
+Une seule tâche de fond et un tas (heap) d'échéances remplacent un
+thread par salle : des milliers de salles chronométrées ne coûtent
+qu'une entrée dans le tas chacune.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from poker.logs import log_event
+
+
+class DeadlineScheduler:
+    """
+    @brief Tas d'échéances {salle -> date limite} servi par une seule tâche.
+
+    Reprogrammer ou annuler une salle invalide simplement son jeton :
+    l'ancienne entrée reste dans le tas et est ignorée quand elle sort
+    (suppression paresseuse), ce qui garde les opérations en O(log n).
+    """
+
+    def __init__(self, on_expire, start_task=None, sleep=time.sleep,
+                 clock=time.monotonic, tick=0.25):
+        """
+        @param on_expire Fonction appelée avec room_id quand une échéance expire
+        @param start_task Lanceur de tâche de fond (ex: socketio.start_background_task)
+        @param sleep Fonction d'attente compatible avec le mode async (ex: socketio.sleep)
+        @param clock Horloge monotone (injectable pour les tests)
+        @param tick Attente maximale entre deux vérifications (secondes)
+        """
+        self._on_expire = on_expire
+        self._start_task = start_task
+        self._sleep = sleep
+        self._clock = clock
+        self._tick = tick
+        self._heap = []          # [(deadline, token, room_id)]
+        self._tokens = {}        # {'room_id': token actif}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def schedule(self, room_id, delay):
+        """
+        @brief Programme (ou reprogramme) l'échéance d'une salle.
+
+        @param room_id Identifiant de la salle
+        @param delay Délai en secondes avant expiration
+        @return Date limite selon l'horloge du planificateur
+        """
+        deadline = self._clock() + delay
+        with self._lock:
+            token = next(self._counter)
+            self._tokens[room_id] = token
+            heapq.heappush(self._heap, (deadline, token, room_id))
+        self._ensure_running()
+        return deadline
+
+    def cancel(self, room_id):
+        """
+        @brief Annule l'échéance d'une salle.
+
+        @return True si une échéance était programmée
+        """
+        with self._lock:
+            return self._tokens.pop(room_id, None) is not None
+
+    def is_scheduled(self, room_id):
+        """ @brief Indique si une échéance est programmée pour la salle. """
+        return room_id in self._tokens
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def run_due(self):
+        """
+        @brief Déclenche toutes les échéances arrivées à terme.
+
+        @return Liste des salles dont l'échéance a expiré
+        """
+        now = self._clock()
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, token, room_id = heapq.heappop(self._heap)
+                if self._tokens.get(room_id) == token:
+                    del self._tokens[room_id]
+                    expired.append(room_id)
+
+        # Les callbacks sont appelés hors du verrou (ils peuvent reprogrammer)
+        for room_id in expired:
+            try:
+                self._on_expire(room_id)
+            except Exception:
+                log_event('timer_error', "Erreur lors de l'expiration du timer", level=logging.ERROR,
+                          exc_info=True, room=room_id)
+        return expired
+
+    def next_delay(self):
+        """ @brief Attente avant la prochaine vérification (bornée par tick). """
+        with self._lock:
+            if not self._heap:
+                return self._tick
+            return max(0.0, min(self._tick, self._heap[0][0] - self._clock()))
+
+    def _run(self):
+        """ @brief Boucle de la tâche de fond unique. """
+        while True:
+            self.run_due()
+            self._sleep(self.next_delay())
+
+    def _ensure_running(self):
+        """ @brief Lance la tâche de fond à la première échéance programmée. """
+        if self._start_task is None:
+            return
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._start_task(self._run)
@@ -0,0 +1,131 @@
+"""
+@file server.py
+@brief Configuration du serveur Socket.IO (mode asynchrone, pings)
+
+Sans async_mode explicite, Flask-SocketIO choisit le premier serveur
+installé (eventlet, gevent, puis threading) : le mode est donc fixé par
+configuration. Le serveur threading (un thread par connexion) convient
+au développement ; en production, serve.py utilise un mode coopératif
+(gevent ou eventlet) qui tient des milliers de websockets par processus.
+
+Variables d'environnement :
+- SOCKETIO_ASYNC_MODE : threading (défaut pour app.py), gevent ou eventlet
+- SOCKETIO_PING_INTERVAL / SOCKETIO_PING_TIMEOUT : en secondes
+- SOCKETIO_SERIALIZER : json (défaut) ou msgpack (paquets binaires MessagePack,
+  nécessite `pip install msgpack` ; la page salle charge alors le client
+  Socket.IO livré avec le même parser)
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+ASYNC_MODES = ('threading', 'gevent', 'eventlet')
+COOPERATIVE_MODES = ('gevent', 'eventlet')
+SERIALIZERS = ('json', 'msgpack')
+
+DEFAULT_PING_INTERVAL = 25
+# Plus large que le défaut d'Engine.IO (20 s) : sous forte charge, une boucle
+# coopérative peut répondre en retard sans que la connexion soit perdue
+DEFAULT_PING_TIMEOUT = 60
+
+
+def async_mode_from_env(default='threading'):
+    """
+    @brief Lit et valide le mode asynchrone demandé.
+
+    @throw ValueError si le mode n'est pas supporté
+    """
+    mode = (os.environ.get('SOCKETIO_ASYNC_MODE') or default).lower()
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"SOCKETIO_ASYNC_MODE non supporté : {mode} ({', '.join(ASYNC_MODES)})")
+    return mode
+
+
+def serializer_from_env():
+    """
+    @brief Lit et valide l'encodage des paquets Socket.IO.
+
+    @throw ValueError si l'encodage n'est pas supporté
+    @throw RuntimeError si msgpack est demandé sans être installé
+    """
+    serializer = (os.environ.get('SOCKETIO_SERIALIZER') or 'json').lower()
+    if serializer not in SERIALIZERS:
+        raise ValueError(f"SOCKETIO_SERIALIZER non supporté : {serializer} ({', '.join(SERIALIZERS)})")
+    if serializer == 'msgpack':
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            raise RuntimeError("SOCKETIO_SERIALIZER=msgpack nécessite la bibliothèque msgpack (pip install msgpack).")
+    return serializer
+
+
+def socketio_options():
+    """
+    @brief Options passées au constructeur SocketIO.
+
+    @return dict {'async_mode', 'ping_interval', 'ping_timeout'} (+ 'serializer' en mode msgpack)
+    """
+    options = {
+        'async_mode': async_mode_from_env(),
+        'ping_interval': int(os.environ.get('SOCKETIO_PING_INTERVAL', DEFAULT_PING_INTERVAL)),
+        'ping_timeout': int(os.environ.get('SOCKETIO_PING_TIMEOUT', DEFAULT_PING_TIMEOUT)),
+    }
+    if serializer_from_env() == 'msgpack':
+        # Paquets MessagePack de python-socketio, compatibles avec socket.io-msgpack-parser
+        options['serializer'] = 'msgpack'
+    return options
+
+
+def monkey_patch(mode):
+    """
+    @brief Rend la bibliothèque standard coopérative pour gevent ou eventlet.
+
+    Doit être appelée avant tout autre import (sockets, threads, redis...).
+    @throw RuntimeError si la bibliothèque du mode n'est pas installée
+    """
+    if mode not in COOPERATIVE_MODES:
+        return
+    try:
+        if mode == 'gevent':
+            from gevent import monkey
+            monkey.patch_all()
+        else:
+            import eventlet
+            eventlet.monkey_patch()
+    except ImportError:
+        raise RuntimeError(f"Le mode {mode} nécessite la bibliothèque correspondante (pip install {mode}).")
+
+
+def native_threading():
+    """
+    @brief Primitives de thread système d'origine, même après un monkey patching.
+
+    Pour le travail qui doit tourner à côté de la boucle coopérative
+    (profileur, écriture des journaux) sans dépendre de ses greenlets.
+    @return SimpleNamespace(start_new_thread, get_ident, allocate_lock, sleep, SimpleQueue, patched),
+            patched valant True si gevent ou eventlet a patché les threads
+    """
+    # Un monkey patching suppose la bibliothèque déjà importée : inutile de l'importer sinon
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            start_new_thread, get_ident, allocate_lock = monkey.get_original(
+                '_thread', ['start_new_thread', 'get_ident', 'allocate_lock'])
+            return SimpleNamespace(start_new_thread=start_new_thread, get_ident=get_ident,
+                                   allocate_lock=allocate_lock,
+                                   sleep=monkey.get_original('time', 'sleep'),
+                                   SimpleQueue=monkey.get_original('queue', 'SimpleQueue'), patched=True)
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('thread'):
+            thread = patcher.original('_thread')
+            return SimpleNamespace(start_new_thread=thread.start_new_thread, get_ident=thread.get_ident,
+                                   allocate_lock=thread.allocate_lock, sleep=patcher.original('time').sleep,
+                                   SimpleQueue=patcher.original('queue').SimpleQueue, patched=True)
+    import _thread
+    import queue
+    return SimpleNamespace(start_new_thread=_thread.start_new_thread, get_ident=_thread.get_ident,
+                           allocate_lock=_thread.allocate_lock, sleep=time.sleep,
+                           SimpleQueue=queue.SimpleQueue, patched=False)
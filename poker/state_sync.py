@@ -0,0 +1,76 @@
+"""
+@file state_sync.py
+@brief Protocole de synchronisation d'état versionné (patchs + snapshots)
+
+Chaque salle possède une révision qui augmente à chaque modification.
+Au lieu de renvoyer tout le dictionnaire de la salle à chaque événement,
+le serveur diffuse de petits patchs typés. Un client dont la révision
+n'est plus à jour demande un snapshot complet.
+"""
+
+from poker.model import to_plain
+
+# Types de patchs connus du client (voir applyStatePatch dans logic.js)
+PATCH_TYPES = frozenset({
+    'participant_joined',
+    'participant_left',
+    'session_started',
+    'vote_cast',
+    'votes_cast',   # Votes regroupés sur une fenêtre (voir coalesce.py)
+    'votes_revealed',
+    'story_advanced',
+    'vote_restarted',
+})
+
+
+def current_revision(room_data):
+    """
+    @brief Retourne la révision courante d'une salle.
+
+    @param room_data Dictionnaire d'état de la salle
+    @return int (0 si la salle n'a jamais été modifiée)
+    """
+    return room_data.get('revision', 0)
+
+
+def make_patch(revision, patch_type, data, msg=None):
+    """
+    @brief Construit un patch typé.
+
+    @param revision Nouvelle révision de la salle (voir RoomStore.next_revision)
+    @param patch_type Type du patch (voir PATCH_TYPES)
+    @param data Données minimales nécessaires pour rejouer la modification
+    @param msg Message optionnel pour le journal d'activité
+    @return dict {'rev', 'type', 'data'[, 'msg']}
+    """
+    if patch_type not in PATCH_TYPES:
+        raise ValueError(f"Type de patch inconnu : {patch_type}")
+
+    patch = {'rev': revision, 'type': patch_type, 'data': data}
+    if msg:
+        patch['msg'] = msg
+    return patch
+
+
+def snapshot(room_data):
+    """
+    @brief Construit un snapshot complet de la salle.
+
+    Le backlog n'y figure pas : seuls son nombre de tâches et la tâche
+    courante voyagent, le reste est lu par pages (GET /room/<id>/backlog).
+    @return dict {'rev', 'state'}
+    """
+    # Charge utile en types JSON simples, que la salle soit un objet Room ou un dict
+    state = {key: to_plain(value) for key, value in room_data.items() if key != 'backlog'}
+    backlog = room_data.get('backlog') or []
+    index = room_data.get('current_story_index', 0)
+    state['backlog_count'] = len(backlog)
+    state['current_story'] = to_plain(backlog[index]) if 0 <= index < len(backlog) else None
+    return {'rev': current_revision(room_data), 'state': state}
+
+
+def is_stale(room_data, client_revision):
+    """
+    @brief Indique si la révision annoncée par un client est périmée.
+    """
+    return client_revision != current_revision(room_data)
@@ -0,0 +1,568 @@
+"""
+@file store.py
+@brief Stockage de l'état des salles (interface RoomStore + implémentations)
+
+Tout accès à l'état des salles passe par un RoomStore :
+- InMemoryRoomStore : dictionnaire local (un seul processus, comportement historique)
+- RedisRoomStore : état partagé dans Redis, pour lancer plusieurs workers
+
+Le choix se fait avec la variable d'environnement ROOM_STORE_URL
+(ex: redis://localhost:6379/0). Sans valeur, le stockage est en mémoire.
+"""
+
+import json
+
+from poker.model import CARDS, MISSING, Participant, Room, Round, to_plain
+from poker.tally import apply_delta, empty_tally, vote_delta
+
+try:
+    import redis
+except ImportError:  # Dépendance optionnelle : seulement pour RedisRoomStore
+    redis = None
+
+
+class RoomStore:
+    """
+    @brief Interface commune des stockages de salles.
+
+    Les méthodes de mutation sont atomiques pour une salle donnée :
+    les handlers ne doivent pas modifier directement le dictionnaire
+    retourné par get_room().
+    """
+
+    # Stockage commun à plusieurs workers, qui survit à leur redémarrage
+    shared = False
+
+    # ------------------ Cycle de vie des salles ------------------
+
+    def create_room(self, room_id, room_data):
+        """ @brief Enregistre une nouvelle salle. """
+        raise NotImplementedError
+
+    def get_room(self, room_id):
+        """ @brief Retourne l'état de la salle (dict, ou Room lisible comme un dict) ou None si elle n'existe pas. """
+        raise NotImplementedError
+
+    def get_room_state(self, room_id):
+        """
+        @brief État de la salle sans son backlog (champs simples, participants, votes, agrégats).
+
+        Pour les handlers fréquents (vote, révélation, tâche suivante) : le
+        backlog se lit par backlog_length et backlog_page. La clé 'backlog'
+        peut manquer dans le résultat.
+        @return dict (ou Room) ou None si la salle n'existe pas
+        """
+        return self.get_room(room_id)
+
+    def update_room(self, room_id, **fields):
+        """
+        @brief Met à jour des champs simples de la salle (is_started, admin_sid...).
+
+        @return False si la salle n'existe pas (rien n'est écrit)
+        """
+        raise NotImplementedError
+
+    def delete_room(self, room_id):
+        """ @brief Supprime une salle et toutes ses données. """
+        raise NotImplementedError
+
+    def room_ids(self):
+        """ @brief Retourne la liste des identifiants de salles existantes. """
+        raise NotImplementedError
+
+    # ------------------ Participants ------------------
+
+    def add_participant(self, room_id, sid, username):
+        """
+        @brief Ajoute (ou remplace) un participant {sid: pseudo}.
+
+        @return False si la salle n'existe pas (rien n'est écrit)
+        """
+        raise NotImplementedError
+
+    def remove_participant(self, room_id, sid):
+        """
+        @brief Retire un participant et son vote éventuel (agrégats compris).
+
+        @return Le pseudo retiré, ou None si le sid était inconnu
+        """
+        raise NotImplementedError
+
+    # ------------------ Votes et progression ------------------
+
+    def record_vote(self, room_id, username, vote):
+        """
+        @brief Enregistre (ou remplace) le vote d'un participant.
+
+        Les agrégats de la manche (voir tally.py) sont mis à jour dans la même opération.
+        @return Agrégats de la manche après le vote
+        @throw ValueError si la carte n'est pas dans le paquet (voir model.CARDS)
+        """
+        raise NotImplementedError
+
+    def withdraw_vote(self, room_id, username):
+        """
+        @brief Retire le vote d'un participant.
+
+        @return Agrégats de la manche après le retrait
+        """
+        raise NotImplementedError
+
+    def clear_votes(self, room_id):
+        """ @brief Vide les votes (et leurs agrégats) et cache à nouveau les cartes. """
+        raise NotImplementedError
+
+    def try_reveal(self, room_id):
+        """
+        @brief Passe la salle en état révélé si elle ne l'est pas déjà.
+
+        @return True si cet appel a effectué la révélation
+        """
+        raise NotImplementedError
+
+    def save_story_result(self, room_id, index, final_vote, rule, votes):
+        """ @brief Enregistre le résultat d'une tâche dans le backlog. """
+        raise NotImplementedError
+
+    def backlog_page(self, room_id, offset, limit):
+        """
+        @brief Lit une fenêtre du backlog sans charger toute la liste.
+
+        @return tuple (nombre total de tâches, liste des tâches [offset, offset + limit[)
+        """
+        raise NotImplementedError
+
+    def backlog_length(self, room_id):
+        """ @brief Nombre de tâches du backlog. """
+        return self.backlog_page(room_id, 0, 0)[0]
+
+    def iter_backlog(self, room_id, batch_size=500):
+        """
+        @brief Parcourt le backlog page par page (voir backlog_page).
+
+        Seule une page est en mémoire à la fois ; le parcours s'arrête si la
+        salle disparaît (ou si le backlog raccourcit) en cours de route.
+        @throw KeyError si la salle n'existe pas (stockage en mémoire)
+        """
+        offset = 0
+        while True:
+            count, stories = self.backlog_page(room_id, offset, batch_size)
+            yield from stories
+            offset += len(stories)
+            if not stories or offset >= count:
+                return
+
+    def advance_story(self, room_id):
+        """
+        @brief Passe à la tâche suivante et réinitialise la manche.
+
+        @return Le nouvel index de tâche
+        """
+        raise NotImplementedError
+
+    def next_revision(self, room_id):
+        """
+        @brief Incrémente et retourne la révision de la salle (voir state_sync).
+
+        @return La nouvelle révision, ou None si la salle n'existe pas
+        """
+        raise NotImplementedError
+
+    # ------------------ Accès façon dictionnaire ------------------
+
+    def __contains__(self, room_id):
+        return self.get_room(room_id) is not None
+
+    def __getitem__(self, room_id):
+        room_data = self.get_room(room_id)
+        if room_data is None:
+            raise KeyError(room_id)
+        return room_data
+
+    def __setitem__(self, room_id, room_data):
+        self.create_room(room_id, room_data)
+
+    def __len__(self):
+        return len(self.room_ids())
+
+    def clear(self):
+        """ @brief Supprime toutes les salles. """
+        for room_id in self.room_ids():
+            self.delete_room(room_id)
+
+
+class InMemoryRoomStore(RoomStore):
+    """
+    @brief Stockage en mémoire du processus (un seul worker).
+
+    Les salles sont des objets compacts (voir model.py). get_room() retourne
+    l'état vivant de la salle, sans copie, lisible comme un dictionnaire.
+    """
+
+    def __init__(self):
+        self.rooms = {}  # {'room_id': Room}
+
+    def create_room(self, room_id, room_data):
+        self.rooms[room_id] = Room.from_dict(room_data)
+
+    def get_room(self, room_id):
+        return self.rooms.get(room_id)
+
+    def update_room(self, room_id, **fields):
+        room = self.rooms.get(room_id)
+        if room is None:
+            return False
+        room.update(fields)
+        return True
+
+    def delete_room(self, room_id):
+        self.rooms.pop(room_id, None)
+
+    def room_ids(self):
+        return list(self.rooms)
+
+    def add_participant(self, room_id, sid, username):
+        room = self.rooms.get(room_id)
+        if room is None:
+            return False
+        room.participants[sid] = Participant(sid, username)
+        return True
+
+    def remove_participant(self, room_id, sid):
+        room = self.rooms.get(room_id)
+        if room is None:
+            return None
+        participant = room.participants.pop(sid, None)
+        if participant is None:
+            return None
+        self.withdraw_vote(room_id, participant.username)
+        return participant.username
+
+    def record_vote(self, room_id, username, vote):
+        room_round = self.rooms[room_id].round
+        previous = room_round.set_vote(username, vote)
+        return apply_delta(room_round.tally, vote_delta(previous, vote))
+
+    def withdraw_vote(self, room_id, username):
+        room_round = self.rooms[room_id].round
+        previous = room_round.set_vote(username, None)
+        return apply_delta(room_round.tally, vote_delta(previous, None))
+
+    def clear_votes(self, room_id):
+        self.rooms[room_id].round = Round()
+
+    def try_reveal(self, room_id):
+        room_round = self.rooms[room_id].round
+        if room_round.is_revealed:
+            return False
+        room_round.is_revealed = True
+        return True
+
+    def save_story_result(self, room_id, index, final_vote, rule, votes):
+        room = self.rooms[room_id]
+        story = room.writable_story(index)
+        story.final_vote = final_vote
+        story.consensus_rule = rule
+        story.set_votes(votes, room.shared_voters(votes))
+
+    def backlog_page(self, room_id, offset, limit):
+        backlog = self.rooms[room_id].backlog
+        return len(backlog), backlog[offset:offset + limit]
+
+    def advance_story(self, room_id):
+        room = self.rooms[room_id]
+        room.current_story_index += 1
+        room.round = Round()
+        return room.current_story_index
+
+    def next_revision(self, room_id):
+        room = self.rooms.get(room_id)
+        if room is None:
+            return None
+        room.revision = (room.revision if room.revision is not MISSING else 0) + 1
+        return room.revision
+
+
+class RedisRoomStore(RoomStore):
+    """
+    @brief Stockage partagé dans Redis (plusieurs workers / machines).
+
+    Organisation des clés pour une salle <id> :
+    - <prefix>room:<id>               hash des champs simples (valeurs JSON)
+    - <prefix>room:<id>:participants  hash {sid: pseudo}
+    - <prefix>room:<id>:votes         hash {pseudo: vote}
+    - <prefix>room:<id>:tally         hash des agrégats (count, numeric_count, sum, h:<carte>)
+    - <prefix>room:<id>:backlog       liste de tâches (JSON)
+    - <prefix>rooms                   ensemble des identifiants de salles
+
+    Les compteurs (révision, index de tâche) utilisent HINCRBY, les
+    opérations lecture-modification-écriture une transaction WATCH/MULTI.
+    Les écritures sur une salle qui a pu être supprimée par un autre worker
+    (RoomLocks ne protège qu'un processus) vérifient d'abord son existence
+    dans la même transaction, sans quoi un hash partiel serait recréé.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix='poker:'):
+        """
+        @param client Client compatible redis-py (redis.Redis, fakeredis.FakeRedis...)
+        @param prefix Préfixe des clés, pour partager une base Redis
+        """
+        self._redis = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """ @brief Crée un stockage à partir d'une URL redis://... """
+        if redis is None:
+            raise RuntimeError("Le paquet 'redis' est requis pour ROOM_STORE_URL=redis://...")
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    # ------------------ Clés ------------------
+
+    def _key(self, room_id, suffix=''):
+        return f'{self._prefix}room:{room_id}{suffix}'
+
+    def _index_key(self):
+        return f'{self._prefix}rooms'
+
+    def _room_keys(self, room_id):
+        return [self._key(room_id), self._key(room_id, ':participants'), self._key(room_id, ':votes'),
+                self._key(room_id, ':backlog'), self._key(room_id, ':tally')]
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def _read_tally(self, raw):
+        """ @brief Convertit le hash Redis des agrégats en dict (voir tally.py). """
+        tally = empty_tally()
+        for field, value in raw.items():
+            field, value = self._decode(field), self._decode(value)
+            if field.startswith('h:'):
+                if int(value) > 0:
+                    tally['histogram'][field[2:]] = int(value)
+            elif field == 'sum':
+                tally['sum'] = float(value)
+            else:
+                tally[field] = int(value)
+        return tally
+
+    def _queue_delta(self, pipe, room_id, delta):
+        """ @brief Ajoute à une transaction les HINCRBY correspondant à un delta. """
+        tally_key = self._key(room_id, ':tally')
+        pipe.hincrby(tally_key, 'count', delta['count'])
+        pipe.hincrby(tally_key, 'numeric_count', delta['numeric_count'])
+        pipe.hincrbyfloat(tally_key, 'sum', delta['sum'])
+        for card, change in delta['histogram'].items():
+            pipe.hincrby(tally_key, f'h:{card}', change)
+
+    def _change_vote(self, room_id, username, vote):
+        """ @brief Remplace (ou retire si None) un vote et ses agrégats de façon atomique. """
+        votes_key = self._key(room_id, ':votes')
+
+        def change(pipe):
+            previous = self._decode(pipe.hget(votes_key, username))
+            pipe.multi()
+            if vote is None:
+                pipe.hdel(votes_key, username)
+            else:
+                pipe.hset(votes_key, username, vote)
+            self._queue_delta(pipe, room_id, vote_delta(previous, vote))
+            pipe.hgetall(self._key(room_id, ':tally'))
+
+        return self._read_tally(self._redis.transaction(change, votes_key)[-1])
+
+    def _if_room_exists(self, room_id, queue):
+        """
+        @brief Exécute les commandes ajoutées par queue(pipe) si la salle existe encore.
+
+        La clé principale est surveillée (WATCH) : une suppression concurrente
+        relance la transaction, qui ne trouve alors plus la salle.
+        @return Résultats des commandes, ou None si la salle n'existe pas
+        """
+        room_key = self._key(room_id)
+        found = []
+
+        def run(pipe):
+            found[:] = [pipe.exists(room_key)]
+            pipe.multi()
+            if found[0]:
+                queue(pipe)
+
+        results = self._redis.transaction(run, room_key)
+        return results if found[0] else None
+
+    # ------------------ Cycle de vie des salles ------------------
+
+    def create_room(self, room_id, room_data):
+        fields = {key: json.dumps(value) for key, value in room_data.items()
+                  if key not in ('participants', 'votes', 'backlog', 'tally')}
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(*self._room_keys(room_id))
+        pipe.hset(self._key(room_id), mapping=fields)
+        if room_data.get('participants'):
+            pipe.hset(self._key(room_id, ':participants'), mapping=room_data['participants'])
+        if room_data.get('votes'):
+            pipe.hset(self._key(room_id, ':votes'), mapping=room_data['votes'])
+            tally = empty_tally()
+            for vote in room_data['votes'].values():
+                apply_delta(tally, vote_delta(None, vote))
+            self._queue_delta(pipe, room_id, tally)  # Même forme qu'un delta depuis zéro
+        if room_data.get('backlog'):
+            pipe.rpush(self._key(room_id, ':backlog'),
+                       *[json.dumps(to_plain(story)) for story in room_data['backlog']])
+        pipe.sadd(self._index_key(), room_id)
+        pipe.execute()
+
+    def get_room(self, room_id):
+        return self._read_room(room_id, with_backlog=True)
+
+    def get_room_state(self, room_id):
+        # Sans LRANGE 0 -1 : le backlog peut compter des dizaines de milliers de tâches
+        return self._read_room(room_id, with_backlog=False)
+
+    def _read_room(self, room_id, with_backlog):
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.hgetall(self._key(room_id))
+        pipe.hgetall(self._key(room_id, ':participants'))
+        pipe.hgetall(self._key(room_id, ':votes'))
+        pipe.hgetall(self._key(room_id, ':tally'))
+        if with_backlog:
+            pipe.lrange(self._key(room_id, ':backlog'), 0, -1)
+        fields, participants, votes, tally, *backlog = pipe.execute()
+        if not fields:
+            return None
+
+        room_data = {self._decode(key): json.loads(value) for key, value in fields.items()}
+        room_data['participants'] = {self._decode(k): self._decode(v) for k, v in participants.items()}
+        room_data['votes'] = {self._decode(k): self._decode(v) for k, v in votes.items()}
+        if with_backlog:
+            room_data['backlog'] = [json.loads(story) for story in backlog[0]]
+        room_data['tally'] = self._read_tally(tally)
+        return room_data
+
+    def __contains__(self, room_id):
+        return bool(self._redis.exists(self._key(room_id)))
+
+    def update_room(self, room_id, **fields):
+        def write(pipe):
+            if fields:
+                pipe.hset(self._key(room_id), mapping={key: json.dumps(value) for key, value in fields.items()})
+
+        return self._if_room_exists(room_id, write) is not None
+
+    def delete_room(self, room_id):
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(*self._room_keys(room_id))
+        pipe.srem(self._index_key(), room_id)
+        pipe.execute()
+
+    def room_ids(self):
+        return [self._decode(room_id) for room_id in self._redis.smembers(self._index_key())]
+
+    # ------------------ Participants ------------------
+
+    def add_participant(self, room_id, sid, username):
+        return self._if_room_exists(
+            room_id, lambda pipe: pipe.hset(self._key(room_id, ':participants'), sid, username)) is not None
+
+    def remove_participant(self, room_id, sid):
+        participants_key = self._key(room_id, ':participants')
+
+        votes_key = self._key(room_id, ':votes')
+
+        def remove(pipe):
+            username = self._decode(pipe.hget(participants_key, sid))
+            previous = self._decode(pipe.hget(votes_key, username)) if username is not None else None
+            pipe.multi()
+            if username is not None:
+                pipe.hdel(participants_key, sid)
+                pipe.hdel(votes_key, username)
+                self._queue_delta(pipe, room_id, vote_delta(previous, None))
+            return username
+
+        return self._redis.transaction(remove, participants_key, votes_key, value_from_callable=True)
+
+    # ------------------ Votes et progression ------------------
+
+    def record_vote(self, room_id, username, vote):
+        if vote not in CARDS:
+            raise ValueError(f"Carte hors paquet : {vote!r}")
+        return self._change_vote(room_id, username, vote)
+
+    def withdraw_vote(self, room_id, username):
+        return self._change_vote(room_id, username, None)
+
+    def clear_votes(self, room_id):
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(self._key(room_id, ':votes'), self._key(room_id, ':tally'))
+        pipe.hset(self._key(room_id), 'is_revealed', json.dumps(False))
+        pipe.execute()
+
+    def try_reveal(self, room_id):
+        room_key = self._key(room_id)
+
+        def reveal(pipe):
+            if json.loads(pipe.hget(room_key, 'is_revealed') or 'false'):
+                pipe.multi()
+                return False
+            pipe.multi()
+            pipe.hset(room_key, 'is_revealed', json.dumps(True))
+            return True
+
+        return self._redis.transaction(reveal, room_key, value_from_callable=True)
+
+    def save_story_result(self, room_id, index, final_vote, rule, votes):
+        backlog_key = self._key(room_id, ':backlog')
+
+        def save(pipe):
+            story = json.loads(pipe.lindex(backlog_key, index))
+            story['final_vote'] = final_vote
+            story['consensus_rule'] = rule
+            story['votes_submitted'] = dict(votes)
+            pipe.multi()
+            pipe.lset(backlog_key, index, json.dumps(story))
+
+        self._redis.transaction(save, backlog_key)
+
+    def backlog_length(self, room_id):
+        return self._redis.llen(self._key(room_id, ':backlog'))
+
+    def backlog_page(self, room_id, offset, limit):
+        backlog_key = self._key(room_id, ':backlog')
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.llen(backlog_key)
+        # LRANGE inclut la borne de fin (et -1 voudrait dire "jusqu'au bout")
+        pipe.lrange(backlog_key, offset, offset + max(limit, 1) - 1)
+        count, stories = pipe.execute()
+        return count, [json.loads(story) for story in stories[:max(limit, 0)]]
+
+    def advance_story(self, room_id):
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.hincrby(self._key(room_id), 'current_story_index', 1)
+        pipe.delete(self._key(room_id, ':votes'), self._key(room_id, ':tally'))
+        pipe.hset(self._key(room_id), 'is_revealed', json.dumps(False))
+        new_index, _, _ = pipe.execute()
+        return new_index
+
+    def next_revision(self, room_id):
+        results = self._if_room_exists(room_id, lambda pipe: pipe.hincrby(self._key(room_id), 'revision', 1))
+        return results[0] if results is not None else None
+
+
+def create_room_store(url=None):
+    """
+    @brief Instancie le stockage configuré.
+
+    @param url None (mémoire) ou URL redis://, rediss://, unix://
+    @return RoomStore
+    """
+    if not url:
+        return InMemoryRoomStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisRoomStore.from_url(url)
+    raise ValueError(f"ROOM_STORE_URL non supportée : {url}")
@@ -0,0 +1,75 @@
+"""
+@file tally.py
+@brief Agrégats de la manche en cours, tenus à jour à chaque vote
+
+Au lieu de tout recalculer à partir de room_data['votes'] à chaque
+émission ou révélation, chaque vote (nouveau, modifié ou retiré)
+applique un petit delta au décompte de la manche :
+{'count', 'numeric_count', 'sum', 'histogram': {carte: nombre}}.
+"""
+
+from poker.consensus import DEFAULT_DECK
+
+
+def empty_tally():
+    """ @brief Agrégats d'une manche sans vote. """
+    return {'count': 0, 'numeric_count': 0, 'sum': 0.0, 'histogram': {}}
+
+
+def vote_delta(previous, vote, deck=DEFAULT_DECK):
+    """
+    @brief Calcule la variation des agrégats quand un vote change.
+
+    @param previous Vote précédent du participant (None s'il n'avait pas voté)
+    @param vote Nouveau vote (None pour un retrait)
+    @return dict {'count', 'numeric_count', 'sum', 'histogram': {carte: +/-1}}
+    """
+    delta = {'count': 0, 'numeric_count': 0, 'sum': 0.0, 'histogram': {}}
+    for card, sign in ((previous, -1), (vote, 1)):
+        if card is None:
+            continue
+        delta['count'] += sign
+        delta['histogram'][card] = delta['histogram'].get(card, 0) + sign
+        value = deck.value(card)
+        if value is not None:
+            delta['numeric_count'] += sign
+            delta['sum'] += sign * value
+    return delta
+
+
+def apply_delta(tally, delta):
+    """
+    @brief Applique un delta (voir vote_delta) sur des agrégats en mémoire.
+    """
+    tally['count'] += delta['count']
+    tally['numeric_count'] += delta['numeric_count']
+    tally['sum'] += delta['sum']
+    histogram = tally['histogram']
+    for card, change in delta['histogram'].items():
+        remaining = histogram.get(card, 0) + change
+        if remaining > 0:
+            histogram[card] = remaining
+        else:
+            histogram.pop(card, None)
+    return tally
+
+
+def progress(tally, participants_count):
+    """
+    @brief Avancement de la manche, envoyé tel quel aux clients.
+
+    @return dict {'voted', 'total', 'voted_all'}
+    """
+    voted = tally['count']
+    return {
+        'voted': voted,
+        'total': participants_count,
+        'voted_all': participants_count > 0 and voted >= participants_count,
+    }
+
+
+def average(tally):
+    """ @brief Moyenne des votes numériques en O(1) (None sans vote numérique). """
+    if not tally['numeric_count']:
+        return None
+    return tally['sum'] / tally['numeric_count']
@@ -0,0 +1,102 @@
+"""
+@file templates.py
+@brief Modèles de backlog partagés entre salles (formations, PI planning)
+
+Un même backlog sert souvent à des dizaines de salles. Au lieu de
+renvoyer, réanalyser et copier le fichier à chaque création de salle,
+il est importé et validé une fois en modèle : ses tâches deviennent des
+objets figés (SharedStory) que chaque salle référence via un
+SharedBacklog. Une salle ne garde en propre que ses tâches estimées.
+
+Le partage vaut pour InMemoryRoomStore : RedisRoomStore écrit une copie
+complète du backlog dans chaque salle créée depuis un modèle.
+
+Les modèles vivent dans la mémoire du processus (comme ConnectionRegistry) ;
+au-delà de max_templates, le moins récemment utilisé est oublié (les
+salles qui le référencent gardent leurs tâches).
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from poker.model import SharedBacklog, SharedStory
+
+
+class BacklogTemplate:
+    """
+    @brief Backlog importé une fois, en lecture seule.
+    """
+
+    __slots__ = ('template_id', 'name', 'stories', 'import_errors', 'created_at')
+
+    def __init__(self, template_id, name, stories, import_errors=(), created_at=None):
+        """
+        @param stories Tâches importées (dicts {'name', 'description'} ou Story)
+        @param import_errors Éléments rejetés à l'import (voir backlog_import)
+        """
+        self.template_id = template_id
+        self.name = name
+        self.stories = tuple(SharedStory.freeze(story) for story in stories)
+        self.import_errors = tuple(import_errors)
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def backlog(self):
+        """ @brief Nouveau backlog de salle qui référence les tâches du modèle. """
+        return SharedBacklog(self.stories)
+
+    def summary(self):
+        """
+        @return dict {'id', 'name', 'count', 'import_errors', 'created_at'}
+        """
+        return {'id': self.template_id, 'name': self.name, 'count': len(self.stories),
+                'import_errors': list(self.import_errors), 'created_at': self.created_at}
+
+
+class TemplateRegistry:
+    """
+    @brief Modèles de backlog du processus, du moins au plus récemment utilisé.
+    """
+
+    def __init__(self, max_templates=50):
+        """
+        @param max_templates Nombre maximal de modèles gardés (0 = illimité)
+        """
+        self.max_templates = max_templates
+        self._templates = OrderedDict()  # {'template_id': BacklogTemplate}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def add(self, name, stories, import_errors=()):
+        """
+        @brief Enregistre un modèle à partir de tâches déjà importées et validées.
+
+        @return BacklogTemplate
+        """
+        template = BacklogTemplate(uuid.uuid4().hex[:8].upper(), name, stories, import_errors)
+        with self._lock:
+            self._templates[template.template_id] = template
+            while self.max_templates and len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return template
+
+    def get(self, template_id):
+        """
+        @brief Modèle par identifiant (marqué comme récemment utilisé).
+
+        @return BacklogTemplate ou None
+        """
+        with self._lock:
+            template = self._templates.get(template_id)
+            if template is not None:
+                self._templates.move_to_end(template_id)
+        return template
+
+    def summaries(self):
+        """ @brief Résumés des modèles, du plus récent au plus ancien. """
+        with self._lock:
+            templates = list(self._templates.values())
+        return [template.summary() for template in sorted(templates, key=lambda t: -t.created_at)]
@@ -0,0 +1,40 @@
+"""
+@file serve.py
+@brief Point d'entrée de production (mode asynchrone coopératif, sans reloader)
+
+app.py lancé directement utilise le serveur de développement (debug,
+reloader, un thread par connexion). Ce script choisit un mode coopératif
+(gevent par défaut, ou eventlet) avant d'importer l'application.
+
+Usage :
+    SOCKETIO_ASYNC_MODE=gevent HOST=0.0.0.0 PORT=5000 python serve.py
+"""
+
+import os
+
+from poker.server import async_mode_from_env, monkey_patch
+
+# Le monkey patching doit précéder l'import de Flask, de Redis et de l'application
+ASYNC_MODE = async_mode_from_env(default='gevent')
+monkey_patch(ASYNC_MODE)
+os.environ['SOCKETIO_ASYNC_MODE'] = ASYNC_MODE
+
+from app import app, socketio  # noqa: E402
+from poker.logs import log_event  # noqa: E402
+
+
+def main():
+    """
+    @brief Lance le serveur Socket.IO de production.
+    """
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5000))
+    log_event('server_start', "Serveur Planning Poker démarré", mode=ASYNC_MODE, host=host, port=port)
+    socketio.run(app, host=host, port=port, debug=False, use_reloader=False,
+                 log_output=os.environ.get('ACCESS_LOG') == '1',
+                 # Mode threading accepté pour comparer les modes avec le banc de charge
+                 allow_unsafe_werkzeug=(ASYNC_MODE == 'threading'))
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,18 @@ document.getElementById('use-timer-checkbox').addEventListener('change', updateA
 const cardValues = ["0", "1", "2", "3", "5", "8", "13", "20", "40", "100", "?", "☕️"];
 const deckElement = document.getElementById('card-deck');
 
+// Image d'une carte : vue du sprite (ressources construites) ou fichier SVG séparé
+const cardImageUrl = (fileName) => CARD_SPRITE
+    ? `${CARD_SPRITE}#${fileName}`
+    : `/static/cartes/${fileName}.svg`;
+
+// Nom du fichier SVG d'une carte
+const cardFileName = (value) => {
+    if (value === '?') return 'cartes_interro';
+    if (value === '☕️') return 'cartes_cafe';
+    return `cartes_${value}`;
+};
+
 // Générations des boutons de vote avec vos images SVG spécifiques
 const setupCardDeck = () => {
     deckElement.innerHTML = ''; 
@@ -40,101 +52,128 @@ const setupCardDeck = () => {
         const button = document.createElement('button');
         button.className = 'card-btn svg-card';
         button.setAttribute('data-value', value);
-        let fileName;
-
-        if (value === '?') {
-            fileName = 'cartes_interro';
-        } else if (value === '☕️') {
-            fileName = 'cartes_cafe';
-        } else {
-            fileName = `cartes_${value}`;
-        }
 
         const img = document.createElement('img');
-        img.src = `/static/cartes/${fileName}.svg`;
+        img.src = cardImageUrl(cardFileName(value));
         img.alt = `Carte ${value}`;
         img.className = "svg-img-content";
 
         button.appendChild(img);
         
         button.addEventListener('click', function() {
-            const voteValue = this.getAttribute('data-value');
+            // Cliquer à nouveau sur la carte sélectionnée retire le vote
+            const withdraw = this.classList.contains('selected');
+            const voteValue = withdraw ? null : this.getAttribute('data-value');
             if (socket) {
                 socket.emit('submit_vote', { room_id: ROOM_ID, username: USERNAME, vote: voteValue });
             }
             document.querySelectorAll('.card-btn').forEach(btn => btn.classList.remove('selected'));
-            this.classList.add('selected');
+            if (!withdraw) this.classList.add('selected');
         });
         deckElement.appendChild(button);
     });
 };
 
+// --- PARTICIPANTS ET VOTES : RENDU INCRÉMENTAL ---
+// Chaque connexion (sid) garde sa ligne dans #participants-list et sa carte dans #other-votes :
+// un événement ne modifie que les nœuds dont l'état a changé, au lieu de tout reconstruire.
+const participantNodes = new Map();  // {sid: {username, item, card, image, itemState, cardState}}
+
+// Crée la ligne et la carte d'un participant (la carte reste cachée tant qu'elle n'a rien à montrer)
+const createParticipantNodes = (username) => {
+    const item = document.createElement('li');
+    const card = document.createElement('div');
+    card.className = 'participant-card';
+    card.setAttribute('data-username', username);
+    card.style.display = 'none';
+    return { username: username, item: item, card: card, image: null, itemState: null, cardState: 'hidden' };
+};
+
+// Met à jour la carte d'un participant : cachée, dos de carte, ou valeur révélée
+const renderParticipantCard = (nodes, hasVoted, vote) => {
+    let cardState = 'hidden';
+    if (currentState.is_revealed) {
+        cardState = hasVoted ? `revealed:${vote}` : 'missing';
+    } else if (hasVoted) {
+        cardState = 'voted';
+    }
+    if (cardState === nodes.cardState) {
+        return;
+    }
+    const card = nodes.card;
+    nodes.cardState = cardState;
+    card.style.display = cardState === 'hidden' ? 'none' : '';
+    if (cardState === 'voted') {
+        card.className = 'participant-card voted';  // Dos de carte
+        card.textContent = '';
+    } else if (cardState === 'missing') {
+        card.className = 'participant-card revealed';
+        card.textContent = 'N/A';
+    } else if (cardState !== 'hidden') {
+        card.className = 'participant-card revealed';
+        if (!nodes.image) {
+            nodes.image = document.createElement('img');
+            nodes.image.className = 'svg-img-content';
+        }
+        nodes.image.src = cardImageUrl(cardFileName(vote));
+        card.replaceChildren(nodes.image);
+    }
+};
+
 // Mettre à jour la liste des participants et leur état de vote
+// participants : {sid: pseudo} (ordre d'arrivée), votes : {pseudo: carte}
 const updateParticipantsAndVotes = (participants, votes) => {
     const listElement = document.getElementById('participants-list');
-    const votesElement = document.getElementById('other-votes'); 
-    listElement.innerHTML = '';
-    votesElement.innerHTML = ''; 
+    const votesElement = document.getElementById('other-votes');
+    const voted = new Set(Object.keys(votes));
+    const sids = Object.keys(participants);
 
-    let votedCount = 0;
-    
-    participants.forEach(username => {
-        const hasVoted = Object.keys(votes).includes(username);
-        if (hasVoted) votedCount++; 
+    // Avancement calculé par le serveur à partir des agrégats de la manche
+    const progress = currentState.progress || { voted: 0, total: sids.length, voted_all: false };
 
-        // Mise à jour de la liste des pseudos 
-        const li = document.createElement('li');
-        li.textContent = username;
-        li.style.fontWeight = hasVoted ? 'bold' : 'normal';
-        li.innerHTML += hasVoted ? ' ✅' : '';
-        listElement.appendChild(li);
-
-        // Mise à jour de l'affichage des cartes 
-        // On n'affiche pas la carte de l'utilisateur local dans #other-votes 
-        if (currentState.is_revealed || hasVoted) {
-            const card = document.createElement('div');
-            card.className = 'participant-card';
-            card.setAttribute('data-username', username);
-
-            if (currentState.is_revealed) {
-                card.classList.add('revealed');
-                const voteValue = hasVoted ? votes[username] : 'N/A';
-                
-                if (hasVoted) {
-                    let fileName;
-                    if (voteValue === '?') fileName = 'carte_interro';
-                    else if (voteValue === '☕️') fileName = 'cartes_cafe';
-                    else fileName = `cartes_${voteValue}`;
-
-                    card.innerHTML = `<img src="/static/cartes/${fileName}.svg" class="svg-img-content">`;
-                } else {
-                    card.textContent = 'N/A';
-                }
-            }else if (hasVoted) {
-                // Affiche le dos de carte
-                card.classList.add('voted'); 
-                card.textContent = '';
-                
-            } else {
-                // Afficher un placeholder
-                card.classList.add('pending'); 
-                card.textContent = '...'; 
-            }
-            votesElement.appendChild(card);
+    // Participants partis (ou pseudo changé) : leurs nœuds sont retirés
+    participantNodes.forEach((nodes, sid) => {
+        if (participants[sid] !== nodes.username) {
+            nodes.item.remove();
+            nodes.card.remove();
+            participantNodes.delete(sid);
+        }
+    });
+
+    sids.forEach(sid => {
+        const username = participants[sid];
+        let nodes = participantNodes.get(sid);
+        if (!nodes) {
+            // Nouvel arrivant : ajouté en fin de liste, comme dans l'ordre des participants
+            nodes = createParticipantNodes(username);
+            participantNodes.set(sid, nodes);
+            listElement.appendChild(nodes.item);
+            votesElement.appendChild(nodes.card);
         }
+        const hasVoted = voted.has(username);
+
+        // Ligne du participant, en gras avec ✅ une fois son vote reçu
+        if (nodes.itemState !== hasVoted) {
+            nodes.itemState = hasVoted;
+            nodes.item.textContent = hasVoted ? `${username} ✅` : username;
+            nodes.item.style.fontWeight = hasVoted ? 'bold' : 'normal';
+        }
+        renderParticipantCard(nodes, hasVoted, votes[username]);
     });
 
-    // Ensuite, on met à jour le DOM après l'itération
-    document.getElementById('participant-count').textContent = participants.length;
+    const countElement = document.getElementById('participant-count');
+    if (countElement.textContent !== String(sids.length)) {
+        countElement.textContent = sids.length;
+    }
     
     // Révélation automatique si sans timer et tous ont voté (Admin seulement)
-    if (isAdmin && window.currentState.is_started && !window.currentState.use_timer && !window.currentState.is_revealed && votedCount === participants.length && participants.length > 0) {
+    if (isAdmin && window.currentState.is_started && !window.currentState.use_timer && !window.currentState.is_revealed && progress.voted_all) {
         socket.emit('reveal_votes', { room_id: ROOM_ID });
     }
     
     // Mettre à jour les boutons admin (Révéler / Suivant)
     if (isAdmin) {
-        document.getElementById('reveal-votes-btn').disabled = (votedCount === 0 || window.currentState.is_revealed);
+        document.getElementById('reveal-votes-btn').disabled = (progress.voted === 0 || window.currentState.is_revealed);
         document.getElementById('next-task-btn').disabled = !currentState.is_revealed;
         document.getElementById('restart-vote-btn').disabled = !currentState.is_revealed;
     }
@@ -145,7 +184,7 @@ const updateParticipantsAndVotes = (participants, votes) => {
 const resetInterfaceForNewRound = () => {
     document.querySelectorAll('.card-btn').forEach(btn => btn.classList.remove('selected'));
     document.getElementById('time-remaining').textContent = 'Prêt';
-    document.getElementById('other-votes').innerHTML = '';
+    // Les cartes des participants sont cachées au rendu suivant (votes vidés), sans être recréées
     
     // Réinitialise l'état des boutons admin au début d'un round
     if (isAdmin) {
@@ -155,30 +194,138 @@ const resetInterfaceForNewRound = () => {
     }
 };
 
-// Met à jour la liste des tâches du backlog. 
-const updateBacklogList = (backlog, currentIndex) => {
+// --- BACKLOG PAGINÉ ET LISTE VIRTUALISÉE ---
+// Le backlog n'est plus envoyé avec l'état : il est lu par pages (GET /room/<id>/backlog)
+// et seules les lignes visibles de la liste existent dans le DOM.
+const BACKLOG_PAGE_SIZE = 50;
+const BACKLOG_ROW_HEIGHT = 52;   // Hauteur d'une ligne, marge comprise (voir room.css)
+const BACKLOG_OVERSCAN = 5;      // Lignes rendues en plus au-dessus et en dessous
+const backlogPages = new Map();      // {numéro de page: [tâches]}
+const backlogRequests = new Map();   // {numéro de page: requête en cours}
+let backlogCount = 0;
+let backlogCurrentIndex = 0;
+let backlogFrame = null;
+
+// Charge une page du backlog (une seule requête à la fois par page)
+const fetchBacklogPage = (page) => {
+    if (backlogPages.has(page)) {
+        return Promise.resolve(backlogPages.get(page));
+    }
+    if (!backlogRequests.has(page)) {
+        const url = `/room/${ROOM_ID}/backlog?offset=${page * BACKLOG_PAGE_SIZE}&limit=${BACKLOG_PAGE_SIZE}`;
+        const request = fetch(url)
+            .then(response => {
+                if (!response.ok) throw new Error(`Backlog indisponible (HTTP ${response.status})`);
+                return response.json();
+            })
+            .then(data => {
+                backlogCount = data.count;
+                backlogPages.set(page, data.items);
+                return data.items;
+            })
+            .finally(() => backlogRequests.delete(page));
+        backlogRequests.set(page, request);
+    }
+    return backlogRequests.get(page);
+};
+
+// Tâche déjà chargée (undefined si sa page n'est pas en cache)
+const cachedStory = (index) => {
+    const page = backlogPages.get(Math.floor(index / BACKLOG_PAGE_SIZE));
+    return page ? page[index % BACKLOG_PAGE_SIZE] : undefined;
+};
+
+// Tâche à la demande : charge sa page si nécessaire
+const getStory = (index) => fetchBacklogPage(Math.floor(index / BACKLOG_PAGE_SIZE))
+    .then(items => items[index % BACKLOG_PAGE_SIZE]);
+
+// Oublie les pages chargées (ex: nouveau snapshot après une reconnexion)
+const resetBacklogCache = () => {
+    backlogPages.clear();
+};
+
+// Dessine uniquement les lignes visibles de la liste
+const renderBacklogWindow = () => {
+    backlogFrame = null;
+    const section = document.getElementById('backlog-list-section');
     const listElement = document.getElementById('backlog-list');
-    listElement.innerHTML = '';
-    document.getElementById('total-tasks').textContent = backlog.length;
+    listElement.style.height = `${backlogCount * BACKLOG_ROW_HEIGHT}px`;
+
+    const top = Math.max(0, section.scrollTop - listElement.offsetTop);
+    const first = Math.max(0, Math.floor(top / BACKLOG_ROW_HEIGHT) - BACKLOG_OVERSCAN);
+    const last = Math.min(backlogCount,
+        Math.ceil((top + section.clientHeight) / BACKLOG_ROW_HEIGHT) + BACKLOG_OVERSCAN);
 
-    backlog.forEach((task, index) => {
+    const fragment = document.createDocumentFragment();
+    const missingPages = new Set();
+    for (let index = first; index < last; index++) {
+        const task = cachedStory(index);
         const li = document.createElement('li');
-        li.textContent = `${index + 1}. ${task.name}`;
-        if (index === currentIndex) {
+        li.style.top = `${index * BACKLOG_ROW_HEIGHT}px`;
+        if (task) {
+            li.textContent = `${index + 1}. ${task.name}`;
+        } else {
+            li.textContent = `${index + 1}. …`;
+            missingPages.add(Math.floor(index / BACKLOG_PAGE_SIZE));
+        }
+        if (index === backlogCurrentIndex) {
             li.classList.add('current');
         }
-        
-        listElement.appendChild(li);
+        fragment.appendChild(li);
+    }
+    listElement.replaceChildren(fragment);
+
+    // Les pages manquantes sont chargées puis la fenêtre est redessinée
+    missingPages.forEach(page => {
+        fetchBacklogPage(page).then(scheduleBacklogRender).catch(error => console.error(error));
     });
 };
 
-// Met à jour les détails de la tâche en cours.
+// Regroupe les redessins (défilement, chargements) sur une image
+const scheduleBacklogRender = () => {
+    if (backlogFrame === null) {
+        backlogFrame = requestAnimationFrame(renderBacklogWindow);
+    }
+};
+
+document.getElementById('backlog-list-section').addEventListener('scroll', scheduleBacklogRender);
+
+// Met à jour la liste des tâches du backlog. 
+const updateBacklogList = (count, currentIndex) => {
+    backlogCount = count;
+    backlogCurrentIndex = currentIndex;
+    document.getElementById('total-tasks').textContent = count;
+    scheduleBacklogRender();
+};
+
+// Fait défiler la liste jusqu'à une tâche si elle n'est pas visible
+const scrollBacklogTo = (index) => {
+    const section = document.getElementById('backlog-list-section');
+    const listElement = document.getElementById('backlog-list');
+    const rowTop = listElement.offsetTop + index * BACKLOG_ROW_HEIGHT;
+    if (rowTop < section.scrollTop || rowTop + BACKLOG_ROW_HEIGHT > section.scrollTop + section.clientHeight) {
+        section.scrollTop = rowTop;
+    }
+};
+
+// Met à jour les détails de la tâche en cours (chargée à la demande si besoin).
 const updateCurrentStory = (state) => {
-    const currentTask = state.backlog[state.current_story_index];
+    const index = state.current_story_index;
+    document.getElementById('current-index').textContent = index + 1;
+
+    const showStory = (currentTask) => {
+        if (currentTask && currentState.current_story_index === index) {
+            currentState.current_story = currentTask;
+            document.getElementById('story-name').textContent = currentTask.name;
+            document.getElementById('story-description').textContent = currentTask.description;
+        }
+    };
+
+    const currentTask = state.current_story || cachedStory(index);
     if (currentTask) {
-        document.getElementById('story-name').textContent = currentTask.name;
-        document.getElementById('story-description').textContent = currentTask.description;
-        document.getElementById('current-index').textContent = state.current_story_index + 1;
+        showStory(currentTask);
+    } else {
+        getStory(index).then(showStory).catch(error => console.error(error));
     }
 };
 
@@ -197,10 +344,7 @@ const startTimer = (duration) => {
 
         if (time <= 0) {
             clearInterval(countdownInterval);
-            // La révélation automatique se fait côté serveur.
-            if (isAdmin) {
-                socket.emit('reveal_votes', { room_id: ROOM_ID });
-            }
+            // La révélation automatique se fait côté serveur (DeadlineScheduler).
             timerDisplay.textContent = 'TERMINÉ !';
         } else {
             time--;
@@ -221,10 +365,108 @@ const displayConsensusResult = (result, details) => {
         document.getElementById('story-details').appendChild(resultContainer);
     }
     
-    resultContainer.innerHTML = `
-        <h3>Résultat Final : <span style="color: #4CAF50;">${result}</span></h3>
-        <p style="font-size: 0.9em; color: #555;">Règle appliquée : ${details}</p>
-    `;
+    // Nœuds construits un à un : les détails contiennent des pseudos, jamais interprétés comme du HTML
+    const title = document.createElement('h3');
+    const value = document.createElement('span');
+    value.style.color = '#4CAF50';
+    value.textContent = result;
+    title.append('Résultat Final : ', value);
+
+    const rule = document.createElement('p');
+    rule.style.fontSize = '0.9em';
+    rule.style.color = '#555';
+    rule.textContent = `Règle appliquée : ${details}`;
+
+    resultContainer.replaceChildren(title, rule);
+};
+
+
+// --- SYNCHRONISATION DE L'ÉTAT (PROTOCOLE VERSIONNÉ) ---
+
+// Remplace l'état local par un snapshot complet envoyé par le serveur.
+// On modifie l'objet en place pour que window.currentState reste la même référence.
+const applySnapshot = (snapshot) => {
+    Object.keys(currentState).forEach(key => delete currentState[key]);
+    Object.assign(currentState, snapshot.state);
+    resetBacklogCache();
+    currentState.revision = snapshot.rev;
+    // Les patchs suivants apportent l'avancement ; le snapshot le déduit des agrégats
+    const voted = snapshot.state.tally ? snapshot.state.tally.count : Object.keys(snapshot.state.votes || {}).length;
+    const total = Object.keys(snapshot.state.participants || {}).length;
+    currentState.progress = { voted: voted, total: total, voted_all: total > 0 && voted >= total };
+};
+
+// Application de chaque type de patch sur currentState (miroir de state_sync.PATCH_TYPES)
+const patchHandlers = {
+    participant_joined: (data) => {
+        currentState.participants[data.sid] = data.username;
+    },
+    participant_left: (data) => {
+        delete currentState.participants[data.sid];
+        delete currentState.votes[data.username];
+    },
+    session_started: (data) => {
+        currentState.is_started = true;
+        currentState.use_timer = data.use_timer;
+        currentState.timer_duration = data.duration;
+        currentState.timer_end_time = data.timer_end_time;
+        currentState.is_revealed = false;
+        currentState.votes = {};
+    },
+    vote_cast: (data) => {
+        if (data.vote === null) {
+            delete currentState.votes[data.username]; // Vote retiré
+        } else {
+            currentState.votes[data.username] = data.vote;
+        }
+    },
+    votes_cast: (data) => {
+        // Votes regroupés côté serveur : dernier vote de chaque participant (null = retiré)
+        Object.entries(data.votes).forEach(([username, vote]) => {
+            patchHandlers.vote_cast({ username: username, vote: vote });
+        });
+    },
+    votes_revealed: (data) => {
+        currentState.is_revealed = true;
+        currentState.timer_end_time = null;
+        currentState.votes = data.votes;
+        // Résultat reporté sur les copies locales de la tâche (page en cache, tâche courante)
+        [cachedStory(data.index), currentState.current_story].forEach(task => {
+            if (task && (task.index === undefined || task.index === data.index)) {
+                task.final_vote = data.result;
+                task.consensus_rule = data.rule;
+                task.votes_submitted = data.votes;
+            }
+        });
+    },
+    story_advanced: (data) => {
+        currentState.current_story_index = data.index;
+        currentState.current_story = null; // Chargée à la demande (updateCurrentStory)
+        currentState.timer_end_time = data.timer_end_time;
+        currentState.votes = {};
+        currentState.is_revealed = false;
+    },
+    vote_restarted: (data) => {
+        currentState.timer_end_time = data.timer_end_time;
+        currentState.votes = {};
+        currentState.is_revealed = false;
+    }
+};
+
+// Applique un patch. Retourne false si une révision manque (il faut un snapshot).
+const applyStatePatch = (patch) => {
+    if (patch.rev <= currentState.revision) {
+        return true; // Patch déjà inclus dans l'état local
+    }
+    if (patch.rev !== currentState.revision + 1 || !patchHandlers[patch.type]) {
+        return false;
+    }
+    patchHandlers[patch.type](patch.data);
+    if (patch.data.progress) {
+        currentState.progress = patch.data.progress;
+    }
+    currentState.revision = patch.rev;
+    return true;
 };
 
 
@@ -233,9 +475,12 @@ window.isAdmin = isAdmin;
 window.updateAdminControls = updateAdminControls;
 window.updateParticipantsAndVotes = updateParticipantsAndVotes;
 window.updateBacklogList = updateBacklogList; 
+window.scrollBacklogTo = scrollBacklogTo;
 window.updateCurrentStory = updateCurrentStory; 
 window.resetInterfaceForNewRound = resetInterfaceForNewRound; 
 window.startTimer = startTimer;
 window.displayConsensusResult = displayConsensusResult;
 window.setupCardDeck = setupCardDeck;
+window.applySnapshot = applySnapshot;
+window.applyStatePatch = applyStatePatch;
 
@@ -10,27 +10,76 @@ Ce fichier gère :
 */
 
 
-const socket = io();
+// Encodage JSON (défaut) ou MessagePack (static/js/msgpack-parser.js), comme le serveur
+const socket = io(SOCKETIO_SERIALIZER === 'msgpack' ? { parser: msgpackParser } : {});
 
 
 // --- GESTION DE LA CONNEXION ---
 socket.on('connect', function() {
     console.log(`Connecté au serveur SocketIO comme ${USERNAME} !`);
-
-    socket.emit('join', { 
-        room_id: ROOM_ID,
-        username: USERNAME
-    });
+    // Après une (re)connexion, la jointure renvoie un snapshot complet
+    snapshotPending = true;
+    joinRoom();
     
     if (window.setupCardDeck) {
         window.setupCardDeck();
     }
 });
 
-// --- ÉVÉNEMENT STATUS (MISE À JOUR GÉNÉRALE) ---
-socket.on('status', function(data) {
-    console.log(data.msg);
-    currentState = data.current_state;
+// --- SYNCHRONISATION DE L'ÉTAT (SNAPSHOTS ET PATCHS) ---
+// Vrai tant qu'un snapshot complet est attendu (à la jointure ou après une révision manquée)
+let snapshotPending = true;
+
+// Une demande de snapshot peut être ignorée par la limitation de débit du serveur :
+// tant qu'il n'est pas arrivé, elle est renvoyée toutes les SNAPSHOT_RETRY_MS
+const SNAPSHOT_RETRY_MS = 3000;
+let snapshotRetryTimer = null;
+
+const requestSnapshot = () => {
+    clearTimeout(snapshotRetryTimer);
+    snapshotRetryTimer = null;
+    if (!snapshotPending) {
+        return;
+    }
+    socket.emit('request_state', { room_id: ROOM_ID, revision: currentState.revision });
+    snapshotRetryTimer = setTimeout(requestSnapshot, SNAPSHOT_RETRY_MS);
+};
+
+// La jointure aussi peut être ignorée (limite 'join' du serveur) : elle est renvoyée
+// au même rythme jusqu'au snapshot qui la confirme, tant que la connexion est ouverte
+const joinRoom = () => {
+    clearTimeout(snapshotRetryTimer);
+    snapshotRetryTimer = null;
+    if (!snapshotPending || !socket.connected) {
+        return;
+    }
+    socket.emit('join', {
+        room_id: ROOM_ID,
+        username: USERNAME
+    });
+    snapshotRetryTimer = setTimeout(joinRoom, SNAPSHOT_RETRY_MS);
+};
+
+// Journal d'activité : tampon circulaire de MESSAGE_LOG_LIMIT lignes.
+// Une fois plein, la ligne la plus ancienne est réutilisée pour le nouveau message.
+const MESSAGE_LOG_LIMIT = 200;
+
+// Ajoute un message au journal d'activité
+const logMessage = (msg) => {
+    console.log(msg);
+    const messagesDiv = document.getElementById('messages');
+    let line = messagesDiv.childElementCount >= MESSAGE_LOG_LIMIT ? messagesDiv.firstElementChild : null;
+    if (!line) {
+        line = document.createElement('p');
+        line.appendChild(document.createElement('em'));
+    }
+    line.firstElementChild.textContent = msg;  // Texte brut : les pseudos ne sont pas interprétés
+    messagesDiv.appendChild(line);  // Déplacée en fin de journal si elle existait déjà
+    messagesDiv.scrollTop = messagesDiv.scrollHeight; 
+};
+
+// Redessine toute la salle à partir de currentState
+const renderRoom = () => {
     isAdmin = (USERNAME === currentState.admin_name);
 
     if (window.updateAdminControls) {
@@ -42,17 +91,12 @@ socket.on('status', function(data) {
     
     // Affiche des participants et de l'état de vote
     if (window.updateParticipantsAndVotes) {
-        window.updateParticipantsAndVotes(data.participants, currentState.votes); 
+        window.updateParticipantsAndVotes(currentState.participants, currentState.votes); 
     }
-    
-    // Affiche les messages de statut
-    const messagesDiv = document.getElementById('messages');
-    messagesDiv.innerHTML += `<p><em>${data.msg}</em></p>`;
-    messagesDiv.scrollTop = messagesDiv.scrollHeight; 
 
     // Affichage du backlog et de la tâche courante
     if (window.updateBacklogList && window.updateCurrentStory) {
-        window.updateBacklogList(currentState.backlog, currentState.current_story_index);
+        window.updateBacklogList(currentState.backlog_count, currentState.current_story_index);
         window.updateCurrentStory(currentState);
     }
     
@@ -60,6 +104,92 @@ socket.on('status', function(data) {
     if (currentState.is_started) {
         document.getElementById('start-controls').style.display = 'none';
     }
+};
+
+// Effets d'interface propres à certains patchs (timer, résultat, nouvelle manche)
+const patchEffects = {
+    session_started: () => {
+        document.getElementById('start-controls').style.display = 'none';
+        if (window.resetInterfaceForNewRound) {
+            window.resetInterfaceForNewRound();
+        }
+        if (currentState.use_timer && window.startTimer) {
+            window.startTimer(currentState.timer_duration);
+        }
+    },
+    votes_revealed: (data) => {
+        clearInterval(countdownInterval);
+        if (window.displayConsensusResult) {
+            window.displayConsensusResult(data.result, data.details); 
+        }
+        if (window.updateAdminControls) {
+            window.updateAdminControls();
+        }
+    },
+    story_advanced: () => {
+        if (window.resetInterfaceForNewRound && window.updateCurrentStory && window.updateBacklogList) {
+            window.resetInterfaceForNewRound();
+            window.updateCurrentStory(currentState);
+            window.updateBacklogList(currentState.backlog_count, currentState.current_story_index);
+            window.scrollBacklogTo(currentState.current_story_index);
+        }
+        if (currentState.use_timer && window.startTimer) {
+            window.startTimer(currentState.timer_duration);
+        }
+    },
+    vote_restarted: () => {
+        if (window.resetInterfaceForNewRound) {
+            window.resetInterfaceForNewRound();
+        }
+        if (currentState.use_timer && window.startTimer) {
+            window.startTimer(currentState.timer_duration);
+        }
+    }
+};
+
+// Les erreurs d'import du backlog ne sont affichées qu'une fois, à l'admin
+let importErrorsShown = false;
+
+// Snapshot complet : envoyé à la jointure ou sur demande
+socket.on('state_snapshot', function(snapshot) {
+    snapshotPending = false;
+    clearTimeout(snapshotRetryTimer);
+    snapshotRetryTimer = null;
+    window.applySnapshot(snapshot);
+    renderRoom();
+
+    if (isAdmin && !importErrorsShown && currentState.import_errors && currentState.import_errors.length) {
+        importErrorsShown = true;
+        logMessage(`${currentState.import_errors.length} élément(s) du backlog ignoré(s) à l'import :`);
+        currentState.import_errors.forEach(error => logMessage(error));
+    }
+
+    // Arrivée en cours de manche : le décompte reprend sur l'échéance fixée par le serveur
+    if (currentState.timer_end_time && !currentState.is_revealed && window.startTimer) {
+        window.startTimer(Math.max(0, Math.round(currentState.timer_end_time - Date.now() / 1000)));
+    }
+});
+
+// Patch incrémental : appliqué sur currentState au lieu de le remplacer
+socket.on('state_patch', function(patch) {
+    if (snapshotPending) {
+        return; // Le snapshot attendu contiendra déjà cette modification
+    }
+    if (!window.applyStatePatch(patch)) {
+        // Révision manquée : on redemande l'état complet
+        snapshotPending = true;
+        requestSnapshot();
+        return;
+    }
+    if (patch.msg) {
+        logMessage(patch.msg);
+    }
+    if (patchEffects[patch.type]) {
+        patchEffects[patch.type](patch.data);
+    }
+    if (window.updateParticipantsAndVotes) {
+        window.updateParticipantsAndVotes(currentState.participants, currentState.votes);
+    }
 });
 
 // --- ÉVÉNEMENTS DE CONTRÔLE DE SESSION (ADMIN) ---
@@ -75,18 +205,6 @@ document.getElementById('start-session-btn').addEventListener('click', () => {
     });
 });
 
-// Événement du serveur : La session est démarrée
-socket.on('session_started', (data) => {
-    document.getElementById('start-controls').style.display = 'none';
-    if (window.resetInterfaceForNewRound) {
-        window.resetInterfaceForNewRound();
-    }
-
-    if (data.use_timer && window.startTimer) {
-        window.startTimer(data.duration);
-    }
-});
-
 // Evenement sur le bouton reveler les Votes
 document.getElementById('reveal-votes-btn').addEventListener('click', () => {
     socket.emit('reveal_votes', { room_id: ROOM_ID });
@@ -103,74 +221,10 @@ document.getElementById('restart-vote-btn').addEventListener('click', () => {
 });
 
 // Evenement sur le bouton Télécharger le Backlog (Admin seulement)
+// Le serveur envoie l'export en flux : le navigateur l'enregistre sans le garder en mémoire
 document.getElementById('download-backlog-btn').addEventListener('click', () => {
-    socket.emit('request_backlog_download', { room_id: ROOM_ID });
-});
-
-// --- GESTION DES VOTES ---
-
-socket.on('vote_submitted', (data) => {
-    if (window.updateParticipantsAndVotes) {
-         window.updateParticipantsAndVotes(data.participants, data.current_state.votes);
-    }
-});
-
-// Événement du serveur : Votes révélés
-socket.on('votes_revealed', (data) => {
-    currentState.is_revealed = true;
-    const participants = Object.values(currentState.participants); 
-    if (window.updateParticipantsAndVotes) {
-        window.updateParticipantsAndVotes(participants, data.votes);
-    }
-    if (window.displayConsensusResult) { // Ajout de la vérification par sécurité
-        window.displayConsensusResult(data.result, data.details); 
-    }
-    if (window.updateAdminControls) {
-        window.updateAdminControls();
-    }
-});
-
-// Événement du serveur : Nouvelle manche
-socket.on('new_round', (data) => {
-    currentState.current_story_index = data.index;
-    currentState.votes = {};
-    currentState.is_revealed = false;
-    if (window.resetInterfaceForNewRound && window.updateCurrentStory && window.updateBacklogList) {
-        window.resetInterfaceForNewRound();
-        window.updateCurrentStory(currentState);
-        window.updateBacklogList(currentState.backlog, currentState.current_story_index);
-    }
-    if (data.use_timer && window.startTimer) {
-        window.startTimer(data.duration);
-    }
-});
-
-// Événement du serveur : Vote relancé
-socket.on('vote_restarted', (data) => {
-    if (window.resetInterfaceForNewRound) {
-        window.resetInterfaceForNewRound();
-    }
-    const participants = Object.values(currentState.participants); 
-    if (window.updateParticipantsAndVotes) {
-        window.updateParticipantsAndVotes(participants, {}); 
-    }
-    if (data.use_timer && window.startTimer) {
-        window.startTimer(data.duration);
-    }
-});
-
-// Mise à jour du fichier Json du backlog 
-socket.on('backlog_updated', (data) => {
-    const jsonString = JSON.stringify(data.backlog_data, null, 2);
-    const blob = new Blob([jsonString], { type: 'application/json' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    
-    a.href = url;
-    a.download = `backlog_${ROOM_ID}_estimations.json`;
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
+    const format = document.getElementById('export-format').value;
+    window.location.href = `/room/${encodeURIComponent(ROOM_ID)}/export?format=${format}`;
 });
 
 // Événement d'erreur
@@ -0,0 +1,214 @@
+/*
+@file msgpack-parser.js
+@brief Parser Socket.IO MessagePack (SOCKETIO_SERIALIZER=msgpack)
+@description
+Parser du client Socket.IO compatible avec socket.io-msgpack-parser et
+avec les paquets MsgPackPacket de python-socketio : chaque paquet
+{type, nsp, data, id} est encodé tel quel en MessagePack dans une seule
+trame binaire. Le client Socket.IO est servi localement (static/vendor/),
+ce parser l'est aussi pour fonctionner sans CDN.
+
+Utilisation : io({ parser: msgpackParser })
+Types gérés : nil, booléens, entiers, flottants, chaînes, binaires, tableaux, maps.
+*/
+
+(function (global) {
+    const utf8Encoder = new TextEncoder();
+    const utf8Decoder = new TextDecoder();
+
+    // --- ENCODAGE ---
+
+    class Writer {
+        constructor() {
+            this.bytes = new Uint8Array(256);
+            this.view = new DataView(this.bytes.buffer);
+            this.length = 0;
+        }
+
+        reserve(size) {
+            if (this.length + size <= this.bytes.length) return;
+            let capacity = this.bytes.length * 2;
+            while (capacity < this.length + size) capacity *= 2;
+            const bytes = new Uint8Array(capacity);
+            bytes.set(this.bytes.subarray(0, this.length));
+            this.bytes = bytes;
+            this.view = new DataView(bytes.buffer);
+        }
+
+        u8(value) { this.reserve(1); this.view.setUint8(this.length, value); this.length += 1; }
+        u16(value) { this.reserve(2); this.view.setUint16(this.length, value); this.length += 2; }
+        u32(value) { this.reserve(4); this.view.setUint32(this.length, value); this.length += 4; }
+        raw(bytes) { this.reserve(bytes.length); this.bytes.set(bytes, this.length); this.length += bytes.length; }
+
+        // En-tête à trois tailles (fix / 16 bits / 32 bits) des chaînes, tableaux et maps
+        header(size, fixBase, fixMax, code16, code32) {
+            if (size <= fixMax) this.u8(fixBase + size);
+            else if (size <= 0xffff) { this.u8(code16); this.u16(size); }
+            else { this.u8(code32); this.u32(size); }
+        }
+
+        number(value) {
+            if (Number.isInteger(value) && value >= 0 && value <= 0xffffffff) {
+                if (value < 0x80) this.u8(value);
+                else if (value <= 0xff) { this.u8(0xcc); this.u8(value); }
+                else if (value <= 0xffff) { this.u8(0xcd); this.u16(value); }
+                else { this.u8(0xce); this.u32(value); }
+            } else if (Number.isInteger(value) && value < 0 && value >= -0x80000000) {
+                if (value >= -32) this.u8(value & 0xff);
+                else if (value >= -0x80) { this.u8(0xd0); this.reserve(1); this.view.setInt8(this.length, value); this.length += 1; }
+                else if (value >= -0x8000) { this.u8(0xd1); this.reserve(2); this.view.setInt16(this.length, value); this.length += 2; }
+                else { this.u8(0xd2); this.reserve(4); this.view.setInt32(this.length, value); this.length += 4; }
+            } else {
+                this.u8(0xcb);
+                this.reserve(8);
+                this.view.setFloat64(this.length, value);
+                this.length += 8;
+            }
+        }
+
+        value(value) {
+            if (value === null || value === undefined) return this.u8(0xc0);
+            if (value === false) return this.u8(0xc2);
+            if (value === true) return this.u8(0xc3);
+            if (typeof value === 'number') return this.number(value);
+            if (typeof value === 'string') {
+                const bytes = utf8Encoder.encode(value);
+                if (bytes.length <= 31) this.u8(0xa0 + bytes.length);
+                else if (bytes.length <= 0xff) { this.u8(0xd9); this.u8(bytes.length); }
+                else if (bytes.length <= 0xffff) { this.u8(0xda); this.u16(bytes.length); }
+                else { this.u8(0xdb); this.u32(bytes.length); }
+                return this.raw(bytes);
+            }
+            if (value instanceof ArrayBuffer || ArrayBuffer.isView(value)) {
+                const bytes = value instanceof ArrayBuffer
+                    ? new Uint8Array(value) : new Uint8Array(value.buffer, value.byteOffset, value.byteLength);
+                if (bytes.length <= 0xff) { this.u8(0xc4); this.u8(bytes.length); }
+                else if (bytes.length <= 0xffff) { this.u8(0xc5); this.u16(bytes.length); }
+                else { this.u8(0xc6); this.u32(bytes.length); }
+                return this.raw(bytes);
+            }
+            if (Array.isArray(value)) {
+                this.header(value.length, 0x90, 15, 0xdc, 0xdd);
+                value.forEach(item => this.value(item));
+                return;
+            }
+            if (typeof value.toJSON === 'function') return this.value(value.toJSON());
+            // Comme JSON.stringify : les propriétés undefined ou fonctions sont ignorées
+            const keys = Object.keys(value).filter(key =>
+                value[key] !== undefined && typeof value[key] !== 'function');
+            this.header(keys.length, 0x80, 15, 0xde, 0xdf);
+            keys.forEach(key => { this.value(key); this.value(value[key]); });
+        }
+    }
+
+    const encode = (value) => {
+        const writer = new Writer();
+        writer.value(value);
+        return writer.bytes.slice(0, writer.length);
+    };
+
+    // --- DÉCODAGE ---
+
+    const decode = (buffer) => {
+        const bytes = buffer instanceof ArrayBuffer
+            ? new Uint8Array(buffer) : new Uint8Array(buffer.buffer, buffer.byteOffset, buffer.byteLength);
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        let offset = 0;
+
+        const take = (size) => {
+            if (offset + size > bytes.length) throw new Error('msgpack : paquet tronqué');
+            const start = offset;
+            offset += size;
+            return start;
+        };
+        const str = (size) => { const start = take(size); return utf8Decoder.decode(bytes.subarray(start, start + size)); };
+        const bin = (size) => { const start = take(size); return bytes.slice(start, start + size).buffer; };
+        const array = (size) => { const items = new Array(size); for (let i = 0; i < size; i++) items[i] = read(); return items; };
+        const map = (size) => { const object = {}; for (let i = 0; i < size; i++) { const key = read(); object[key] = read(); } return object; };
+
+        const read = () => {
+            const code = view.getUint8(take(1));
+            if (code < 0x80) return code;
+            if (code < 0x90) return map(code - 0x80);
+            if (code < 0xa0) return array(code - 0x90);
+            if (code < 0xc0) return str(code - 0xa0);
+            if (code >= 0xe0) return code - 0x100;
+            switch (code) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xc4: return bin(view.getUint8(take(1)));
+                case 0xc5: return bin(view.getUint16(take(2)));
+                case 0xc6: return bin(view.getUint32(take(4)));
+                case 0xca: return view.getFloat32(take(4));
+                case 0xcb: return view.getFloat64(take(8));
+                case 0xcc: return view.getUint8(take(1));
+                case 0xcd: return view.getUint16(take(2));
+                case 0xce: return view.getUint32(take(4));
+                case 0xcf: return Number(view.getBigUint64(take(8)));
+                case 0xd0: return view.getInt8(take(1));
+                case 0xd1: return view.getInt16(take(2));
+                case 0xd2: return view.getInt32(take(4));
+                case 0xd3: return Number(view.getBigInt64(take(8)));
+                case 0xd9: return str(view.getUint8(take(1)));
+                case 0xda: return str(view.getUint16(take(2)));
+                case 0xdb: return str(view.getUint32(take(4)));
+                case 0xdc: return array(view.getUint16(take(2)));
+                case 0xdd: return array(view.getUint32(take(4)));
+                case 0xde: return map(view.getUint16(take(2)));
+                case 0xdf: return map(view.getUint32(take(4)));
+                default: throw new Error(`msgpack : type non géré (0x${code.toString(16)})`);
+            }
+        };
+
+        const value = read();
+        if (offset !== bytes.length) throw new Error('msgpack : octets en trop');
+        return value;
+    };
+
+    // --- INTERFACE PARSER SOCKET.IO ---
+
+    const PACKET_TYPES = 7; // CONNECT ... BINARY_ACK
+
+    const isValidPacket = (packet) => packet !== null && typeof packet === 'object'
+        && Number.isInteger(packet.type) && packet.type >= 0 && packet.type < PACKET_TYPES
+        && typeof packet.nsp === 'string'
+        && (packet.id === undefined || packet.id === null || Number.isInteger(packet.id));
+
+    class Encoder {
+        encode(packet) {
+            return [encode(packet)];
+        }
+    }
+
+    class Decoder {
+        constructor() {
+            this.listeners = {};
+        }
+
+        on(event, callback) {
+            (this.listeners[event] = this.listeners[event] || []).push(callback);
+            return this;
+        }
+
+        off(event, callback) {
+            if (!this.listeners[event]) return this;
+            this.listeners[event] = callback ? this.listeners[event].filter(cb => cb !== callback) : [];
+            return this;
+        }
+
+        add(chunk) {
+            if (typeof chunk === 'string') throw new Error('msgpack : trame texte reçue (serveur en JSON ?)');
+            const packet = decode(chunk);
+            if (!isValidPacket(packet)) throw new Error('msgpack : paquet Socket.IO invalide');
+            if (packet.id === null) delete packet.id;
+            (this.listeners.decoded || []).slice().forEach(callback => callback(packet));
+        }
+
+        destroy() {
+            this.listeners = {};
+        }
+    }
+
+    global.msgpackParser = { Encoder, Decoder, encode, decode };
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -71,3 +71,9 @@ def test_join_and_submit_vote():
         client.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': '5'})
         assert rooms[room_id]['votes']['bob'] == '5'
 
+
+def test_unknown_room_error_escapes_room_id():
+    response = app.test_client().post('/join_room', data={'room_id': '<img src=x onerror=alert(1)>',
+                                                         'username': 'bob'})
+    assert response.status_code == 404
+    assert b'<IMG' not in response.data and b'&lt;IMG' in response.data
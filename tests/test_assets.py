@@ -0,0 +1,85 @@
+# tests/test_assets.py
+import gzip
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+from flask import Flask, render_template_string
+
+from poker import assets
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+# -----------------------------
+# Tests de la chaîne des ressources statiques
+# -----------------------------
+
+def make_app(static_dir, monkeypatch):
+    monkeypatch.delenv('ASSETS_DEBUG', raising=False)
+    app = Flask(__name__, static_folder=static_dir)
+    assets.init_app(app)
+    return app
+
+@pytest.fixture
+def built(tmp_path):
+    static_dir = str(tmp_path / 'static')
+    shutil.copytree(STATIC_DIR, static_dir, ignore=shutil.ignore_patterns(assets.DIST_DIR))
+    return static_dir, assets.build(static_dir)
+
+def test_build_hashes_bundles_and_sprite(built):
+    static_dir, manifest = built
+    assert set(manifest) == set(assets.BUNDLES) | {assets.SPRITE_NAME}
+    room_js = os.path.join(static_dir, assets.DIST_DIR, manifest['js/room.js'])
+    with open(room_js, 'rb') as f:
+        content = f.read()
+    assert manifest['js/room.js'] == assets.hashed_name('js/room.js', content)
+    assert b'sourceMappingURL' not in content
+    assert content.index(b'Socket.IO v4') < content.index(b'msgpackParser') < content.index(b'const socket = io(')
+    with open(room_js + '.gz', 'rb') as f:
+        assert gzip.decompress(f.read()) == content
+    # Construction reproductible : mêmes sources, mêmes noms
+    assert assets.build(static_dir) == manifest
+
+def test_sprite_has_one_view_per_card(built):
+    static_dir, manifest = built
+    sprite = ET.parse(os.path.join(static_dir, assets.DIST_DIR, manifest[assets.SPRITE_NAME])).getroot()
+    views = [child.get('id') for child in sprite if child.tag.endswith('view')]
+    assert views == assets.CARD_FILES
+    ids = [node.get('id') for node in sprite.iter() if node.get('id')]
+    assert len(ids) == len(set(ids))
+
+def test_assets_served_precompressed_and_immutable(built, monkeypatch):
+    static_dir, manifest = built
+    client = make_app(static_dir, monkeypatch).test_client()
+    url = '/assets/' + manifest['css/room.css']
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == assets.bundle(static_dir, ['css/room.css'])
+
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert client.get('/assets/css/room.css').status_code == 404  # Hors manifest
+
+def test_brotli_variant_preferred(built, monkeypatch):
+    pytest.importorskip('brotli')
+    static_dir, manifest = built
+    client = make_app(static_dir, monkeypatch).test_client()
+    response = client.get('/assets/' + manifest['js/room.js'], headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.mimetype == 'text/javascript'
+
+def test_asset_urls_fall_back_to_sources(tmp_path, monkeypatch):
+    static_dir = tmp_path / 'static'
+    static_dir.mkdir()
+    app = make_app(str(static_dir), monkeypatch)
+    with app.test_request_context():
+        urls = render_template_string("{{ asset_urls('js/room.js') | join(' ') }}|{{ asset_url('cartes/sprite.svg') }}")
+    scripts, sprite = urls.split('|')
+    assert scripts.split() == ['/static/' + source for source in assets.BUNDLES['js/room.js']]
+    assert sprite == 'None'
@@ -0,0 +1,101 @@
+# tests/test_backlog_import.py
+import io
+import json
+import pytest
+from app import app, rooms
+from poker.backlog_import import (import_backlog, iter_json_array,
+                                  BacklogImportError, BacklogTooLargeError)
+
+# -----------------------------
+# Tests de l'import du backlog en flux
+# -----------------------------
+
+def test_json_array_split_across_chunks():
+    document = json.dumps([{'name': 'A' * 50}, 12.5, {'nom': 'B'}, "x]y"])
+    for size in (1, 2, 5, 64):
+        chunks = [document[i:i + size] for i in range(0, len(document), size)]
+        assert [item for _, item in iter_json_array(chunks)] == [{'name': 'A' * 50}, 12.5, {'nom': 'B'}, "x]y"]
+
+def test_json_bad_items_are_reported_by_index():
+    data = json.dumps([{'name': 'A'}, 5, {}, {'nom': 'B', 'description': 'desc'}]).encode()
+    stories, errors = import_backlog(io.BytesIO(data), 'backlog.json')
+    assert [story['name'] for story in stories] == ['A', 'B']
+    assert errors[0].startswith('élément 1')
+    assert errors[1].startswith('élément 2')
+
+def test_json_syntax_error_keeps_previous_items():
+    stories, errors = import_backlog(io.BytesIO(b'[{"name": "A"}, {"name": "B"'), 'backlog.json')
+    assert [story['name'] for story in stories] == ['A']
+    assert errors == ["élément 1 : JSON invalide (Expecting ',' delimiter)"]
+
+def test_json_syntax_error_stops_reading():
+    read = []
+    def chunks():
+        yield '[{"name": "A"}, {"name": oops}'
+        for i in range(1000):
+            read.append(i)
+            yield ', {"name": "%d"}' % i
+    items = iter_json_array(chunks())
+    assert next(items) == (0, {'name': 'A'})
+    with pytest.raises(ValueError) as excinfo:
+        next(items)
+    assert excinfo.value.args == (1, 'JSON invalide (Expecting value)')
+    assert len(read) <= 1  # au plus le morceau suivant
+
+def test_json_must_be_an_array():
+    with pytest.raises(BacklogImportError):
+        import_backlog(io.BytesIO(b'{"name": "A"}'), 'backlog.json')
+
+def test_ndjson_and_csv():
+    ndjson = '{"nom": "A"}\nnot json\n\n{"name": "B"}\n'.encode()
+    stories, errors = import_backlog(io.BytesIO(ndjson), 'backlog.ndjson')
+    assert [story['name'] for story in stories] == ['A', 'B']
+    assert errors == ['ligne 2 : JSON invalide (Expecting value)']
+
+    # Seul '\n' sépare les lignes : U+2028, U+0085, \x0b ou \x0c restent dans la tâche
+    ndjson = '{"nom": "A\u2028B"}\r\n{"nom": "C\x85D"}\r\n'.encode()
+    stories, errors = import_backlog(io.BytesIO(ndjson), 'backlog.ndjson')
+    assert [story['name'] for story in stories] == ['A\u2028B', 'C\x85D']
+    assert errors == []
+    csv_data = 'nom\r\nA\x0bB\x0cC\r\n'.encode()
+    assert import_backlog(io.BytesIO(csv_data), 'backlog.csv').stories[0]['name'] == 'A\x0bB\x0cC'
+
+    csv_data = 'nom,description\nA,"sur\ndeux lignes"\n,\nB,desc\n'.encode('utf-8-sig')
+    stories, errors = import_backlog(io.BytesIO(csv_data), 'backlog.csv')
+    assert stories[0] == {'name': 'A', 'description': 'sur\ndeux lignes'}
+    assert [story['name'] for story in stories] == ['A', 'B']
+    assert errors[0].startswith('ligne 4')
+
+def test_limits():
+    data = json.dumps([{'name': str(i)} for i in range(10)]).encode()
+    with pytest.raises(BacklogTooLargeError):
+        import_backlog(io.BytesIO(data), 'backlog.json', max_items=5)
+    with pytest.raises(BacklogTooLargeError):
+        import_backlog(io.BytesIO(data), 'backlog.json', max_bytes=20)
+    with pytest.raises(BacklogImportError):
+        import_backlog(io.BytesIO(data), 'backlog.xml')
+
+def test_create_room_with_partial_backlog():
+    client = app.test_client()
+    data = {
+        'username': 'admin',
+        'session_name': 'Sprint',
+        'session_type': 'median',
+        'backlog_file': (io.BytesIO(b'{"name": "A"}\n[1]\n'), 'backlog.ndjson'),
+    }
+    response = client.post('/create_room', data=data, content_type='multipart/form-data')
+    assert response.status_code == 302
+    room_id = response.headers['Location'].rsplit('/', 1)[-1]
+    assert [story['name'] for story in rooms[room_id]['backlog']] == ['A']
+    assert rooms[room_id]['import_errors'] == ['ligne 2 : objet attendu, reçu list']
+
+def test_create_room_rejects_invalid_json():
+    client = app.test_client()
+    data = {
+        'username': 'admin',
+        'session_name': 'Sprint',
+        'session_type': 'median',
+        'backlog_file': (io.BytesIO(b'pas du json'), 'backlog.json'),
+    }
+    response = client.post('/create_room', data=data, content_type='multipart/form-data')
+    assert response.status_code == 400
@@ -0,0 +1,40 @@
+# tests/test_backlog_page.py
+from app import rooms, app
+
+# -----------------------------
+# Tests de la pagination du backlog
+# -----------------------------
+
+def make_room(room_id, size):
+    rooms[room_id] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None,
+        'backlog': [{'name': f'Tâche {i}', 'description': 'desc', 'votes': {}} for i in range(size)],
+        'current_story_index': 0, 'votes': {}, 'is_started': False, 'is_revealed': False
+    }
+
+def test_backlog_page_requires_session_and_room():
+    make_room('PAGE1', 3)
+    client = app.test_client()
+    assert client.get('/room/PAGE1/backlog').status_code == 403
+    with client.session_transaction() as sess:
+        sess['username'] = 'bob'
+    assert client.get('/room/INCONNUE/backlog').status_code == 404
+
+def test_backlog_page_windows():
+    make_room('PAGE2', 120)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['username'] = 'bob'
+
+    data = client.get('/room/PAGE2/backlog').get_json()
+    assert data['count'] == 120
+    assert len(data['items']) == app.config['BACKLOG_PAGE_SIZE']
+
+    data = client.get('/room/PAGE2/backlog?offset=110&limit=50').get_json()
+    assert [item['index'] for item in data['items']] == list(range(110, 120))
+    assert data['items'][0]['name'] == 'Tâche 110'
+
+    # Bornes : offset négatif ramené à 0, limite plafonnée
+    data = client.get('/room/PAGE2/backlog?offset=-5&limit=100000').get_json()
+    assert data['offset'] == 0
+    assert len(data['items']) == min(120, app.config['BACKLOG_PAGE_MAX'])
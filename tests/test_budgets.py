@@ -0,0 +1,19 @@
+# tests/test_budgets.py
+from benchmarks import regression
+
+# -----------------------------
+# Budgets de taille des messages (benchmarks/regression.py)
+# -----------------------------
+
+def test_payload_sizes_within_budgets_and_baseline():
+    # Tailles déterministes : vérifiées à chaque exécution des tests, les latences par le script
+    measures = regression.measure_payloads()
+    assert {name for name in regression.BUDGETS if name.startswith('bytes.')} <= set(measures)
+    assert regression.check(measures, regression.load_baseline()) == []
+
+def test_check_reports_budget_and_baseline_regressions():
+    failures = regression.check({'bytes.error': 350, 'handler.next_task': 10.0, 'create_room.1000': 1.0},
+                                {'bytes.error': 35, 'handler.next_task': 4.0, 'create_room.1000': 2.0})
+    assert len(failures) == 3
+    assert failures[0].startswith('bytes.error') and 'budget' in failures[0] and 'référence' in failures[1]
+    assert failures[2].startswith('handler.next_task')
@@ -0,0 +1,48 @@
+# tests/test_coalesce.py
+from poker.coalesce import VoteCoalescer
+from app import rooms, app, socketio, vote_buffer
+
+# -----------------------------
+# Tests du regroupement des votes
+# -----------------------------
+
+def test_votes_are_merged_per_window():
+    flushed = []
+    coalescer = VoteCoalescer(on_flush=lambda *args: flushed.append(args), window=0.05)
+    progress = {'voted': 2, 'total': 3, 'voted_all': False}
+    coalescer.add_vote('R1', 'alice', '3', progress)
+    coalescer.add_vote('R1', 'bob', '5', progress)
+    coalescer.add_vote('R1', 'alice', '8', progress)   # Changement de carte : seul le dernier compte
+    coalescer.add_vote('R1', 'bob', None, dict(progress, voted=1))  # Retrait
+    assert flushed == []
+
+    assert coalescer.flush('R1') is True
+    assert coalescer.flush('R1') is False
+    assert flushed == [('R1', {'alice': '8', 'bob': None}, {'voted': 1, 'total': 3, 'voted_all': False})]
+    assert coalescer.stats() == {'window_ms': 50, 'events': 4, 'patches': 1,
+                                 'patches_saved': 3, 'messages_saved': 9}
+
+def test_reveal_flushes_pending_votes_first(monkeypatch):
+    monkeypatch.setattr(vote_buffer, 'window', 60)  # Fenêtre longue : seule la révélation vide le tampon
+    room_id = 'BURST1'
+    rooms[room_id] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None,
+        'backlog': [{'name': 'Tâche', 'description': '', 'votes': {}}],
+        'current_story_index': 0, 'session_type': 'average',
+        'votes': {}, 'is_started': True, 'is_revealed': False
+    }
+    admin = socketio.test_client(app)
+    admin.emit('join', {'username': 'admin', 'room_id': room_id})
+    admin.get_received()
+
+    for vote in ['1', '2', '3', '5']:
+        admin.emit('submit_vote', {'username': 'admin', 'room_id': room_id, 'vote': vote})
+    assert admin.get_received() == []
+    assert rooms[room_id]['votes'] == {'admin': '5'}  # Le stockage est à jour sans attendre
+
+    admin.emit('reveal_votes', {'room_id': room_id})
+    patches = [msg['args'][0] for msg in admin.get_received() if msg['name'] == 'state_patch']
+    assert [patch['type'] for patch in patches] == ['votes_cast', 'votes_revealed']
+    assert patches[0]['data']['votes'] == {'admin': '5'}
+    assert patches[1]['rev'] == patches[0]['rev'] + 1
+    admin.disconnect()
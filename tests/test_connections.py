@@ -0,0 +1,80 @@
+# tests/test_connections.py
+from poker.connections import ConnectionRegistry
+from app import rooms, app, socketio, connections
+
+# -----------------------------
+# Tests du registre des connexions
+# -----------------------------
+
+def test_register_and_unregister():
+    registry = ConnectionRegistry()
+    registry.register('sid1', 'ROOM', 'alice')
+    registry.register('sid2', 'ROOM', 'bob')
+    assert registry.lookup('sid1') == ('ROOM', 'alice')
+    assert registry.sids_in_room('ROOM') == {'sid1', 'sid2'}
+
+    assert registry.unregister('sid1').username == 'alice'
+    assert registry.unregister('sid1') is None
+    assert 'sid1' not in registry
+    assert len(registry) == 1
+
+def test_register_moves_sid_between_rooms():
+    registry = ConnectionRegistry()
+    registry.register('sid1', 'A', 'alice')
+    previous = registry.register('sid1', 'B', 'alice')
+    assert previous.room_id == 'A'
+    assert registry.sids_in_room('A') == frozenset()
+    assert registry.sids_in_room('B') == {'sid1'}
+
+def test_discard_room():
+    registry = ConnectionRegistry()
+    registry.register('sid1', 'A', 'alice')
+    registry.register('sid2', 'A', 'bob')
+    registry.register('sid3', 'B', 'carol')
+    assert sorted(registry.discard_room('A')) == ['sid1', 'sid2']
+    assert registry.lookup('sid1') is None
+    assert len(registry) == 1
+
+def test_disconnect_uses_registry():
+    room_id = 'CONN1'
+    rooms[room_id] = {
+        'participants': {},
+        'admin_name': 'admin',
+        'admin_sid': None,
+        'backlog': [],
+        'votes': {},
+        'is_started': True,
+        'is_revealed': False
+    }
+
+    client = socketio.test_client(app)
+    client.emit('join', {'username': 'bob', 'room_id': room_id})
+    sid = next(iter(rooms[room_id]['participants']))
+    assert connections.lookup(sid) == (room_id, 'bob')
+
+    client.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': '3'})
+    client.disconnect()
+    assert rooms[room_id]['participants'] == {}
+    assert rooms[room_id]['votes'] == {}
+    assert sid not in connections
+
+def test_join_another_room_leaves_the_previous_one():
+    for room_id in ('CONN2', 'CONN3'):
+        rooms[room_id] = {'participants': {}, 'admin_name': 'admin', 'admin_sid': None, 'backlog': [],
+                          'votes': {}, 'is_started': True, 'is_revealed': False}
+    mover, observer = socketio.test_client(app), socketio.test_client(app)
+    observer.emit('join', {'username': 'alice', 'room_id': 'CONN2'})
+    mover.emit('join', {'username': 'bob', 'room_id': 'CONN2'})
+    observer.get_received()
+
+    mover.emit('join', {'username': 'bob', 'room_id': 'CONN3'})
+    patches = [m['args'][0] for m in observer.get_received() if m['name'] == 'state_patch']
+    assert [patch['type'] for patch in patches] == ['participant_left']
+    assert list(rooms['CONN2']['participants'].values()) == ['alice']
+
+    # Le sid ne reçoit plus les diffusions de l'ancienne salle
+    mover.get_received()
+    observer.emit('join', {'username': 'carol', 'room_id': 'CONN2'})
+    assert mover.get_received() == []
+    mover.disconnect()
+    observer.disconnect()
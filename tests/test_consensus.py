@@ -0,0 +1,66 @@
+# tests/test_consensus.py
+import json
+import os
+import re
+import pytest
+from poker import consensus
+from poker.consensus import Deck, calculate, register_rule, RULES
+
+# -----------------------------
+# Tests du moteur de consensus
+# -----------------------------
+
+def test_deck_lookup_table():
+    deck = Deck(["1", "2", "3", "5", "8", "?"])
+    assert deck.value("5") == 5.0
+    assert deck.value("?") is None
+    assert deck.value("7") == 7.0   # Hors paquet : parsé sans être gardé
+    assert deck.value("nan") is None
+    assert deck.nearest(4.4) == 5.0
+    assert deck.steps_between(1, 8) == 4
+
+def test_default_deck_matches_client_cards():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, 'static', 'js', 'logic.js'), encoding='utf-8') as f:
+        card_values = re.search(r'const cardValues = (\[.*?\]);', f.read()).group(1)
+    assert json.loads(card_values) == consensus.DEFAULT_CARDS
+
+def test_new_rules():
+    votes = {'a': '1', 'b': '3', 'c': '3', 'd': '5', 'e': '100'}
+    assert calculate(votes, 'mode')[0] == '3.0'
+    assert calculate(votes, 'trimmed_mean')[0] == '3.7'    # 1 et 100 écartés
+    assert calculate({'a': '3', 'b': '5'}, 'fibonacci')[0] == '5.0'  # 4 -> 5 (égalité : carte haute)
+    assert calculate({'a': '2', 'b': '5', 'c': '8'}, 'fibonacci')[0] == '5.0'
+
+def test_outliers_rule_triggers_discussion():
+    result, details = calculate({'alice': '1', 'bob': '3', 'carol': '13'}, 'outliers')
+    assert result == 'DISCUSSION'
+    assert 'alice' in details and 'carol' in details
+    # Écart faible : la médiane s'applique
+    assert calculate({'alice': '3', 'bob': '5'}, 'outliers')[0] == '4.0'
+
+def test_unknown_rule_and_registry():
+    assert calculate({'a': '3'}, 'inconnue')[0] == "N/A (Règle Inconnue)"
+
+    @register_rule('max_test', 'Maximum')
+    def max_rule(sample):
+        return sample.values[-1], 'max'
+    try:
+        assert calculate({'a': '3', 'b': '8', 'c': '?'}, 'max_test') == ('8.0', 'max')
+        assert 'max_test' in [rule.name for rule in consensus.available_rules()]
+    finally:
+        del RULES['max_test']
+
+def test_score_backlog_batch():
+    pytest.importorskip('numpy')
+    backlog = [
+        {'name': 'A', 'votes_submitted': {'a': '1', 'b': '3', 'c': '8'}},
+        {'name': 'B'},
+        {'name': 'C', 'votes_submitted': {'a': '5', 'b': '?', 'c': '2', 'd': '13'}},
+    ]
+    scores = consensus.score_backlog(backlog)
+    assert scores[0] == {'index': 0, 'name': 'A', 'count': 3, 'mean': 4.0, 'median': 3.0,
+                         'min': 1.0, 'max': 8.0, 'std': pytest.approx(2.943920)}
+    assert scores[1]['count'] == 0 and scores[1]['median'] is None
+    assert scores[2]['median'] == 5.0
+    assert scores[2]['min'] == 2.0 and scores[2]['max'] == 13.0
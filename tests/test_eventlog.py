@@ -0,0 +1,164 @@
+# tests/test_eventlog.py
+import io
+import os
+import subprocess
+import sys
+import pytest
+import app as app_module
+from poker.eventlog import CorruptEventLogError, EventLog
+
+# -----------------------------
+# Tests du journal d'événements
+# -----------------------------
+
+def make_room():
+    return {'session_name': 'Sprint', 'session_type': 'average', 'admin_name': 'admin',
+            'admin_sid': 'sid-admin', 'participants': {'sid-admin': 'admin'},
+            'backlog': [{'name': 'A', 'description': '', 'votes': {}},
+                        {'name': 'B', 'description': '', 'votes': {}}],
+            'current_story_index': 0, 'votes': {}, 'is_revealed': False, 'is_started': False,
+            'use_timer': False, 'timer_duration': 60, 'timer_end_time': None, 'revision': 4}
+
+def test_replay_rebuilds_rooms(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append('R1', 'create', make_room())
+    log.append('R1', 'start', {'use_timer': True, 'timer_duration': 30})
+    log.append('R1', 'vote', {'u': 'alice', 'v': '3'})
+    log.append('R1', 'vote', {'u': 'bob', 'v': '5'})
+    log.append('R1', 'reveal', {'i': 0, 'result': '4.0', 'rule': 'average',
+                                'votes': {'alice': '3', 'bob': '5'}})
+    log.append('R1', 'next', {'i': 1})
+    log.append('R1', 'vote', {'u': 'bob', 'v': '8'})
+    log.append('R1', 'vote', {'u': 'bob', 'v': None})  # Retrait
+    log.append('R2', 'create', make_room())
+    log.append('R2', 'delete', {})
+    log.close()
+
+    rooms = EventLog(str(tmp_path)).replay()
+    assert list(rooms) == ['R1']
+    room = rooms['R1']
+    assert room['is_started'] is True and room['timer_duration'] == 30
+    assert room['current_story_index'] == 1
+    assert room['votes'] == {}
+    assert room['backlog'][0]['final_vote'] == '4.0'
+    # Les champs liés aux connexions repartent à zéro
+    assert room['participants'] == {} and room['admin_sid'] is None and room['revision'] == 0
+
+def test_snapshots_compact_the_log(tmp_path):
+    state = {}
+    log = EventLog(str(tmp_path), snapshot_every=5, segment_bytes=300)
+    log.set_state_source(lambda room_id: state.get(room_id))
+    state['R1'] = make_room()
+    log.append('R1', 'create', state['R1'])
+    for i in range(40):
+        state['R1']['votes']['alice'] = str(i)
+        log.append('R1', 'vote', {'u': 'alice', 'v': str(i)})
+        log.sync()
+    log.close()
+
+    segments = [name for name in os.listdir(tmp_path) if name.endswith('.log')]
+    assert log.stats()['snapshots'] > 0
+    assert len(segments) < 5  # Les segments couverts par un snapshot ont été supprimés
+    assert EventLog(str(tmp_path)).replay()['R1']['votes'] == {'alice': '39'}
+    assert EventLog(str(tmp_path)).replay()['R1']['tally']['count'] == 1
+
+def test_torn_last_line_is_ignored(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append('R1', 'create', make_room())
+    log.append('R1', 'vote', {'u': 'alice', 'v': '3'})
+    log.close()
+    segment = [name for name in os.listdir(tmp_path) if name.endswith('.log')][0]
+    with open(tmp_path / segment, 'a', encoding='utf-8') as f:
+        f.write('{"s":3,"r":"R1","t":"vo')  # Arrêt brutal au milieu d'une écriture
+
+    reopened = EventLog(str(tmp_path))
+    assert reopened.replay()['R1']['votes'] == {'alice': '3'}
+    assert reopened.append('R1', 'restart', {}) == 3
+    reopened.close()
+    # La ligne tronquée a été retirée : elle n'est plus au milieu du journal
+    assert EventLog(str(tmp_path)).replay()['R1']['votes'] == {}
+
+def test_corrupt_record_stops_replay(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=1)  # Un segment par événement
+    log.append('R1', 'create', make_room())
+    for vote in ('1', '2', '3'):
+        log.append('R1', 'vote', {'u': 'alice', 'v': vote})
+    log.close()
+    segments = sorted(name for name in os.listdir(tmp_path) if name.endswith('.log'))
+    assert len(segments) == 4
+
+    # Enregistrement illisible au milieu du journal : pas de rejeu partiel
+    middle = tmp_path / segments[1]
+    original = middle.read_bytes()
+    middle.write_bytes(b'{"s":2,"r":"R1","t":"vo\n')
+    with pytest.raises(CorruptEventLogError):
+        EventLog(str(tmp_path)).replay()
+    # Ligne incomplète ailleurs que dans le dernier segment
+    middle.write_bytes(original[:-1])
+    with pytest.raises(CorruptEventLogError):
+        EventLog(str(tmp_path)).replay()
+    # Segment manquant : trou dans la séquence
+    middle.unlink()
+    with pytest.raises(CorruptEventLogError):
+        EventLog(str(tmp_path)).replay()
+
+def test_handlers_append_to_journal(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path), fsync_interval=0)
+    monkeypatch.setattr(app_module, 'journal', log)
+    monkeypatch.setattr(app_module.vote_buffer, 'window', 0)
+    client = app_module.app.test_client()
+    response = client.post('/create_room', data={
+        'username': 'admin', 'session_name': 'Journal', 'session_type': 'median',
+        'backlog_file': (io.BytesIO(b'[{"name": "A"}]'), 'backlog.json')})
+    room_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+    admin = app_module.socketio.test_client(app_module.app)
+    admin.emit('join', {'username': 'admin', 'room_id': room_id})
+    admin.emit('start_session', {'room_id': room_id, 'use_timer': False, 'duration': 60})
+    admin.emit('submit_vote', {'username': 'admin', 'room_id': room_id, 'vote': '5'})
+    admin.emit('reveal_votes', {'room_id': room_id})
+    admin.disconnect()
+    log.close()
+
+    restored = EventLog(str(tmp_path)).replay()[room_id]
+    assert restored['is_revealed'] is True
+    assert restored['backlog'][0]['final_vote'] == '5.0'
+
+def test_vote_of_departed_participant_is_not_replayed(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path), fsync_interval=0)
+    monkeypatch.setattr(app_module, 'journal', log)
+    monkeypatch.setattr(app_module.vote_buffer, 'window', 0)
+    client = app_module.app.test_client()
+    response = client.post('/create_room', data={
+        'username': 'admin', 'session_name': 'Journal', 'session_type': 'median',
+        'backlog_file': (io.BytesIO(b'[{"name": "A"}]'), 'backlog.json')})
+    room_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+    other_id = client.post('/create_room', data={
+        'username': 'admin', 'session_name': 'Autre', 'session_type': 'median',
+        'backlog_file': (io.BytesIO(b'[{"name": "B"}]'), 'backlog.json')}).headers['Location'].rsplit('/', 1)[-1]
+
+    admin, bob, carol = (app_module.socketio.test_client(app_module.app) for _ in range(3))
+    admin.emit('join', {'username': 'admin', 'room_id': room_id})
+    admin.emit('start_session', {'room_id': room_id, 'use_timer': False, 'duration': 60})
+    for user, name in ((admin, 'admin'), (bob, 'bob'), (carol, 'carol')):
+        if user is not admin:
+            user.emit('join', {'username': name, 'room_id': room_id})
+        user.emit('submit_vote', {'username': name, 'room_id': room_id, 'vote': '8'})
+    bob.disconnect()                                                # Départ
+    carol.emit('join', {'username': 'carol', 'room_id': other_id})  # Changement de salle
+    log.sync()
+
+    assert EventLog(str(tmp_path)).replay()[room_id]['votes'] == {'admin': '8'}
+    for user in (admin, carol):
+        user.disconnect()
+    log.close()
+
+def test_journal_refused_with_shared_store(tmp_path):
+    # Chaque worker rejouerait son journal dans le même Redis : refusé au démarrage
+    pytest.importorskip('redis')
+    env = dict(os.environ, EVENT_LOG_DIR=str(tmp_path), ROOM_STORE_URL='redis://localhost:1/0')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=root, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode != 0
+    assert 'EVENT_LOG_DIR' in result.stderr
@@ -0,0 +1,92 @@
+# tests/test_export.py
+import csv
+import io
+import json
+
+import pytest
+
+from app import app, rooms
+from poker import export
+
+# -----------------------------
+# Tests de l'export du backlog
+# -----------------------------
+
+def make_room(room_id, size):
+    backlog = [{'name': f'Tâche {i}', 'description': 'desc, "citée"', 'votes': {}} for i in range(size)]
+    backlog[0].update(final_vote='5', consensus_rule='strict', votes_submitted={'alice': '5', 'bob': '5'})
+    rooms[room_id] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None, 'backlog': backlog,
+        'current_story_index': 0, 'votes': {}, 'is_started': False, 'is_revealed': False
+    }
+
+def admin_client(room_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['admin_rooms'] = [room_id]
+    return client
+
+def test_export_requires_admin(monkeypatch):
+    make_room('EXP1', 2)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['username'] = 'bob'  # Participant, pas administrateur
+    assert client.get('/room/EXP1/export').status_code == 403
+
+    monkeypatch.setenv('EXPORT_TOKEN', 'secret')
+    response = app.test_client().get('/room/EXP1/export', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert admin_client('INCONNUE').get('/room/INCONNUE/export').status_code == 404
+
+def test_export_formats():
+    make_room('EXP2', 3)
+    client = admin_client('EXP2')
+
+    response = client.get('/room/EXP2/export')
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="backlog_EXP2.json"'
+    stories = json.loads(response.get_data())
+    assert [story['index'] for story in stories] == [0, 1, 2]
+    assert stories[0]['final_vote'] == '5' and stories[0]['votes'] == {'alice': '5', 'bob': '5'}
+    assert stories[1]['final_vote'] is None
+
+    lines = client.get('/room/EXP2/export?format=ndjson&fields=final_vote').get_data(as_text=True).splitlines()
+    assert json.loads(lines[0]) == {'index': 0, 'name': 'Tâche 0', 'description': 'desc, "citée"', 'final_vote': '5'}
+    assert len(lines) == 3
+
+    response = client.get('/room/EXP2/export?format=csv&fields=votes,consensus_rule')
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['index', 'name', 'description', 'consensus_rule', 'votes']
+    assert rows[1][2] == 'desc, "citée"' and json.loads(rows[1][4]) == {'alice': '5', 'bob': '5'}
+    assert rows[2][3:] == ['', '']
+
+def test_export_invalid_parameters():
+    make_room('EXP3', 1)
+    client = admin_client('EXP3')
+    assert client.get('/room/EXP3/export?format=xml').status_code == 400
+    assert client.get('/room/EXP3/export?fields=final_vote,secret').status_code == 400
+
+def test_export_streams_in_chunks():
+    def stories():
+        for i in range(2000):
+            yield {'name': f'Tâche {i}', 'description': 'x' * 100}
+        raise AssertionError('Le générateur ne doit pas être lu au-delà')
+
+    chunks = export.stream_export(stories(), 'ndjson', (), chunk_bytes=4096)
+    first = next(chunks)
+    assert 4096 <= len(first) < 8192  # Un bloc émis avant la fin du backlog
+
+    with pytest.raises(export.ExportError):
+        export.parse_fields('final_vote,inconnu')
+
+def test_export_stops_when_room_deleted():
+    make_room('EXP4', 1200)
+    response = admin_client('EXP4').get('/room/EXP4/export?format=ndjson&fields=')
+    chunks = iter(response.response)
+    first = next(chunks)
+    rooms.delete_room('EXP4')
+    body = first + b''.join(chunks)
+    # Fin propre après les pages déjà lues (pages de BACKLOG_PAGE_MAX tâches)
+    assert len(body.splitlines()) % app.config['BACKLOG_PAGE_MAX'] == 0
@@ -0,0 +1,103 @@
+# tests/test_lifecycle.py
+import json
+import app as app_module
+from contextlib import contextmanager
+from poker.lifecycle import RoomLifecycle, backlog_snapshot_hook
+from poker.locks import RoomLocks
+from poker.store import InMemoryRoomStore
+
+# -----------------------------
+# Tests du cycle de vie des salles
+# -----------------------------
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_room(participants=None):
+    return {'session_name': 'Sprint', 'participants': participants or {}, 'votes': {},
+            'backlog': [{'name': 'Tâche 1', 'final_vote': '3'}]}
+
+def test_idle_empty_rooms_are_evicted():
+    store, clock = InMemoryRoomStore(), FakeClock()
+    lifecycle = RoomLifecycle(store, idle_ttl=100, clock=clock)
+    store.create_room('EMPTY', make_room())
+    store.create_room('BUSY', make_room({'sid1': 'alice'}))
+    store.create_room('RECENT', make_room())
+    lifecycle.touch('EMPTY')
+    lifecycle.touch('BUSY')
+    clock.now += 90
+    lifecycle.touch('RECENT')
+
+    clock.now += 20
+    assert lifecycle.sweep() == ['EMPTY']
+    assert store.room_ids() == ['BUSY', 'RECENT']
+    assert lifecycle.stats()['evicted_idle'] == 1
+
+def test_capacity_evicts_lru_empty_rooms_first():
+    store, clock = InMemoryRoomStore(), FakeClock()
+    lifecycle = RoomLifecycle(store, idle_ttl=100, max_rooms=2, clock=clock)
+    for room_id, participants in [('A', {'s': 'alice'}), ('B', {}), ('C', {})]:
+        store.create_room(room_id, make_room(participants))
+        lifecycle.touch(room_id)
+        clock.now += 1
+
+    # A est la plus ancienne mais occupée : B (vide) part en premier, C (la plus récente) reste
+    assert lifecycle.enforce_capacity() == ['B']
+    assert sorted(store.room_ids()) == ['A', 'C']
+    assert lifecycle.stats() == {'live_rooms': 2, 'tracked_rooms': 2, 'evicted_idle': 0,
+                                 'evicted_capacity': 1, 'evicted_total': 1}
+
+class JoiningLocks(RoomLocks):
+    """ Un participant rejoint la salle A juste avant que l'éviction obtienne le verrou. """
+    @contextmanager
+    def hold(self, room_id):
+        if room_id == 'A':
+            self._store.update_room(room_id, participants={'sid9': 'zoe'})
+        with super().hold(room_id) as exists:
+            yield exists
+
+def test_eviction_rechecks_room_under_its_lock():
+    store, clock = InMemoryRoomStore(), FakeClock()
+    lifecycle = RoomLifecycle(store, idle_ttl=100, clock=clock, locks=JoiningLocks(store))
+    for room_id in ('A', 'B', 'C'):
+        store.create_room(room_id, make_room())
+        lifecycle.touch(room_id)
+        clock.now += 1
+
+    # A, vide au moment du choix, est occupée une fois le verrou pris : gardée
+    lifecycle.max_rooms = 2
+    assert lifecycle.enforce_capacity() == ['B']
+    clock.now += 200
+    assert lifecycle.sweep() == ['C']
+    assert store.room_ids() == ['A']
+
+def test_byte_cap():
+    store, clock = InMemoryRoomStore(), FakeClock()
+    lifecycle = RoomLifecycle(store, max_bytes=1, clock=clock)
+    store.create_room('A', make_room())
+    store.create_room('B', make_room())
+    lifecycle.touch('A')
+    lifecycle.touch('B')
+    assert lifecycle.enforce_capacity(include_bytes=False) == []
+    assert lifecycle.enforce_capacity() == ['A']
+
+def test_snapshot_hook_saves_backlog(tmp_path):
+    store, clock = InMemoryRoomStore(), FakeClock()
+    lifecycle = RoomLifecycle(store, idle_ttl=10, clock=clock,
+                              on_evict=backlog_snapshot_hook(str(tmp_path)))
+    store.create_room('A', make_room())
+    lifecycle.touch('A')
+    clock.now += 11
+    lifecycle.sweep()
+    saved = json.loads((tmp_path / 'A.json').read_text(encoding='utf-8'))
+    assert saved['backlog'][0]['final_vote'] == '3'
+
+def test_stats_route():
+    client = app_module.app.test_client()
+    response = client.get('/stats')
+    assert response.status_code == 200
+    assert 'live_rooms' in response.get_json()
@@ -0,0 +1,120 @@
+# tests/test_locks.py
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+import app as app_module
+from app import app, reveal_room, rooms, socketio
+from poker.locks import RoomLocks
+from poker.store import InMemoryRoomStore
+
+# -----------------------------
+# Tests des verrous par salle (transitions concurrentes)
+# -----------------------------
+
+@pytest.fixture
+def fast_switching(monkeypatch):
+    """ Bascule entre threads très fréquente : les entrelacements deviennent probables. """
+    monkeypatch.setattr(app_module.vote_buffer, 'window', 0)  # Un patch par vote
+    monkeypatch.setattr(app_module.rate_limiter, 'limits', {})  # Rafales voulues
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def run_threads(target, count):
+    start = threading.Barrier(count)
+
+    def run(i):
+        start.wait()
+        target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+
+def make_room(room_id, participants=0):
+    rooms[room_id] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None, 'session_type': 'strict',
+        'backlog': [{'name': f'Tâche {i}', 'description': 'desc'} for i in range(3)],
+        'current_story_index': 0, 'votes': {}, 'is_started': True, 'is_revealed': False
+    }
+    clients = []
+    for i in range(participants):
+        client = socketio.test_client(app)
+        client.emit('join', {'username': f'user{i}', 'room_id': room_id})
+        clients.append(client)
+    return clients
+
+def test_rooms_lock_independently():
+    store = InMemoryRoomStore()
+    locks = RoomLocks(store)
+    locks.create_room('A', {})
+    locks.create_room('B', {})
+    with pytest.raises(KeyError):
+        locks.create_room('A', {})
+    assert locks.lock_for('INCONNUE') is None and len(locks) == 2
+
+    other_room, same_room = [], []
+    with locks.hold('A'):
+        # Un autre thread entre dans la salle B, mais attend la salle A
+        def enter():
+            with locks.hold('B'):
+                other_room.append(True)
+            same_room.append(locks.lock_for('A').acquire(timeout=0.05))
+        thread = threading.Thread(target=enter)
+        thread.start()
+        thread.join()
+    assert other_room == [True] and same_room == [False]
+
+    with locks.hold('A') as exists:
+        assert exists
+        locks.delete_room('A')
+    with locks.hold('A') as exists:
+        assert not exists
+    assert 'A' not in store and len(locks) == 1
+
+def test_concurrent_voters_keep_tally_and_revisions_consistent(fast_switching):
+    clients = make_room('LOCK1', participants=12)
+    observer = clients[0]
+    observer.get_received()
+
+    def vote(i):
+        for round_vote in ('1', '3', '5', '8', '13') * 4:
+            clients[i].emit('submit_vote', {'username': f'user{i}', 'room_id': 'LOCK1', 'vote': round_vote})
+    run_threads(vote, len(clients))
+
+    room_data = rooms['LOCK1']
+    assert room_data['votes'] == {f'user{i}': '13' for i in range(12)}
+    assert room_data['tally']['count'] == 12
+    assert {float(value): count for value, count in Counter(room_data['votes'].values()).items()} == \
+        {float(value): count for value, count in room_data['tally']['histogram'].items()}
+    revisions = [msg['args'][0]['rev'] for msg in observer.get_received() if msg['name'] == 'state_patch']
+    assert len(revisions) == 12 * 20
+    assert revisions == list(range(revisions[0], revisions[0] + len(revisions)))  # Ni doublon ni trou
+    for client in clients:
+        client.disconnect()
+
+def test_reveal_and_next_task_run_once(fast_switching):
+    clients = make_room('LOCK2', participants=2)
+    admin = socketio.test_client(app)
+    admin.emit('join', {'username': 'admin', 'room_id': 'LOCK2'})
+    clients[1].emit('submit_vote', {'username': 'user1', 'room_id': 'LOCK2', 'vote': '5'})
+
+    # Timer et administrateur révèlent en même temps : un seul calcul
+    results = []
+    run_threads(lambda i: results.append(reveal_room('LOCK2')), 8)
+    assert results.count(True) == 1
+
+    # Double clic sur "Tâche suivante" : une seule avance
+    run_threads(lambda i: admin.emit('next_task', {'room_id': 'LOCK2'}), 8)
+    assert rooms['LOCK2']['current_story_index'] == 1
+    patches = [msg['args'][0]['type'] for msg in clients[0].get_received() if msg['name'] == 'state_patch']
+    assert patches.count('votes_revealed') == 1 and patches.count('story_advanced') == 1
+    for client in clients + [admin]:
+        client.disconnect()
@@ -0,0 +1,103 @@
+# tests/test_logs.py
+import io
+import json
+import logging
+import logging.handlers
+
+import pytest
+
+from poker import logs
+from poker.logs import EventSampler, log_event
+
+# -----------------------------
+# Tests de la journalisation structurée
+# -----------------------------
+
+class LogCapture:
+    """ Journal JSON écrit dans un tampon. """
+
+    def __init__(self):
+        self.stream = io.StringIO()
+        self.writer = None
+
+    def configure(self, **options):
+        self.writer = logs.configure(fmt='json', stream=self.stream, **options)
+
+    def lines(self):
+        self.writer.stop()  # Vide la file
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+@pytest.fixture
+def capture():
+    log_capture = LogCapture()
+    yield log_capture
+    if log_capture.writer:
+        log_capture.writer.stop()
+    logs.configure(level='WARNING')  # Le reste de la suite n'écrit que les avertissements
+
+def test_json_records_with_fields(capture):
+    capture.configure()
+    log_event('room_created', "Salle créée", room='AB12', user='alice')
+    try:
+        raise RuntimeError('disque plein')
+    except RuntimeError:
+        log_event('event_log_error', "Erreur", level=logging.ERROR, exc_info=True)
+
+    created, error = capture.lines()
+    assert created['event'] == 'room_created' and created['room'] == 'AB12' and created['user'] == 'alice'
+    assert created['level'] == 'INFO'
+    assert error['level'] == 'ERROR' and 'disque plein' in error['exc']
+
+def test_background_writer_drains_the_queue():
+    # Écrivain utilisé sous gevent/eventlet : même file et même handler final que QueueWriter
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logs.TextFormatter())
+    writer = logs.BackgroundWriter(output)
+    writer.start()
+    handler = logging.handlers.QueueHandler(writer.queue)
+    record = logging.makeLogRecord({'msg': 'Salle %s', 'args': ('AB12',), 'event': 'room_created',
+                                    'fields': {'user': 'alice'}})
+    handler.handle(record)
+    writer.stop()
+    writer.stop()  # Sans effet une fois arrêté
+    assert stream.getvalue().rstrip().endswith('room_created Salle AB12 user=alice')
+
+def test_levels_per_event(capture):
+    capture.configure(level='WARNING', event_levels='join=DEBUG,vote=ERROR')
+    log_event('join', "Participant entré")                       # Plus bas que LOG_LEVEL, mais autorisé
+    log_event('vote', "Vote enregistré", level=logging.WARNING)  # Sous le niveau de 'vote'
+    log_event('leave', "Participant parti")                      # Sous LOG_LEVEL
+    assert [record['event'] for record in capture.lines()] == ['join']
+
+def test_sampler_limits_rate_and_counts_skipped():
+    now = [0.0]
+    sampler = EventSampler({'vote': 2}, clock=lambda: now[0])
+    assert [sampler.allow('vote')[0] for _ in range(5)] == [True, True, False, False, False]
+    now[0] = 0.5  # Un jeton rechargé
+    assert sampler.allow('vote') == (True, 3)
+    assert sampler.allow('join') == (True, 0)  # Événement non limité
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        logs.parse_mapping('vote=BAVARD', logs.parse_level, 'LOG_EVENT_LEVELS')
+    with pytest.raises(ValueError):
+        logs.parse_mapping('vote', float, 'LOG_SAMPLE_RATES')
+
+def test_vote_handler_does_not_print(capsys, capture, monkeypatch):
+    from app import app, rooms, socketio, vote_buffer
+    monkeypatch.setattr(vote_buffer, 'window', 0)
+    capture.configure(sample_rates='')
+    rooms['LOGS1'] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None,
+        'backlog': [{'name': 'Tâche 1', 'description': 'desc', 'votes': {}}],
+        'votes': {}, 'is_started': True, 'is_revealed': False
+    }
+    client = socketio.test_client(app)
+    client.emit('join', {'username': 'bob', 'room_id': 'LOGS1'})
+    client.emit('submit_vote', {'username': 'bob', 'room_id': 'LOGS1', 'vote': '5'})
+    client.disconnect()
+
+    assert capsys.readouterr().out == ''
+    events = [(record['event'], record.get('user')) for record in capture.lines()]
+    assert events == [('join', 'bob'), ('vote', 'bob'), ('leave', 'bob')]
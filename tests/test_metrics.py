@@ -0,0 +1,107 @@
+# tests/test_metrics.py
+from app import app, metrics, profiler, rooms, socketio, vote_buffer
+from poker.metrics import Instrumentation, Registry, encoded_size, room_size_bucket
+from poker.profiler import SamplingProfiler
+
+# -----------------------------
+# Tests des métriques et du profileur
+# -----------------------------
+
+def test_prometheus_text_format():
+    registry = Registry()
+    counter = registry.counter('demo_total', "Démo.", ('event',))
+    histogram = registry.histogram('demo_seconds', "Durées.", ('event',), buckets=(0.1, 1.0))
+    registry.gauge('demo_rooms', "Salles.", lambda: 3)
+    counter.inc(2, ('vote "rapide"',))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, ('join',))
+
+    text = registry.render()
+    assert '# TYPE demo_total counter' in text
+    assert 'demo_total{event="vote \\"rapide\\""} 2' in text
+    assert 'demo_seconds_bucket{event="join",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{event="join",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{event="join",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{event="join"} 3' in text
+    assert 'demo_rooms 3' in text
+
+def test_emit_size_is_sampled():
+    class CountingPacket:
+        encodes = 0
+        def __init__(self, *args, **kwargs):
+            self.inner = socketio.server.packet_class(*args, **kwargs)
+        def encode(self):
+            CountingPacket.encodes += 1
+            return self.inner.encode()
+
+    class FakeServer:
+        packet_class = CountingPacket
+        class manager:
+            rooms = {'/': {'R': {'s1': 'e1', 's2': 'e2'}}}
+
+    instrumentation = Instrumentation(registry=Registry(), size_sample=4)
+    payload = {'type': 'vote_cast', 'data': {'username': 'alice', 'vote': '5'}}
+    for _ in range(8):
+        instrumentation.record_emit(FakeServer, 'state_patch', (payload,), {'to': 'R'})
+    size = encoded_size(socketio.server.packet_class, 'state_patch', [payload])
+    assert CountingPacket.encodes == 2  # Une mesure toutes les 4 émissions
+    assert instrumentation.emitted_bytes.value(('state_patch', 'vote_cast', '2-5')) == 8 * 2 * size
+
+def test_room_size_buckets():
+    assert [room_size_bucket(n) for n in (0, 1, 4, 10, 11, 80, 500)] == \
+        ['1', '1', '2-5', '6-10', '11-25', '51-100', '100+']
+
+def test_handlers_and_emits_are_measured(monkeypatch):
+    monkeypatch.setattr(vote_buffer, 'window', 0)
+    rooms['METRICS1'] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None,
+        'backlog': [{'name': 'Tâche 1', 'description': 'desc', 'votes': {}}],
+        'votes': {}, 'is_started': True, 'is_revealed': False
+    }
+    labels = ('state_patch', 'vote_cast', '2-5')
+    before_messages = metrics.emitted_messages.value(labels)
+    before_votes = metrics.handler_seconds.count(('submit_vote',))
+
+    alice = socketio.test_client(app)
+    bob = socketio.test_client(app)
+    alice.emit('join', {'username': 'alice', 'room_id': 'METRICS1'})
+    bob.emit('join', {'username': 'bob', 'room_id': 'METRICS1'})
+    bob.emit('submit_vote', {'username': 'bob', 'room_id': 'METRICS1', 'vote': '5'})
+
+    assert metrics.handler_seconds.count(('submit_vote',)) == before_votes + 1
+    assert metrics.emitted_messages.value(labels) == before_messages + 2  # Un patch, deux destinataires
+    assert metrics.emitted_bytes.value(labels) > 0
+
+    text = app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'poker_socketio_handler_seconds_count{event="join"}' in text
+    assert 'poker_emitted_bytes_estimated_total{event="state_patch",type="vote_cast",room_size="2-5"}' in text
+    assert 'poker_http_request_seconds_count{endpoint="prometheus_metrics"}' in \
+        app.test_client().get('/metrics').get_data(as_text=True)
+    alice.disconnect()
+    bob.disconnect()
+
+def test_metrics_token(monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'secret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+def test_profiler_toggle_at_runtime():
+    client = app.test_client()
+    stats = client.post('/metrics/profile', json={'enabled': True, 'interval_ms': 1, 'reset': True}).get_json()
+    assert stats['running'] is True
+    profiler.sample()
+    stats = client.post('/metrics/profile', json={'enabled': False}).get_json()
+    assert stats['running'] is False and stats['samples'] >= 1
+    folded = client.get('/metrics/profile').get_data(as_text=True)
+    assert 'test_metrics.py:test_profiler_toggle_at_runtime' in folded
+    # Hors machine locale, sans METRICS_TOKEN : refusé
+    assert client.get('/metrics/profile', environ_base={'REMOTE_ADDR': '10.0.0.8'}).status_code == 403
+
+def test_profiler_folded_stacks():
+    sampler = SamplingProfiler()
+    sampler.sample()
+    sampler.sample()
+    counts = dict(line.rsplit(' ', 1) for line in sampler.folded().splitlines())
+    stack = next(stack for stack in counts if stack.endswith('test_profiler_folded_stacks;profiler.py:sample'))
+    assert int(counts[stack]) == 2
@@ -0,0 +1,81 @@
+# tests/test_model.py
+import json
+
+import pytest
+
+from poker import state_sync
+from poker.model import CARDS, CardTable, Room, Round, Story, to_plain
+from poker.store import InMemoryRoomStore
+
+# -----------------------------
+# Tests du modèle compact des salles
+# -----------------------------
+
+def make_room():
+    return {
+        'session_name': 'Sprint', 'session_type': 'average', 'admin_name': 'alice', 'admin_sid': None,
+        'backlog': [{'name': f'Tâche {i}', 'description': 'desc', 'votes': {}} for i in range(3)],
+        'current_story_index': 0, 'votes': {}, 'is_revealed': False, 'is_started': False,
+        'participants': {}, 'revision': 0
+    }
+
+def test_round_stores_card_codes():
+    room_round = Round()
+    assert room_round.set_vote('alice', '5') is None
+    assert room_round.set_vote('bob', '☕️') is None
+    assert room_round.set_vote('alice', '8') == '5'
+    assert list(room_round.cards) == [CARDS.encode('8'), CARDS.encode('☕️')]
+    assert room_round.set_vote('bob', None) == '☕️'
+    assert room_round.votes() == {'alice': '8'}
+    # Retrait au milieu : le dernier votant reprend la place libérée
+    for username, vote in (('bob', '1'), ('carol', '2')):
+        room_round.set_vote(username, vote)
+    assert room_round.set_vote('alice', None) == '8'
+    assert room_round.voters == ['carol', 'bob'] and list(room_round.cards) == [CARDS.encode('2'), CARDS.encode('1')]
+    assert room_round.set_vote('carol', '3') == '2'
+    assert room_round.votes() == {'carol': '3', 'bob': '1'} and len(room_round) == 2
+
+def test_card_table_refuses_cards_outside_the_deck():
+    table = CardTable(['1', '2'])
+    assert table.encode('2') == 1 and '2' in table
+    for card in ('hors paquet', 'x' * 100, 2):
+        assert card not in table
+        with pytest.raises(ValueError):
+            table.encode(card)
+    assert table.cards == ('1', '2')  # Rien n'a été ajouté
+    with pytest.raises(ValueError):
+        Round().set_vote('alice', '3,14')
+
+def test_room_reads_like_the_former_dict():
+    store = InMemoryRoomStore()
+    store.create_room('R1', make_room())
+    store.add_participant('R1', 'sid1', 'alice')
+    store.record_vote('R1', 'alice', '5')
+    store.update_room('R1', is_started=True, theme='sombre')  # Clé inconnue : conservée à part
+
+    room = store.get_room('R1')
+    assert isinstance(room, Room) and not hasattr(room, '__dict__')
+    assert room['participants'] == {'sid1': 'alice'} and len(room['participants']) == 1
+    assert room['votes'] == {'alice': '5'} and room['tally']['count'] == 1
+    assert room.get('theme') == 'sombre' and room.get('timer_end_time') is None
+    assert 'votes' not in room['backlog'][0]  # Ancien champ toujours vide, non conservé
+
+    plain = room.to_dict()
+    assert plain['backlog'][0] == {'name': 'Tâche 0', 'description': 'desc'}
+    assert Room.from_dict(plain).to_dict() == plain
+    json.dumps(state_sync.snapshot(room))  # Charge utile client en types JSON simples
+
+def test_story_results_share_voters():
+    store = InMemoryRoomStore()
+    store.create_room('R1', make_room())
+    votes = {'alice': '5', 'bob': '8'}
+    store.save_story_result('R1', 0, '6.5', 'average', votes)
+    store.save_story_result('R1', 1, '8.0', 'average', dict(votes, alice='8'))
+
+    first, second, third = store.get_room('R1')['backlog']
+    assert isinstance(first, Story) and not hasattr(first, '__dict__')
+    assert first['votes_submitted'] == votes and first['final_vote'] == '6.5'
+    assert first.voters is second.voters and isinstance(first.cards, bytes)
+    assert to_plain(second) == {'name': 'Tâche 1', 'description': 'desc', 'final_vote': '8.0',
+                                'consensus_rule': 'average', 'votes_submitted': {'alice': '8', 'bob': '8'}}
+    assert 'final_vote' not in third and dict(third, index=2)['index'] == 2
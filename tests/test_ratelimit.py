@@ -0,0 +1,120 @@
+# tests/test_ratelimit.py
+import io
+import json
+import queue
+
+import pytest
+import socketio as socketio_module
+
+import app as app_module
+from app import app, rooms, socketio
+from poker.ratelimit import RateLimiter, SlowConsumerGuard, limits_from_env
+
+# -----------------------------
+# Tests de la limitation de débit et de la contre-pression
+# -----------------------------
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_per_sid_and_event():
+    clock = FakeClock()
+    limiter = RateLimiter({'submit_vote': (2, 3), '*': (1, 1)}, clock=clock, error_interval=5)
+    assert [limiter.allow('s1', 'submit_vote') for _ in range(4)] == \
+        [(True, False)] * 3 + [(False, True)]
+    assert limiter.allow('s1', 'submit_vote') == (False, False)  # Avertissement déjà envoyé
+    assert limiter.allow('s2', 'submit_vote') == (True, False)   # Seau propre à chaque sid
+    assert limiter.allow('s1', 'next_task') == (True, False)     # Limite par défaut '*'
+    assert limiter.allow('s1', 'disconnect') == (True, False)
+
+    clock.now = 1.0  # Deux jetons rechargés
+    assert [limiter.allow('s1', 'submit_vote')[0] for _ in range(3)] == [True, True, False]
+    assert limiter.dropped == 3
+    limiter.forget('s1')
+    assert len(limiter) == 1
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv('SOCKET_RATE_LIMITS', 'submit_vote=5/10,join=0.5,request_state=0')
+    assert limits_from_env() == {'submit_vote': (5.0, 10.0), 'join': (0.5, 1.0), 'request_state': None}
+    monkeypatch.setenv('SOCKET_RATE_LIMITS', '')
+    assert limits_from_env() == {}
+    monkeypatch.setenv('SOCKET_RATE_LIMITS', 'submit_vote=vite')
+    with pytest.raises(ValueError):
+        limits_from_env()
+
+def test_flooding_client_is_throttled(monkeypatch):
+    monkeypatch.setattr(app_module.vote_buffer, 'window', 0)
+    monkeypatch.setattr(app_module.rate_limiter, 'limits', {'submit_vote': (0.001, 3)})
+    rooms['RATE1'] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None, 'session_type': 'average',
+        'backlog': [{'name': 'Tâche', 'description': 'desc'}], 'current_story_index': 0,
+        'votes': {}, 'is_started': True, 'is_revealed': False
+    }
+    flooder, observer = socketio.test_client(app), socketio.test_client(app)
+    flooder.emit('join', {'username': 'bob', 'room_id': 'RATE1'})
+    observer.emit('join', {'username': 'alice', 'room_id': 'RATE1'})
+    observer.get_received()
+    flooder.get_received()
+
+    for vote in ('1', '2', '3', '5', '8', '13'):
+        flooder.emit('submit_vote', {'username': 'bob', 'room_id': 'RATE1', 'vote': vote})
+    assert rooms['RATE1']['votes'] == {'bob': '3'}  # Les trois premiers seulement
+    assert len([m for m in observer.get_received() if m['name'] == 'state_patch']) == 3
+    assert [m['name'] for m in flooder.get_received()].count('error') == 1
+
+    flooder_sid = next(sid for sid, name in rooms['RATE1']['participants'].items() if name == 'bob')
+    flooder.disconnect()
+    assert flooder_sid not in app_module.rate_limiter._buckets
+    observer.disconnect()
+
+class FakeSocket:
+    def __init__(self, pending):
+        self.queue = queue.Queue()
+        for i in range(pending):
+            self.queue.put(i)
+        self.closing = self.closed = False
+
+    def close(self, wait=True, abort=False):
+        assert not wait and abort
+        self.closed = True
+
+def test_slow_consumer_is_disconnected():
+    class FakeEngine:
+        sockets = {'rapide': FakeSocket(5), 'lent': FakeSocket(50)}
+
+    eio = FakeEngine()
+    slow = eio.sockets['lent']
+    guard = SlowConsumerGuard(max_queue=10)
+    assert guard.check(eio) == 1
+    assert slow.closed and slow.queue.empty() and list(eio.sockets) == ['rapide']
+    assert SlowConsumerGuard(max_queue=0).check(eio) == 0 and guard.disconnected == 1
+
+def test_slow_consumer_on_real_engineio_server():
+    # Vraie connexion Engine.IO (polling) : la garde dépend de Socket.queue, closing et sockets
+    server = socketio_module.Server(async_mode='threading')
+    events = []
+    server.on('connect', lambda sid, environ: events.append('connect'))
+    server.on('disconnect', lambda sid, *args: events.append('disconnect'))
+
+    def request(query, body=None):
+        data = body or b''
+        environ = {'REQUEST_METHOD': 'POST' if body else 'GET', 'QUERY_STRING': query,
+                   'PATH_INFO': '/socket.io/', 'wsgi.input': io.BytesIO(data), 'CONTENT_LENGTH': str(len(data))}
+        return b''.join(server.handle_request(environ, lambda status, headers: None))
+
+    eio_sid = json.loads(request('EIO=4&transport=polling')[1:])['sid']
+    request(f'EIO=4&transport=polling&sid={eio_sid}', b'40')  # CONNECT Socket.IO
+    for i in range(20):
+        server.emit('tick', i)  # Jamais lus : le client ne relance pas de polling
+    sock = server.eio.sockets[eio_sid]
+    assert sock.queue.qsize() > 10
+
+    guard = SlowConsumerGuard(max_queue=10)
+    assert guard.check(server.eio) == 1
+    assert events == ['connect', 'disconnect']
+    assert sock.closed and eio_sid not in server.eio.sockets
+    assert guard.check(server.eio) == 0
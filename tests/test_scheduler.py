@@ -0,0 +1,83 @@
+# tests/test_scheduler.py
+import app as app_module
+from poker.scheduler import DeadlineScheduler
+
+# -----------------------------
+# Tests de l'ordonnanceur d'échéances
+# -----------------------------
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_scheduler():
+    clock = FakeClock()
+    expired = []
+    scheduler = DeadlineScheduler(on_expire=expired.append, clock=clock)
+    return scheduler, clock, expired
+
+def test_deadlines_fire_in_order():
+    scheduler, clock, expired = make_scheduler()
+    scheduler.schedule('B', 20)
+    scheduler.schedule('A', 10)
+    clock.now = 15
+    assert scheduler.run_due() == ['A']
+    clock.now = 25
+    scheduler.run_due()
+    assert expired == ['A', 'B']
+    assert len(scheduler) == 0
+
+def test_cancel_and_reschedule():
+    scheduler, clock, expired = make_scheduler()
+    scheduler.schedule('A', 10)
+    scheduler.schedule('B', 10)
+    assert scheduler.cancel('B') is True
+    assert scheduler.cancel('B') is False
+    scheduler.schedule('A', 30)  # Relance : l'ancienne échéance est ignorée
+    clock.now = 20
+    assert scheduler.run_due() == []
+    clock.now = 30
+    assert scheduler.run_due() == ['A']
+
+def test_next_delay_is_bounded_by_tick():
+    scheduler, clock, _ = make_scheduler()
+    assert scheduler.next_delay() == 0.25
+    scheduler.schedule('A', 0.1)
+    assert scheduler.next_delay() == 0.1
+
+def test_timer_expiry_reveals_votes(monkeypatch):
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(on_expire=app_module.reveal_room, clock=clock)
+    monkeypatch.setattr(app_module, 'deadlines', scheduler)
+    room_id = 'TIMER1'
+    app_module.rooms[room_id] = {
+        'session_type': 'average',
+        'participants': {},
+        'admin_name': 'admin',
+        'admin_sid': None,
+        'backlog': [{'name': 'Tâche 1', 'description': 'desc', 'votes': {}},
+                    {'name': 'Tâche 2', 'description': 'desc', 'votes': {}}],
+        'current_story_index': 0,
+        'votes': {},
+        'is_started': False,
+        'is_revealed': False
+    }
+
+    admin = app_module.socketio.test_client(app_module.app)
+    admin.emit('join', {'username': 'admin', 'room_id': room_id})
+    admin.emit('start_session', {'room_id': room_id, 'use_timer': True, 'duration': 30})
+    assert app_module.rooms[room_id]['timer_end_time'] is not None
+    admin.emit('submit_vote', {'username': 'admin', 'room_id': room_id, 'vote': '5'})
+
+    clock.now = 31
+    assert scheduler.run_due() == [room_id]
+    assert app_module.rooms[room_id]['is_revealed'] is True
+    assert app_module.rooms[room_id]['backlog'][0]['final_vote'] == '5.0'
+
+    # Tâche suivante : une nouvelle échéance est programmée
+    admin.emit('next_task', {'room_id': room_id})
+    assert scheduler.is_scheduled(room_id)
+    admin.disconnect()
@@ -0,0 +1,45 @@
+# tests/test_server.py
+import pytest
+from poker import server
+
+# -----------------------------
+# Tests de la configuration du serveur Socket.IO
+# -----------------------------
+
+def test_socketio_options_defaults(monkeypatch):
+    for name in ('SOCKETIO_ASYNC_MODE', 'SOCKETIO_PING_INTERVAL', 'SOCKETIO_PING_TIMEOUT'):
+        monkeypatch.delenv(name, raising=False)
+    assert server.socketio_options() == {'async_mode': 'threading', 'ping_interval': 25, 'ping_timeout': 60}
+    assert server.async_mode_from_env(default='gevent') == 'gevent'
+
+def test_socketio_options_from_env(monkeypatch):
+    monkeypatch.setenv('SOCKETIO_ASYNC_MODE', 'Eventlet')
+    monkeypatch.setenv('SOCKETIO_PING_TIMEOUT', '30')
+    options = server.socketio_options()
+    assert options['async_mode'] == 'eventlet'
+    assert options['ping_timeout'] == 30
+
+    monkeypatch.setenv('SOCKETIO_ASYNC_MODE', 'tornado')
+    with pytest.raises(ValueError):
+        server.socketio_options()
+
+def test_serializer_option(monkeypatch):
+    monkeypatch.delenv('SOCKETIO_SERIALIZER', raising=False)
+    assert server.serializer_from_env() == 'json'
+    assert 'serializer' not in server.socketio_options()
+
+    monkeypatch.setenv('SOCKETIO_SERIALIZER', 'cbor')
+    with pytest.raises(ValueError):
+        server.socketio_options()
+
+def test_msgpack_serializer_round_trip(monkeypatch):
+    pytest.importorskip('msgpack')
+    from socketio import packet
+    from socketio.msgpack_packet import MsgPackPacket
+    monkeypatch.setenv('SOCKETIO_SERIALIZER', 'MsgPack')
+    assert server.socketio_options()['serializer'] == 'msgpack'
+
+    payload = ['state_patch', {'rev': 3, 'type': 'vote_cast', 'data': {'username': 'alice', 'vote': None}}]
+    encoded = MsgPackPacket(packet.EVENT, data=payload, namespace='/').encode()
+    assert isinstance(encoded, bytes)
+    assert MsgPackPacket(encoded_packet=encoded).data == payload
@@ -0,0 +1,64 @@
+# tests/test_state_sync.py
+import pytest
+from poker import state_sync
+from app import rooms, app, socketio, vote_buffer
+
+# -----------------------------
+# Tests du protocole versionné
+# -----------------------------
+
+def test_make_patch():
+    first = state_sync.make_patch(1, 'vote_cast', {'username': 'bob', 'vote': '5'})
+    second = state_sync.make_patch(2, 'vote_restarted', {}, msg='relance')
+    assert first == {'rev': 1, 'type': 'vote_cast', 'data': {'username': 'bob', 'vote': '5'}}
+    assert second['rev'] == 2
+    assert second['msg'] == 'relance'
+
+def test_make_patch_unknown_type():
+    with pytest.raises(ValueError):
+        state_sync.make_patch(1, 'inconnu', {})
+
+def test_is_stale():
+    room_data = {'revision': 3}
+    assert state_sync.is_stale(room_data, 2)
+    assert state_sync.is_stale(room_data, None)
+    assert not state_sync.is_stale(room_data, 3)
+
+def test_vote_emits_small_patch_instead_of_full_state(monkeypatch):
+    monkeypatch.setattr(vote_buffer, 'window', 0)  # Un patch par vote (voir test_coalesce.py)
+    room_id = 'SYNC1'
+    rooms[room_id] = {
+        'participants': {},
+        'admin_name': 'admin',
+        'admin_sid': None,
+        'backlog': [{'name': f'Tâche {i}', 'description': 'x' * 200, 'votes': {}} for i in range(300)],
+        'votes': {},
+        'is_started': True,
+        'is_revealed': False
+    }
+
+    client = socketio.test_client(app)
+    client.emit('join', {'username': 'bob', 'room_id': room_id})
+    received = client.get_received()
+    snapshots = [msg for msg in received if msg['name'] == 'state_snapshot']
+    assert len(snapshots) == 1
+    assert snapshots[0]['args'][0]['rev'] == 1
+    # Le backlog n'est pas envoyé : seulement sa taille et la tâche courante
+    state = snapshots[0]['args'][0]['state']
+    assert 'backlog' not in state
+    assert state['backlog_count'] == 300
+    assert state['current_story']['name'] == 'Tâche 0'
+
+    client.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': '5'})
+    received = client.get_received()
+    patches = [msg['args'][0] for msg in received if msg['name'] == 'state_patch']
+    assert patches == [{'rev': 2, 'type': 'vote_cast',
+                        'data': {'username': 'bob', 'vote': '5',
+                                 'progress': {'voted': 1, 'total': 1, 'voted_all': True}}}]
+
+    # Un client en retard obtient un snapshot, un client à jour rien du tout
+    client.emit('request_state', {'room_id': room_id, 'revision': 1})
+    assert [msg['name'] for msg in client.get_received()] == ['state_snapshot']
+    client.emit('request_state', {'room_id': room_id, 'revision': 2})
+    assert client.get_received() == []
+    client.disconnect()
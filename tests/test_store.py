@@ -0,0 +1,154 @@
+# tests/test_store.py
+import pytest
+import app as app_module
+from poker.locks import RoomLocks
+from poker.store import InMemoryRoomStore, RedisRoomStore, create_room_store
+
+# -----------------------------
+# Tests communs aux deux implémentations de RoomStore
+# -----------------------------
+
+def make_room():
+    return {
+        'session_name': 'Sprint',
+        'session_type': 'average',
+        'admin_name': 'admin',
+        'admin_sid': None,
+        'backlog': [{'name': 'Tâche 1', 'description': 'desc', 'votes': {}},
+                    {'name': 'Tâche 2', 'description': 'desc', 'votes': {}}],
+        'current_story_index': 0,
+        'votes': {},
+        'is_revealed': False,
+        'is_started': False,
+        'use_timer': False,
+        'timer_duration': 60,
+        'timer_end_time': None,
+        'participants': {},
+        'revision': 0
+    }
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    if request.param == 'memory':
+        return InMemoryRoomStore()
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisRoomStore(fakeredis.FakeRedis(decode_responses=True))
+
+def test_create_get_delete(store):
+    store.create_room('R1', make_room())
+    assert 'R1' in store
+    assert store.get_room('R1')['session_name'] == 'Sprint'
+    assert store.room_ids() == ['R1']
+    store.delete_room('R1')
+    assert store.get_room('R1') is None
+    assert 'R1' not in store
+
+def test_participants_and_votes(store):
+    store.create_room('R1', make_room())
+    store.add_participant('R1', 'sid1', 'alice')
+    store.add_participant('R1', 'sid2', 'bob')
+    store.record_vote('R1', 'alice', '5')
+    store.record_vote('R1', 'bob', '8')
+    assert store.get_room('R1')['votes'] == {'alice': '5', 'bob': '8'}
+
+    # Retirer un participant retire aussi son vote
+    assert store.remove_participant('R1', 'sid1') == 'alice'
+    assert store.remove_participant('R1', 'sid1') is None
+    room_data = store.get_room('R1')
+    assert room_data['participants'] == {'sid2': 'bob'}
+    assert room_data['votes'] == {'bob': '8'}
+
+def test_votes_outside_the_deck_are_refused(store):
+    store.create_room('R1', make_room())
+    store.add_participant('R1', 'sid1', 'alice')
+    for card in ('hors paquet', 'x' * 1000, 5):
+        with pytest.raises(ValueError):
+            store.record_vote('R1', 'alice', card)
+    assert store.get_room('R1')['votes'] == {}
+
+def test_reveal_and_advance(store):
+    store.create_room('R1', make_room())
+    store.record_vote('R1', 'alice', '5')
+    assert store.try_reveal('R1') is True
+    assert store.try_reveal('R1') is False
+    store.save_story_result('R1', 0, '5.0', 'average', {'alice': '5'})
+
+    assert store.advance_story('R1') == 1
+    room_data = store.get_room('R1')
+    assert room_data['current_story_index'] == 1
+    assert room_data['votes'] == {}
+    assert room_data['is_revealed'] is False
+    assert room_data['backlog'][0]['final_vote'] == '5.0'
+    assert room_data['backlog'][0]['votes_submitted'] == {'alice': '5'}
+
+def test_room_state_without_backlog(store):
+    store.create_room('R1', make_room())
+    store.add_participant('R1', 'sid1', 'alice')
+    store.record_vote('R1', 'alice', '5')
+    state = store.get_room_state('R1')
+    assert state['participants'] == {'sid1': 'alice'} and state['votes'] == {'alice': '5'}
+    assert state['tally']['count'] == 1 and state['session_name'] == 'Sprint'
+    assert store.backlog_length('R1') == 2
+    assert store.get_room_state('INCONNUE') is None
+
+def test_backlog_page(store):
+    room_data = make_room()
+    room_data['backlog'] = [{'name': f'Tâche {i}', 'description': '', 'votes': {}} for i in range(7)]
+    store.create_room('R1', room_data)
+    count, stories = store.backlog_page('R1', 5, 10)
+    assert count == 7
+    assert [story['name'] for story in stories] == ['Tâche 5', 'Tâche 6']
+    assert store.backlog_page('R1', 0, 0) == (7, [])
+
+def test_update_and_revision(store):
+    store.create_room('R1', make_room())
+    store.update_room('R1', is_started=True, timer_duration=30)
+    assert store.next_revision('R1') == 1
+    assert store.next_revision('R1') == 2
+    room_data = store.get_room('R1')
+    assert room_data['is_started'] is True
+    assert room_data['timer_duration'] == 30
+    assert room_data['revision'] == 2
+
+def test_writes_do_not_recreate_deleted_room(store):
+    store.create_room('R1', make_room())
+    store.delete_room('R1')  # Par exemple par un autre worker
+    assert store.update_room('R1', last_activity=1.0) is False
+    assert store.add_participant('R1', 'sid1', 'alice') is False
+    assert store.next_revision('R1') is None
+    assert 'R1' not in store
+    if isinstance(store, RedisRoomStore):
+        assert store._redis.keys('*') == []
+
+def test_create_room_store():
+    assert isinstance(create_room_store(None), InMemoryRoomStore)
+    with pytest.raises(ValueError):
+        create_room_store('mongodb://localhost')
+
+def test_socket_flow_with_redis_store(monkeypatch):
+    monkeypatch.setattr(app_module.vote_buffer, 'window', 0)  # Un patch par vote
+    fakeredis = pytest.importorskip('fakeredis')
+    store = RedisRoomStore(fakeredis.FakeRedis(decode_responses=True))
+    monkeypatch.setattr(app_module, 'rooms', store)
+    monkeypatch.setattr(app_module, 'room_locks', RoomLocks(store))
+    store.create_room('R1', make_room())
+
+    admin = app_module.socketio.test_client(app_module.app)
+    admin.emit('join', {'username': 'admin', 'room_id': 'R1'})
+    admin.emit('start_session', {'room_id': 'R1', 'use_timer': False, 'duration': 60})
+    # Vote, révélation et tâche suivante ne relisent jamais tout le backlog
+    full_reads = []
+    get_room = store.get_room
+    monkeypatch.setattr(store, 'get_room', lambda room_id: full_reads.append(room_id) or get_room(room_id))
+    admin.emit('submit_vote', {'username': 'admin', 'room_id': 'R1', 'vote': '3'})
+    admin.emit('reveal_votes', {'room_id': 'R1'})
+    admin.emit('next_task', {'room_id': 'R1'})
+    assert full_reads == []
+
+    room_data = store.get_room('R1')
+    assert room_data['current_story_index'] == 1
+    assert room_data['backlog'][0]['final_vote'] == '3.0'
+    patches = [msg['args'][0]['type'] for msg in admin.get_received() if msg['name'] == 'state_patch']
+    assert patches == ['session_started', 'vote_cast', 'votes_revealed', 'story_advanced']
+    admin.disconnect()
+    assert store.get_room('R1')['participants'] == {}
@@ -0,0 +1,88 @@
+# tests/test_tally.py
+import pytest
+from poker import tally
+from poker.store import InMemoryRoomStore, RedisRoomStore
+from app import rooms, app, socketio, vote_buffer
+
+# -----------------------------
+# Tests des agrégats incrémentaux de la manche
+# -----------------------------
+
+def test_vote_delta_and_apply():
+    agg = tally.empty_tally()
+    tally.apply_delta(agg, tally.vote_delta(None, '5'))
+    tally.apply_delta(agg, tally.vote_delta(None, '?'))
+    tally.apply_delta(agg, tally.vote_delta('5', '8'))  # Vote modifié
+    assert agg == {'count': 2, 'numeric_count': 1, 'sum': 8.0, 'histogram': {'8': 1, '?': 1}}
+    assert tally.average(agg) == 8.0
+
+    tally.apply_delta(agg, tally.vote_delta('8', None))  # Vote retiré
+    assert agg == {'count': 1, 'numeric_count': 0, 'sum': 0.0, 'histogram': {'?': 1}}
+    assert tally.average(agg) is None
+    assert tally.progress(agg, 2) == {'voted': 1, 'total': 2, 'voted_all': False}
+    assert tally.progress(tally.empty_tally(), 0)['voted_all'] is False
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    if request.param == 'memory':
+        store = InMemoryRoomStore()
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        store = RedisRoomStore(fakeredis.FakeRedis(decode_responses=True))
+    store.create_room('T1', {'backlog': [{'name': 'A'}, {'name': 'B'}], 'current_story_index': 0,
+                             'votes': {}, 'participants': {}, 'is_revealed': False,
+                             'tally': tally.empty_tally()})
+    return store
+
+def test_store_keeps_tally_in_sync(store):
+    store.add_participant('T1', 'sid1', 'alice')
+    store.add_participant('T1', 'sid2', 'bob')
+    store.record_vote('T1', 'alice', '3')
+    assert store.record_vote('T1', 'bob', '5')['sum'] == 8.0
+    assert store.record_vote('T1', 'bob', '3')['histogram'] == {'3': 2}
+    assert store.withdraw_vote('T1', 'alice')['count'] == 1
+
+    store.remove_participant('T1', 'sid2')
+    assert store.get_room('T1')['tally'] == tally.empty_tally()
+
+    store.record_vote('T1', 'alice', '8')
+    store.advance_story('T1')
+    assert store.get_room('T1')['tally'] == tally.empty_tally()
+
+def test_withdraw_vote_and_reveal_from_histogram(monkeypatch):
+    monkeypatch.setattr(vote_buffer, 'window', 0)  # Un patch par vote (voir test_coalesce.py)
+    room_id = 'TALLY1'
+    rooms[room_id] = {
+        'participants': {}, 'admin_name': 'admin', 'admin_sid': None,
+        'backlog': [{'name': 'Tâche', 'description': '', 'votes': {}}],
+        'current_story_index': 0, 'session_type': 'median',
+        'votes': {}, 'tally': tally.empty_tally(),
+        'is_started': True, 'is_revealed': False
+    }
+    admin = socketio.test_client(app)
+    bob = socketio.test_client(app)
+    admin.emit('join', {'username': 'admin', 'room_id': room_id})
+    bob.emit('join', {'username': 'bob', 'room_id': room_id})
+    admin.get_received()
+
+    admin.emit('submit_vote', {'username': 'admin', 'room_id': room_id, 'vote': '3'})
+    bob.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': '13'})
+    bob.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': None})
+    patches = [m['args'][0] for m in admin.get_received() if m['name'] == 'state_patch']
+    assert [p['data']['progress']['voted'] for p in patches] == [1, 2, 1]
+    assert patches[1]['data']['progress']['voted_all'] is True
+    assert patches[2]['data']['vote'] is None
+    assert 'bob' not in rooms[room_id]['votes']
+
+    bob.get_received()
+    bob.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': ['5']})
+    assert [m['name'] for m in bob.get_received()] == ['error']
+
+    bob.emit('submit_vote', {'username': 'bob', 'room_id': room_id, 'vote': '5'})
+    admin.emit('reveal_votes', {'room_id': room_id})
+    reveal = [m['args'][0] for m in admin.get_received()
+              if m['name'] == 'state_patch' and m['args'][0]['type'] == 'votes_revealed'][0]
+    assert reveal['data']['result'] == '4.0'
+
+    admin.disconnect()
+    bob.disconnect()
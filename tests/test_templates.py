@@ -0,0 +1,101 @@
+# tests/test_templates.py
+import io
+import json
+
+import pytest
+
+from app import app, lifecycle, rooms
+from poker.lifecycle import estimate_room_bytes
+from poker.model import SharedBacklog, SharedStory
+from poker.templates import TemplateRegistry
+
+# -----------------------------
+# Tests des modèles de backlog partagés
+# -----------------------------
+
+def upload_template(client, size=3, name='Formation'):
+    backlog = [{'name': f'Tâche {i}', 'description': 'desc'} for i in range(size)] + ['pas un objet']
+    data = {'name': name, 'backlog_file': (io.BytesIO(json.dumps(backlog).encode()), 'backlog.json')}
+    return client.post('/templates', data=data, content_type='multipart/form-data')
+
+def test_template_stories_are_shared_and_copied_on_write():
+    registry = TemplateRegistry()
+    template = registry.add('Sprint', [{'name': 'A', 'description': ''}, {'name': 'B', 'description': ''}])
+    first, second = template.backlog(), template.backlog()
+    assert first[0] is second[0] and isinstance(first[0], SharedStory)
+    with pytest.raises(TypeError):
+        first[0]['final_vote'] = '5'
+
+    story = first.writable(1)
+    story.final_vote = '8'
+    assert first[1] is story and first[-1]['final_vote'] == '8'
+    assert 'final_vote' not in second[1] and 'final_vote' not in template.stories[1]
+    assert [s['name'] for s in first[0:2]] == ['A', 'B'] and first.owned() == [story]
+
+def test_registry_forgets_least_recently_used():
+    registry = TemplateRegistry(max_templates=2)
+    a = registry.add('A', [])
+    b = registry.add('B', [])
+    registry.get(a.template_id)  # A redevient le plus récent
+    registry.add('C', [])
+    assert registry.get(b.template_id) is None and registry.get(a.template_id) is a
+    assert len(registry) == 2
+
+def test_batch_provisioning_shares_the_template():
+    client = app.test_client()
+    response = upload_template(client)
+    assert response.status_code == 201
+    template = response.get_json()
+    assert template['count'] == 3 and len(template['import_errors']) == 1
+    assert template['id'] in [t['id'] for t in client.get('/templates').get_json()['templates']]
+
+    url = f"/templates/{template['id']}/rooms"
+    response = client.post(url, json={'count': 3, 'session_name': 'PI', 'admin_name': 'coach'})
+    assert response.status_code == 201
+    created = response.get_json()['rooms']
+    assert [room['session_name'] for room in created] == ['PI #1', 'PI #2', 'PI #3']
+
+    first, second = (rooms.get_room(room['room_id']) for room in created[:2])
+    assert isinstance(first['backlog'], SharedBacklog) and first['backlog'][0] is second['backlog'][0]
+    size = estimate_room_bytes(first)
+    rooms.save_story_result(created[0]['room_id'], 0, '5', 'average', {'alice': '5', 'bob': '5'})
+    assert first['backlog'][0]['final_vote'] == '5' and 'final_vote' not in second['backlog'][0]
+    assert estimate_room_bytes(first) > size  # Seules les tâches estimées comptent
+
+    # L'administrateur exporte et pagine le backlog comme pour une salle classique
+    exported = json.loads(client.get(f"/room/{created[0]['room_id']}/export").get_data())
+    assert exported[0]['final_vote'] == '5' and exported[2]['name'] == 'Tâche 2'
+    page = client.get(f"/room/{created[1]['room_id']}/backlog?offset=1&limit=5").get_json()
+    assert page['count'] == 3 and [item['index'] for item in page['items']] == [1, 2]
+
+def test_batch_provisioning_validation(monkeypatch):
+    client = app.test_client()
+    template_id = upload_template(client).get_json()['id']
+    url = f'/templates/{template_id}/rooms'
+    assert client.post('/templates/INCONNU/rooms', json={'count': 1}).status_code == 404
+    assert client.post(url, json={'count': 0}).status_code == 400
+    assert client.post(url, json={'count': app.config['TEMPLATE_BATCH_MAX'] + 1}).status_code == 400
+    assert client.post(url, json={'count': 1, 'session_type': 'inconnue'}).status_code == 400
+    monkeypatch.setattr(lifecycle, 'max_rooms', 2)
+    assert client.post(url, json={'count': 3}).status_code == 409
+
+def test_whole_batch_stays_exportable():
+    client = app.test_client()
+    template_id = upload_template(client, size=1).get_json()['id']
+    count = app.config['TEMPLATE_BATCH_MAX']
+    created = client.post(f'/templates/{template_id}/rooms', json={'count': count}).get_json()['rooms']
+    assert len(created) == count
+    for room in (created[0], created[-1]):  # Toutes les salles du lot, même la première
+        assert client.get(f"/room/{room['room_id']}/export").status_code == 200
+
+def test_create_room_from_template():
+    client = app.test_client()
+    template_id = upload_template(client, size=2).get_json()['id']
+    response = client.post('/create_room', data={'username': 'alice', 'session_name': 'Sprint',
+                                                  'session_type': 'average', 'template_id': template_id})
+    assert response.status_code == 302
+    room_id = response.headers['Location'].rsplit('/', 1)[-1]
+    assert len(rooms.get_room(room_id)['backlog']) == 2
+    assert b'template-id' in client.get('/').data
+    assert client.post('/create_room', data={'username': 'alice', 'session_name': 'Sprint',
+                                             'session_type': 'average', 'template_id': 'INCONNU'}).status_code == 404